@@ -0,0 +1,55 @@
+from sqlalchemy import select, text
+from models import db, VersaoTabela
+
+# Contadores de alteração por tabela
+#
+# Gatilhos do SQLite somam 1 em versao_tabela a cada INSERT/UPDATE/DELETE nas
+# tabelas monitoradas. Como ficam no banco, pegam também os comandos em lote
+# (operacoes_lote, importação, gravador de auditoria) que não passam pelos
+# eventos do ORM, e o valor é o mesmo para todos os workers. A API compara o
+# contador com o ETag do cliente antes de consultar os dados.
+
+TABELAS = ('colaborador', 'documento', 'log_auditoria')
+OPERACOES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def disponivel(bind=None):
+    bind = bind or db.engine
+    return bind.dialect.name == 'sqlite'
+
+
+def criar_contadores():
+    """Cria as linhas dos contadores e os gatilhos que faltam. Retorna True se criou algo."""
+    if not disponivel():
+        return False
+    criados = False
+    with db.engine.begin() as conn:
+        existentes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        conhecidas = set(conn.execute(select(VersaoTabela.tabela)).scalars())
+        for tabela in TABELAS:
+            if tabela not in conhecidas:
+                conn.execute(VersaoTabela.__table__.insert().values(tabela=tabela, versao=0))
+                criados = True
+            for operacao in OPERACOES:
+                nome = f'trg_versao_{tabela}_{operacao.lower()}'
+                if nome in existentes:
+                    continue
+                conn.execute(text(f"""
+                    CREATE TRIGGER {nome} AFTER {operacao} ON {tabela}
+                    BEGIN
+                        UPDATE versao_tabela SET versao = versao + 1 WHERE tabela = '{tabela}';
+                    END
+                """))
+                criados = True
+    return criados
+
+
+def versoes(tabelas):
+    """Versão atual de cada tabela ({tabela: versao}) ou None se não há contadores neste banco."""
+    if not disponivel():
+        return None
+    linhas = dict(db.session.execute(
+        select(VersaoTabela.tabela, VersaoTabela.versao).where(VersaoTabela.tabela.in_(tabelas))).all())
+    if len(linhas) != len(tabelas):
+        return None
+    return linhas
@@ -0,0 +1,369 @@
+import hashlib
+import time
+from datetime import date, datetime
+from threading import Lock
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import func, select, tuple_
+from werkzeug.exceptions import HTTPException
+from werkzeug.security import check_password_hash
+from models import db, User, Colaborador, Documento, LogAuditoria, UserAgent, calcular_status
+from alteracoes import versoes
+from operacoes_lote import filtro_documentos
+from utils import codificar_cursor, contagens_status, decodificar_cursor
+
+# API JSON somente leitura (v1)
+#
+# - Paginação por cursor: cada resposta traz `proximo_cursor`; sem ele, a lista acabou.
+# - Seleção de campos: ?campos=id,nome (só essas colunas são consultadas).
+# - ETag a partir dos contadores de alteração das tabelas envolvidas
+#   (alteracoes.py): um If-None-Match igual responde 304 sem consultar os dados.
+# - Autenticação pela sessão do site ou HTTP Basic (usuário e senha do sistema).
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+CAMPOS_COLABORADOR = {
+    'id': Colaborador.id,
+    'nome': Colaborador.nome,
+    'email': Colaborador.email,
+    'departamento': Colaborador.departamento,
+    'cargo': Colaborador.cargo,
+    'data_admissao': Colaborador.data_admissao,
+    'created_at': Colaborador.created_at,
+}
+
+CAMPOS_DOCUMENTO = {
+    'id': Documento.id,
+    'colaborador_id': Documento.colaborador_id,
+    'nome': Documento.nome,
+    'tipo_validade': Documento.tipo_validade,
+    'data_validade': Documento.data_validade,
+    'data_upload': Documento.data_upload,
+    'nome_arquivo': Documento.nome_arquivo,
+    'arquivo_hash': Documento.arquivo_hash,
+    'observacoes': Documento.observacoes,
+    'status': None,  # calculado a partir de tipo_validade e data_validade
+}
+
+CAMPOS_AUDITORIA = {
+    'id': LogAuditoria.id,
+    'usuario_id': LogAuditoria.usuario_id,
+    'acao': LogAuditoria.acao,
+    'descricao': LogAuditoria.descricao,
+    'tabela_afetada': LogAuditoria.tabela_afetada,
+    'registro_id': LogAuditoria.registro_id,
+    'ip_address': LogAuditoria.ip_address,
+    'user_agent': func.coalesce(UserAgent.texto, LogAuditoria.user_agent),
+    'created_at': LogAuditoria.created_at,
+}
+
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+@api_v1.errorhandler(ErroApi)
+def _erro_api(erro):
+    return jsonify(erro=erro.mensagem), erro.status
+
+
+@api_v1.errorhandler(HTTPException)
+def _erro_http(erro):
+    response = jsonify(erro=erro.description)
+    response.status_code = erro.code
+    if erro.code == 401:
+        response.headers['WWW-Authenticate'] = 'Basic realm="api"'
+    return response
+
+
+@api_v1.before_request
+@login_required
+def _exigir_permissao():
+    if not current_user.has_permission('download'):
+        raise ErroApi('Acesso não autorizado', 403)
+
+
+# Autenticação HTTP Basic
+
+class CredenciaisCache:
+    """Guarda por USUARIO_CACHE_TTL segundos as credenciais Basic já conferidas.
+
+    O hash de senha é propositalmente lento; sem o cache, uma integração que
+    consulta a API a cada minuto pagaria essa verificação em toda chamada.
+    A chave inclui o password_hash gravado, lido a cada chamada por uma
+    consulta barata pelo username: troca de senha, renomeação ou exclusão do
+    usuário valem na hora, em todos os processos.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entradas = {}
+
+    def usuario_id(self, username, password):
+        registro = db.session.execute(
+            select(User.id, User.password_hash).where(User.username == username)
+        ).first()
+        if registro is None:
+            return None
+        user_id, password_hash = registro
+
+        chave = (username, hashlib.sha256(password.encode()).hexdigest(), password_hash)
+        ttl = current_app.config.get('USUARIO_CACHE_TTL', 30)
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+        if entrada and agora - entrada[0] <= ttl and entrada[1] == user_id:
+            return user_id
+
+        if not check_password_hash(password_hash, password):
+            return None
+        with self._lock:
+            # Entradas de senhas antigas nunca mais acertam; descarta as vencidas
+            self._entradas = {c: e for c, e in self._entradas.items() if agora - e[0] <= ttl}
+            self._entradas[chave] = (agora, user_id)
+        return user_id
+
+
+credenciais_cache = CredenciaisCache()
+
+
+def usuario_por_credenciais(autorizacao):
+    """Usado pelo request_loader do Flask-Login nas rotas da API."""
+    if autorizacao is None or autorizacao.type != 'basic' or not autorizacao.username:
+        return None
+    return credenciais_cache.usuario_id(autorizacao.username, autorizacao.password or '')
+
+
+# Utilitários
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _campos(disponiveis):
+    pedidos = request.args.get('campos')
+    if not pedidos:
+        return list(disponiveis)
+    campos = [campo.strip() for campo in pedidos.split(',') if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in disponiveis]
+    if invalidos:
+        raise ErroApi(f'Campos inválidos: {", ".join(invalidos)}')
+    return campos
+
+
+def _limite():
+    limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise ErroApi(f'limite deve estar entre 1 e {LIMITE_MAXIMO}')
+    return limite
+
+
+def _cursor_id():
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        return None
+    if not cursor.isdigit():
+        raise ErroApi('cursor inválido')
+    return int(cursor)
+
+
+def _colunas(disponiveis, campos, obrigatorios=('id',)):
+    """Colunas da consulta: as pedidas mais as necessárias para cursor e campos calculados."""
+    nomes = dict.fromkeys(list(obrigatorios) + [campo for campo in campos if disponiveis[campo] is not None])
+    return [disponiveis[nome].label(nome) for nome in nomes]
+
+
+def _linha(registro, campos):
+    return {campo: _serializar(getattr(registro, campo)) for campo in campos}
+
+
+def _condicional(tabelas, gerar, por_dia=False):
+    """Responde 304 se o cliente já tem a versão atual; senão chama `gerar()`.
+
+    O ETag combina a URL (filtros, campos, cursor) com os contadores das
+    tabelas. Com `por_dia`, entra também a data de hoje, porque o status de
+    vencimento muda com o passar dos dias mesmo sem alteração no banco.
+    """
+    atuais = versoes(tabelas)
+    if atuais is None:
+        return jsonify(gerar())
+
+    partes = [request.full_path] + [f'{tabela}:{atuais[tabela]}' for tabela in sorted(atuais)]
+    if por_dia:
+        partes.append(date.today().isoformat())
+    etag = hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(gerar())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _listar(consulta, chave, formatar, cursor, limite):
+    """Busca limite + 1 linhas a partir do cursor para saber se há próxima página."""
+    if cursor is not None:
+        consulta = consulta.where(chave > cursor)
+    linhas = db.session.execute(consulta.order_by(chave).limit(limite + 1)).all()
+    proximo = str(linhas[limite - 1].id) if len(linhas) > limite else None
+    return {'dados': [formatar(linha) for linha in linhas[:limite]], 'proximo_cursor': proximo}
+
+
+# Colaboradores
+
+@api_v1.route('/colaboradores')
+def listar_colaboradores():
+    campos = _campos(CAMPOS_COLABORADOR)
+    limite = _limite()
+    cursor = _cursor_id()
+    departamento = request.args.get('departamento')
+
+    def gerar():
+        colunas = _colunas(CAMPOS_COLABORADOR, campos)
+        consulta = select(*colunas)
+        if departamento:
+            consulta = consulta.where(Colaborador.departamento == departamento)
+        return _listar(consulta, Colaborador.id, lambda linha: _linha(linha, campos), cursor, limite)
+
+    return _condicional(['colaborador'], gerar)
+
+
+@api_v1.route('/colaboradores/<int:colaborador_id>')
+def obter_colaborador(colaborador_id):
+    campos = _campos(CAMPOS_COLABORADOR)
+
+    def gerar():
+        colunas = _colunas(CAMPOS_COLABORADOR, campos)
+        linha = db.session.execute(select(*colunas).where(Colaborador.id == colaborador_id)).first()
+        if linha is None:
+            raise ErroApi('Colaborador não encontrado', 404)
+        return _linha(linha, campos)
+
+    return _condicional(['colaborador'], gerar)
+
+
+# Documentos
+
+def _documento(linha, campos, hoje):
+    dados = _linha(linha, [campo for campo in campos if campo != 'status'])
+    if 'status' in campos:
+        dados['status'] = calcular_status(linha.tipo_validade, linha.data_validade, hoje)
+    return {campo: dados[campo] for campo in campos}
+
+
+def _colunas_documento(campos):
+    obrigatorios = ('id', 'tipo_validade', 'data_validade') if 'status' in campos else ('id',)
+    return _colunas(CAMPOS_DOCUMENTO, campos, obrigatorios)
+
+
+@api_v1.route('/documentos')
+def listar_documentos():
+    campos = _campos(CAMPOS_DOCUMENTO)
+    limite = _limite()
+    cursor = _cursor_id()
+    criterios = {
+        'colaborador_id': request.args.get('colaborador_id', type=int),
+        'tipo_validade': request.args.get('tipo_validade'),
+        'situacao': request.args.get('situacao'),
+    }
+
+    def gerar():
+        hoje = date.today()
+        consulta = select(*_colunas_documento(campos))
+        if any(criterios.values()):
+            try:
+                filtro, _ = filtro_documentos(hoje=hoje, **criterios)
+            except ValueError as e:
+                raise ErroApi(str(e))
+            consulta = consulta.where(filtro)
+        return _listar(consulta, Documento.id, lambda linha: _documento(linha, campos, hoje), cursor, limite)
+
+    return _condicional(['documento'], gerar, por_dia=True)
+
+
+@api_v1.route('/documentos/<int:documento_id>')
+def obter_documento(documento_id):
+    campos = _campos(CAMPOS_DOCUMENTO)
+
+    def gerar():
+        linha = db.session.execute(
+            select(*_colunas_documento(campos)).where(Documento.id == documento_id)).first()
+        if linha is None:
+            raise ErroApi('Documento não encontrado', 404)
+        return _documento(linha, campos, date.today())
+
+    return _condicional(['documento'], gerar, por_dia=True)
+
+
+# Resumo de vencimentos
+
+@api_v1.route('/vencimentos/resumo')
+def resumo_vencimentos():
+    def gerar():
+        hoje = date.today()
+        linhas = db.session.execute(
+            select(Colaborador.departamento, *contagens_status(hoje))
+            .join(Colaborador, Documento.colaborador_id == Colaborador.id)
+            .group_by(Colaborador.departamento).order_by(Colaborador.departamento)
+        ).all()
+        departamentos = [
+            {'departamento': departamento, 'total': total, 'vencidos': venc, 'proximos_vencer': prox,
+             'validos': total - venc - prox}
+            for departamento, total, venc, prox in linhas
+        ]
+        totais = {chave: sum(item[chave] for item in departamentos)
+                  for chave in ('total', 'vencidos', 'proximos_vencer', 'validos')}
+        return {'data': hoje.isoformat(), 'totais': totais, 'departamentos': departamentos}
+
+    return _condicional(['colaborador', 'documento'], gerar, por_dia=True)
+
+
+# Auditoria (somente administradores)
+
+@api_v1.route('/auditoria')
+def listar_auditoria():
+    if current_user.role != 'administrador':
+        raise ErroApi('Acesso não autorizado', 403)
+    campos = _campos(CAMPOS_AUDITORIA)
+    limite = _limite()
+    cursor = request.args.get('cursor')
+    antes = decodificar_cursor(cursor)
+    if cursor and antes is None:
+        raise ErroApi('cursor inválido')
+    filtros = {
+        'usuario_id': request.args.get('usuario_id', type=int),
+        'acao': request.args.get('acao'),
+        'tabela': request.args.get('tabela'),
+        'desde': request.args.get('desde', type=datetime.fromisoformat),
+    }
+
+    def gerar():
+        # Mesma ordem e cursor da página de auditoria: do mais novo para o mais antigo
+        colunas = _colunas(CAMPOS_AUDITORIA, campos, ('id', 'created_at'))
+        consulta = select(*colunas).outerjoin(UserAgent, LogAuditoria.user_agent_id == UserAgent.id)
+        if filtros['usuario_id']:
+            consulta = consulta.where(LogAuditoria.usuario_id == filtros['usuario_id'])
+        if filtros['acao']:
+            consulta = consulta.where(LogAuditoria.acao == filtros['acao'])
+        if filtros['tabela']:
+            consulta = consulta.where(LogAuditoria.tabela_afetada == filtros['tabela'])
+        if filtros['desde']:
+            consulta = consulta.where(LogAuditoria.created_at >= filtros['desde'])
+        if antes:
+            consulta = consulta.where(tuple_(LogAuditoria.created_at, LogAuditoria.id) < antes)
+        linhas = db.session.execute(consulta.order_by(
+            LogAuditoria.created_at.desc(), LogAuditoria.id.desc()).limit(limite + 1)).all()
+        proximo = codificar_cursor(linhas[limite - 1]) if len(linhas) > limite else None
+        return {'dados': [_linha(linha, campos) for linha in linhas[:limite]], 'proximo_cursor': proximo}
+
+    return _condicional(['log_auditoria'], gerar)
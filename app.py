@@ -1,588 +1,100 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file
-from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from models import db, User, Colaborador, Documento, LogAuditoria
-from forms import LoginForm, ColaboradorForm, DocumentoForm, UsuarioForm, EditarUsuarioForm
-from utils import calcular_data_validade, get_documentos_vencidos, get_documentos_proximos_vencer
-from datetime import datetime
+from flask import Flask
+from flask_login import LoginManager
+from models import db
+from cache import usuario_cache
+from banco import opcoes_engine, configurar_banco
+from log_auditoria import gravador_auditoria
+from storage import removedor_arquivos
+from extracao import extrator_texto
+from previews import cache_previews
+from principal import principal_bp
+from colaboradores import colaboradores_bp
+from documentos import documentos_bp
+from usuarios import usuarios_bp
+from auditoria import auditoria_bp
+from api import api_v1, usuario_por_credenciais
+from metricas import metricas_requisicoes, metricas_bp
+from exportacao import exportacao_bp
+from conformidade import conformidade_bp
+from comandos import COMANDOS
 import os
-from werkzeug.utils import secure_filename
-from flask_wtf.file import FileRequired
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'sua-chave-secreta-aqui'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///rh_documentos.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle': 300,
-    'pool_pre_ping': True
-}
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
-
-# Inicializações
-db.init_app(app)
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'principal.login'
+login_manager.blueprint_login_views[api_v1.name] = None
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Criar diretório de uploads
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# FUNÇÃO: Registrar log de auditoria
-def registrar_log(acao, descricao, tabela_afetada=None, registro_id=None):
-    try:
-        log = LogAuditoria(
-            usuario_id=current_user.id,
-            acao=acao,
-            descricao=descricao,
-            tabela_afetada=tabela_afetada,
-            registro_id=registro_id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        print(f"Erro ao registrar log: {e}")
-        db.session.rollback()
-
-@app.route('/')
-@login_required
-def dashboard():
-    documentos_vencidos = get_documentos_vencidos()
-    documentos_proximos = get_documentos_proximos_vencer()
-    total_colaboradores = Colaborador.query.count()
-    total_documentos = Documento.query.count()
-    
-    return render_template('dashboard.html', 
-                         documentos_vencidos=documentos_vencidos,
-                         documentos_proximos=documentos_proximos,
-                         total_colaboradores=total_colaboradores,
-                         total_documentos=total_documentos)
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    form = LoginForm()
-    if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
-            login_user(user)
-            
-            # REGISTRAR LOG
-            registrar_log(
-                acao='login',
-                descricao=f'Usuário {user.username} fez login no sistema',
-                tabela_afetada='user',
-                registro_id=user.id
-            )
-            
-            flash(f'Bem-vindo, {user.username}!', 'success')
-            return redirect(url_for('dashboard'))
-        flash('Usuário ou senha inválidos', 'danger')
-    return render_template('login.html', form=form)
-
-@app.route('/logout')
-@login_required
-def logout():
-    # REGISTRAR LOG
-    registrar_log(
-        acao='logout',
-        descricao=f'Usuário {current_user.username} fez logout do sistema',
-        tabela_afetada='user',
-        registro_id=current_user.id
-    )
-    
-    logout_user()
-    flash('Você saiu do sistema', 'info')
-    return redirect(url_for('login'))
-
-@app.teardown_appcontext
-def shutdown_session(exception=None):
-    """Fechar sessão ao final de cada request"""
-    db.session.remove()
-
-@app.route('/colaboradores')
-@login_required
-def colaboradores():
-    if not current_user.has_permission('add_colaborador'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    colaboradores = Colaborador.query.all()
-    return render_template('colaboradores.html', colaboradores=colaboradores)
-
-@app.route('/colaborador/novo', methods=['GET', 'POST'])
-@login_required
-def novo_colaborador():
-    if not current_user.has_permission('add_colaborador'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    form = ColaboradorForm()
-    if form.validate_on_submit():
-        try:
-            colaborador = Colaborador(
-                nome=form.nome.data,
-                email=form.email.data,
-                departamento=form.departamento.data,
-                cargo=form.cargo.data,
-                data_admissao=form.data_admissao.data
-            )
-            db.session.add(colaborador)
-            db.session.commit()
-            
-            # REGISTRAR LOG
-            registrar_log(
-                acao='criar_colaborador',
-                descricao=f'Colaborador {form.nome.data} criado no departamento {form.departamento.data}',
-                tabela_afetada='colaborador',
-                registro_id=colaborador.id
-            )
-            
-            flash('Colaborador cadastrado com sucesso!', 'success')
-            return redirect(url_for('colaboradores'))
-        except Exception as e:
-            db.session.rollback()
-            flash('Erro ao cadastrar colaborador', 'danger')
-    
-    return render_template('colaborador_form.html', form=form, title='Novo Colaborador')
-
-@app.route('/colaborador/editar/<int:colaborador_id>', methods=['GET', 'POST'])
-@login_required
-def editar_colaborador(colaborador_id):
-    if not current_user.has_permission('add_colaborador'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    colaborador = Colaborador.query.get_or_404(colaborador_id)
-    form = ColaboradorForm(obj=colaborador)
-    
-    if form.validate_on_submit():
-        try:
-            # Registrar alterações para o log
-            alteracoes = []
-            if colaborador.nome != form.nome.data:
-                alteracoes.append(f"nome: {colaborador.nome} -> {form.nome.data}")
-            if colaborador.email != form.email.data:
-                alteracoes.append(f"email: {colaborador.email} -> {form.email.data}")
-            if colaborador.departamento != form.departamento.data:
-                alteracoes.append(f"departamento: {colaborador.departamento} -> {form.departamento.data}")
-            if colaborador.cargo != form.cargo.data:
-                alteracoes.append(f"cargo: {colaborador.cargo} -> {form.cargo.data}")
-            if colaborador.data_admissao != form.data_admissao.data:
-                alteracoes.append(f"data_admissao: {colaborador.data_admissao} -> {form.data_admissao.data}")
-            
-            colaborador.nome = form.nome.data
-            colaborador.email = form.email.data
-            colaborador.departamento = form.departamento.data
-            colaborador.cargo = form.cargo.data
-            colaborador.data_admissao = form.data_admissao.data
-            
-            db.session.commit()
-            
-            # REGISTRAR LOG
-            if alteracoes:
-                registrar_log(
-                    acao='editar_colaborador',
-                    descricao=f'Colaborador {colaborador.nome} alterado: {", ".join(alteracoes)}',
-                    tabela_afetada='colaborador',
-                    registro_id=colaborador.id
-                )
-            
-            flash('Colaborador atualizado com sucesso!', 'success')
-            return redirect(url_for('colaboradores'))
-        except Exception as e:
-            db.session.rollback()
-            flash('Erro ao atualizar colaborador', 'danger')
-    
-    return render_template('colaborador_form.html', form=form, colaborador=colaborador, title='Editar Colaborador')
-
-# Rota de documentos do colaborador específico
-@app.route('/colaborador/<int:colaborador_id>/documentos')
-@login_required
-def documentos_colaborador(colaborador_id):
-    colaborador = Colaborador.query.get_or_404(colaborador_id)
-    
-    # Lógica de pesquisa por nome do documento
-    search_query = request.args.get('search', '').strip()
-    
-    query = Documento.query.filter_by(colaborador_id=colaborador_id)
-    if search_query:
-        # Busca insensível a caixa e parcial no nome do documento
-        search_term = f'%{search_query}%'
-        query = query.filter(Documento.nome.ilike(search_term))
-        
-    documentos = query.all()
-    
-    return render_template('documentos_colaborador.html', 
-                         colaborador=colaborador, 
-                         documentos=documentos,
-                         search_query=search_query)
-
-# Rota principal de documentos (mostra todos os colaboradores)
-@app.route('/documentos')
-@login_required
-def documentos():
-    # Lógica de pesquisa por nome do colaborador
-    search_query = request.args.get('search', '').strip()
-    
-    query = Colaborador.query
-    if search_query:
-        # Busca insensível a caixa e parcial no nome do colaborador
-        search_term = f'%{search_query}%'
-        query = query.filter(Colaborador.nome.ilike(search_term))
-        
-    colaboradores = query.all()
-    
-    # Contar documentos por colaborador
-    for colaborador in colaboradores:
-        colaborador.total_documentos = len(colaborador.documentos)
-        colaborador.documentos_vencidos = len([d for d in colaborador.documentos if d.status_vencimento() == 'vencido'])
-        colaborador.documentos_proximos = len([d for d in colaborador.documentos if d.status_vencimento() == 'proximo_vencer'])
-    
-    return render_template('documentos.html', colaboradores=colaboradores, search_query=search_query)
-
-# Rota para adicionar documento
-@app.route('/documento/novo/<int:colaborador_id>', methods=['GET', 'POST'])
-@login_required
-def novo_documento(colaborador_id):
-    if not current_user.has_permission('add_documento'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('documentos'))
-    
-    print(f"=== NOVO DOCUMENTO - Colaborador ID: {colaborador_id} ===")
-    
-    colaborador = Colaborador.query.get_or_404(colaborador_id)
-    form = DocumentoForm()
-    
-    print(f"Form validado: {form.validate_on_submit()}")
-    print(f"Erros do form: {form.errors}")
-    
-    if form.validate_on_submit():
-        try:
-            print("Tentando salvar documento...")
-            
-            arquivo = form.arquivo.data
-            filename = secure_filename(arquivo.filename)
-            arquivo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            print(f"Arquivo: {filename}")
-            print(f"Caminho: {arquivo_path}")
-            
-            # Verificar se arquivo já existe
-            if os.path.exists(arquivo_path):
-                name, ext = os.path.splitext(filename)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{name}_{timestamp}{ext}"
-                arquivo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                print(f"Arquivo renomeado para: {filename}")
-            
-            arquivo.save(arquivo_path)
-            print("Arquivo salvo com sucesso")
-            
-            # Lógica simplificada para data_validade
-            data_validade = None
-            if form.tipo_validade.data == 'personalizado':
-                data_validade = form.data_validade.data
-            else:
-                data_validade = calcular_data_validade(form.tipo_validade.data, None)
-            
-            print(f"Data validade calculada: {data_validade}")
-            
-            documento = Documento(
-                colaborador_id=colaborador_id,
-                nome=form.nome.data,
-                tipo_validade=form.tipo_validade.data,
-                data_validade=data_validade,
-                arquivo=filename,
-                observacoes=form.observacoes.data
-            )
-            
-            db.session.add(documento)
-            db.session.commit()
-            print("Documento salvo no banco")
-            
-            # REGISTRAR LOG
-            registrar_log(
-                acao='criar_documento',
-                descricao=f'Documento {form.nome.data} adicionado para colaborador {colaborador.nome}',
-                tabela_afetada='documento',
-                registro_id=documento.id
-            )
-            
-            flash('Documento adicionado com sucesso!', 'success')
-            return redirect(url_for('documentos_colaborador', colaborador_id=colaborador_id))
-            
-        except Exception as e:
-            db.session.rollback()
-            error_msg = f'Erro ao adicionar documento: {str(e)}'
-            print(f"ERRO: {error_msg}")
-            flash(error_msg, 'danger')
-    
-    return render_template('documento_form.html', form=form, colaborador=colaborador, title='Adicionar Novo Documento')
-
-# Rota para editar documento
-@app.route('/documento/editar/<int:documento_id>', methods=['GET', 'POST'])
-@login_required
-def editar_documento(documento_id):
-    if not current_user.has_permission('edit_documento'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('documentos'))
-    
-    documento = Documento.query.get_or_404(documento_id)
-    colaborador = Colaborador.query.get_or_404(documento.colaborador_id)
-    
-    # Preenche o formulário com os dados existentes
-    form = DocumentoForm(obj=documento)
-    
-    # Remove a validação FileRequired para edição, permitindo que o campo de arquivo fique vazio
-    form.arquivo.validators = [v for v in form.arquivo.validators if not isinstance(v, FileRequired)]
-
-    if form.validate_on_submit():
-        try:
-            # Registrar alterações para o log
-            alteracoes = []
-            if documento.nome != form.nome.data:
-                alteracoes.append(f"nome: {documento.nome} -> {form.nome.data}")
-            if documento.tipo_validade != form.tipo_validade.data:
-                alteracoes.append(f"tipo_validade: {documento.tipo_validade} -> {form.tipo_validade.data}")
-            
-            # 1. Tratar o upload do arquivo
-            if form.arquivo.data and form.arquivo.data.filename:
-                arquivo = form.arquivo.data
-                filename = secure_filename(arquivo.filename)
-                arquivo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                
-                # Deletar o arquivo antigo
-                old_file_path = os.path.join(app.config['UPLOAD_FOLDER'], documento.arquivo)
-                if os.path.exists(old_file_path):
-                    os.remove(old_file_path)
-                    
-                arquivo.save(arquivo_path)
-                documento.arquivo = filename # Atualiza o nome do arquivo no banco
-                alteracoes.append(f"arquivo: {documento.arquivo} -> {filename}")
-            
-            # 2. Recalcular a data de validade
-            data_validade = calcular_data_validade(
-                form.tipo_validade.data, 
-                form.data_validade.data if form.tipo_validade.data == 'personalizado' else None
-            )
-            
-            if documento.data_validade != data_validade:
-                alteracoes.append(f"data_validade: {documento.data_validade} -> {data_validade}")
-            
-            # 3. Atualizar campos do documento
-            documento.nome = form.nome.data
-            documento.tipo_validade = form.tipo_validade.data
-            documento.data_validade = data_validade
-            documento.observacoes = form.observacoes.data
-            
-            db.session.commit()
-            
-            # REGISTRAR LOG
-            if alteracoes:
-                registrar_log(
-                    acao='editar_documento',
-                    descricao=f'Documento {documento.nome} alterado: {", ".join(alteracoes)}',
-                    tabela_afetada='documento',
-                    registro_id=documento.id
-                )
-            
-            flash('Documento atualizado com sucesso!', 'success')
-            return redirect(url_for('documentos_colaborador', colaborador_id=colaborador.id))
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Erro ao atualizar documento: {e}', 'danger')
-
-    return render_template('documento_form.html', form=form, colaborador=colaborador, documento=documento, title='Editar Documento')
-
-# Rota para excluir documento
-@app.route('/documento/excluir/<int:documento_id>', methods=['POST'])
-@login_required
-def excluir_documento(documento_id):
-    if not current_user.has_permission('delete_documento'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('documentos'))
-    
-    documento = Documento.query.get_or_404(documento_id)
-    colaborador_id = documento.colaborador_id
-    nome_documento = documento.nome
-    
-    try:
-        # 1. Deletar o arquivo do sistema de arquivos
-        arquivo_path = os.path.join(app.config['UPLOAD_FOLDER'], documento.arquivo)
-        if os.path.exists(arquivo_path):
-            os.remove(arquivo_path)
-            
-        # 2. Deletar o registro do banco de dados
-        db.session.delete(documento)
-        db.session.commit()
-        
-        # REGISTRAR LOG
-        registrar_log(
-            acao='excluir_documento',
-            descricao=f'Documento {nome_documento} excluído',
-            tabela_afetada='documento',
-            registro_id=documento_id
-        )
-        
-        flash('Documento excluído com sucesso!', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Erro ao excluir documento: {e}', 'danger')
-        
-    return redirect(url_for('documentos_colaborador', colaborador_id=colaborador_id))
-
-@app.route('/download/<int:documento_id>')
-@login_required
-def download_documento(documento_id):
-    if not current_user.has_permission('download'):
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    documento = Documento.query.get_or_404(documento_id)
-    arquivo_path = os.path.join(app.config['UPLOAD_FOLDER'], documento.arquivo)
-    
-    if not os.path.exists(arquivo_path):
-        flash('Arquivo não encontrado', 'danger')
-        return redirect(url_for('documentos'))
-    
-    # REGISTRAR LOG
-    registrar_log(
-        acao='download_documento',
-        descricao=f'Download do documento {documento.nome}',
-        tabela_afetada='documento',
-        registro_id=documento.id
-    )
-    
-    return send_file(arquivo_path, as_attachment=True)
-
-@app.route('/usuarios')
-@login_required
-def usuarios():
-    if current_user.role != 'administrador':
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    usuarios = User.query.all()
-    return render_template('usuarios.html', usuarios=usuarios)
-
-@app.route('/usuario/novo', methods=['GET', 'POST'])
-@login_required
-def novo_usuario():
-    if current_user.role != 'administrador':
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    form = UsuarioForm()
-    if form.validate_on_submit():
-        try:
-            # Verificar se usuário já existe
-            if User.query.filter_by(username=form.username.data).first():
-                flash('Usuário já existe', 'danger')
-                return render_template('usuario_form.html', form=form)
-            
-            user = User(
-                username=form.username.data,
-                email=form.email.data,
-                role=form.role.data
-            )
-            user.set_password(form.password.data)
-            db.session.add(user)
-            db.session.commit()
-            
-            # REGISTRAR LOG
-            registrar_log(
-                acao='criar_usuario',
-                descricao=f'Usuário {form.username.data} criado com cargo {form.role.data}',
-                tabela_afetada='user',
-                registro_id=user.id
-            )
-            
-            flash('Usuário cadastrado com sucesso!', 'success')
-            return redirect(url_for('usuarios'))
-        except Exception as e:
-            db.session.rollback()
-            flash('Erro ao cadastrar usuário', 'danger')
-    
-    return render_template('usuario_form.html', form=form)
-
-# ROTA: Editar usuário
-@app.route('/usuario/editar/<int:usuario_id>', methods=['GET', 'POST'])
-@login_required
-def editar_usuario(usuario_id):
-    if current_user.role != 'administrador':
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    usuario = User.query.get_or_404(usuario_id)
-    form = EditarUsuarioForm(obj=usuario)
-    
-    if form.validate_on_submit():
-        try:
-            # Registrar alterações para o log
-            alteracoes = []
-            if usuario.username != form.username.data:
-                alteracoes.append(f"username: {usuario.username} -> {form.username.data}")
-            if usuario.email != form.email.data:
-                alteracoes.append(f"email: {usuario.email} -> {form.email.data}")
-            if usuario.role != form.role.data:
-                alteracoes.append(f"role: {usuario.role} -> {form.role.data}")
-            
-            # Atualizar usuário
-            usuario.username = form.username.data
-            usuario.email = form.email.data
-            usuario.role = form.role.data
-            
-            db.session.commit()
-            
-            # REGISTRAR LOG
-            if alteracoes:
-                registrar_log(
-                    acao='editar_usuario',
-                    descricao=f'Usuário {usuario.username} alterado: {", ".join(alteracoes)}',
-                    tabela_afetada='user',
-                    registro_id=usuario.id
-                )
-            
-            flash('Usuário atualizado com sucesso!', 'success')
-            return redirect(url_for('usuarios'))
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Erro ao atualizar usuário: {str(e)}', 'danger')
-    
-    return render_template('editar_usuario.html', form=form, usuario=usuario)
-
-# ROTA: Log de auditoria
-@app.route('/auditoria')
-@login_required
-def auditoria():
-    if current_user.role != 'administrador':
-        flash('Acesso não autorizado', 'warning')
-        return redirect(url_for('dashboard'))
-    
-    # Paginação simples
-    page = request.args.get('page', 1, type=int)
-    logs = LogAuditoria.query.order_by(LogAuditoria.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
-    
-    return render_template('auditoria.html', logs=logs)
+    return usuario_cache.obter(int(user_id))
+
+
+# Integrações acessam a API com HTTP Basic (sem sessão); 401 em vez do redirect para o login
+@login_manager.request_loader
+def load_user_from_request(request):
+    if request.blueprint != api_v1.name:
+        return None
+    usuario_id = usuario_por_credenciais(request.authorization)
+    return usuario_cache.obter(usuario_id) if usuario_id else None
+
+
+def create_app(config=None):
+    """Cria e configura a aplicação.
+
+    Nada aqui acessa o banco ou o disco: tabelas, migrações e o usuário admin
+    são criados por `flask init-db`, uma vez por implantação, e pools e
+    threads só começam no primeiro uso. `config` sobrescreve os valores
+    padrão (testes, benchmarks).
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'sua-chave-secreta-aqui'
+    # Banco: SQLite por padrão ou, por exemplo, DATABASE_URL=postgresql+psycopg2://rh:senha@db/rh (ver banco.py)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///rh_documentos.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))  # conexões por worker
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    app.config['SQLITE_BUSY_TIMEOUT'] = 15  # segundos esperando o lock de escrita antes de "database is locked"
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+    app.config['DASHBOARD_CACHE_TTL'] = 60  # segundos
+    app.config['DASHBOARD_LIMITE'] = 50  # itens por lista no dashboard
+    app.config['USUARIO_CACHE_TTL'] = 30  # segundos
+    # Atrás de um nginx com `location /protected-uploads/ { internal; alias .../uploads/; }`
+    # defina o prefixo para que o proxy entregue os arquivos (X-Accel-Redirect)
+    app.config['DOWNLOAD_X_ACCEL_PREFIX'] = os.environ.get('DOWNLOAD_X_ACCEL_PREFIX')
+    app.config['AUDITORIA_RETENCAO_DIAS'] = 180  # registros mais antigos vão para o arquivo morto
+    app.config['VERSOES_MANTER'] = 10  # arquivos distintos guardados no histórico de cada documento
+    app.config['VERSOES_DIAS'] = None  # se definido, versões mais antigas saem do histórico
+    app.config['NOTIFICACAO_SINK'] = os.environ.get('NOTIFICACAO_SINK', 'arquivo')  # 'arquivo' ou 'smtp'
+    app.config['SMTP_HOST'] = os.environ.get('SMTP_HOST', 'localhost')
+    app.config['SMTP_PORTA'] = int(os.environ.get('SMTP_PORTA', 25))
+    app.config['SMTP_REMETENTE'] = os.environ.get('SMTP_REMETENTE', 'rh@empresa.com')
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config))
+
+    # Inicializações
+    db.init_app(app)
+    configurar_banco(app)
+    login_manager.init_app(app)
+    gravador_auditoria.init_app(app)
+    extrator_texto.init_app(app)
+    removedor_arquivos.init_app(app)
+    cache_previews.init_app(app)
+    metricas_requisicoes.init_app(app)
+
+    @app.teardown_appcontext
+    def shutdown_session(exception=None):
+        """Fechar sessão ao final de cada request"""
+        db.session.remove()
+
+    for blueprint in (principal_bp, colaboradores_bp, documentos_bp, usuarios_bp, auditoria_bp, api_v1,
+                      metricas_bp, exportacao_bp, conformidade_bp):
+        app.register_blueprint(blueprint)
+    for comando in COMANDOS:
+        app.cli.add_command(comando)
+
+    return app
 
-# Criar banco de dados e usuário admin padrão
-with app.app_context():
-    db.create_all()
-    # Criar usuário admin padrão se não existir
-    if not User.query.filter_by(username='admin').first():
-        admin = User(username='admin', email='admin@empresa.com', role='administrador')
-        admin.set_password('admin123')
-        db.session.add(admin)
-        db.session.commit()
-        print("Usuário admin criado: admin / admin123")
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
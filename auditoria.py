@@ -0,0 +1,82 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from models import db, User, LogAuditoria
+from utils import codificar_cursor, decodificar_cursor
+from datetime import datetime, date, timedelta
+from sqlalchemy import tuple_
+from consultas import consulta_logs, para_logs
+
+auditoria_bp = Blueprint('auditoria', __name__)
+
+
+def ler_filtros(args):
+    """Filtros da listagem de auditoria a partir da query string (também usados na exportação)."""
+    return {
+        'usuario_id': args.get('usuario_id', type=int),
+        'acao': args.get('acao', '').strip(),
+        'tabela': args.get('tabela', '').strip(),
+        'data_inicio': args.get('data_inicio', type=date.fromisoformat),
+        'data_fim': args.get('data_fim', type=date.fromisoformat),
+    }
+
+
+def filtrar_logs(query, filtros):
+    if filtros['usuario_id']:
+        query = query.filter(LogAuditoria.usuario_id == filtros['usuario_id'])
+    if filtros['acao']:
+        query = query.filter(LogAuditoria.acao == filtros['acao'])
+    if filtros['tabela']:
+        query = query.filter(LogAuditoria.tabela_afetada == filtros['tabela'])
+    if filtros['data_inicio']:
+        query = query.filter(LogAuditoria.created_at >= datetime.combine(filtros['data_inicio'], datetime.min.time()))
+    if filtros['data_fim']:
+        query = query.filter(LogAuditoria.created_at < datetime.combine(filtros['data_fim'] + timedelta(days=1), datetime.min.time()))
+    return query
+
+
+# ROTA: Log de auditoria
+@auditoria_bp.route('/auditoria')
+@login_required
+def auditoria():
+    if current_user.role != 'administrador':
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    por_pagina = 20
+    
+    filtros = ler_filtros(request.args)
+    query = filtrar_logs(consulta_logs(), filtros)
+    
+    # Paginação por cursor em (created_at, id): sem COUNT(*) e sem OFFSET
+    chave = tuple_(LogAuditoria.created_at, LogAuditoria.id)
+    antes = decodificar_cursor(request.args.get('antes'))
+    depois = decodificar_cursor(request.args.get('depois'))
+    
+    if depois:
+        linhas = query.filter(chave > depois).order_by(
+            LogAuditoria.created_at.asc(), LogAuditoria.id.asc()
+        ).limit(por_pagina + 1).all()
+        tem_mais_novos = len(linhas) > por_pagina
+        tem_mais_antigos = True
+        logs = para_logs(reversed(linhas[:por_pagina]))
+    else:
+        if antes:
+            query = query.filter(chave < antes)
+        linhas = query.order_by(
+            LogAuditoria.created_at.desc(), LogAuditoria.id.desc()
+        ).limit(por_pagina + 1).all()
+        tem_mais_novos = antes is not None
+        tem_mais_antigos = len(linhas) > por_pagina
+        logs = para_logs(linhas[:por_pagina])
+    
+    # Parâmetros repassados nos links de navegação
+    filtros_ativos = {nome: valor for nome, valor in filtros.items() if valor}
+    usuarios = db.session.query(User.id, User.username).order_by(User.username).all()
+    
+    return render_template('auditoria.html',
+                         logs=logs,
+                         filtros=filtros,
+                         filtros_ativos=filtros_ativos,
+                         usuarios=usuarios,
+                         cursor_anterior=codificar_cursor(logs[0]) if logs and tem_mais_novos else None,
+                         cursor_proximo=codificar_cursor(logs[-1]) if logs and tem_mais_antigos else None)
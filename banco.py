@@ -0,0 +1,71 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from models import db
+
+# Configuração do banco
+#
+# O backend vem de SQLALCHEMY_DATABASE_URI (variável DATABASE_URL):
+#
+#   - SQLite (padrão): modo WAL, em que leitores não bloqueiam o escritor, e
+#     busy timeout para que escritas simultâneas de vários workers esperem o
+#     lock em vez de falhar com "database is locked";
+#   - PostgreSQL (ex.: postgresql+psycopg2://rh:senha@db/rh, requer o driver):
+#     pool com pre-ping e reciclagem de conexões.
+#
+# O pool é por processo: DB_POOL_SIZE + DB_MAX_OVERFLOW conexões por worker.
+# No PostgreSQL, workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) deve caber em max_connections.
+
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # seguro em WAL: uma queda de energia perde no máximo o último commit
+    'cache_size': -64000,  # em KiB (64 MB por conexão)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def opcoes_engine(config):
+    """SQLALCHEMY_ENGINE_OPTIONS para o banco configurado (chamar antes de db.init_app)."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    opcoes = {
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 5),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+    }
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # em memória: o Flask-SQLAlchemy usa StaticPool
+        # Timeout do driver = busy_timeout do SQLite (segundos esperando o lock de escrita)
+        opcoes['connect_args'] = {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 15)}
+    else:
+        opcoes['pool_pre_ping'] = True
+        opcoes['pool_recycle'] = 300
+    return opcoes
+
+
+def configurar_banco(app):
+    """Pragmas das conexões SQLite e descarte do pool herdado em fork (chamar após db.init_app)."""
+    pragmas = dict(PRAGMAS_SQLITE, **app.config.get('SQLITE_PRAGMAS', {}))
+
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+
+        @event.listens_for(engine, 'connect')
+        def _aplicar_pragmas(conexao, registro):
+            cursor = conexao.cursor()
+            for nome, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nome} = {valor}')
+            cursor.close()
+
+    # gunicorn --preload: conexões abertas no processo pai não podem ser usadas pelos filhos
+    def _descartar_pool_herdado():
+        for engine in engines:
+            engine.dispose(close=False)
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_descartar_pool_herdado)
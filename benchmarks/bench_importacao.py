@@ -0,0 +1,132 @@
+"""Benchmark da importação em lote.
+
+Gera um CSV de colaboradores e um ZIP com N documentos (PDFs pequenos, parte
+deles repetidos para exercitar a deduplicação) e mede a importação em um
+banco SQLite temporário. Compara com o caminho antigo: um commit por
+registro mais um commit de auditoria, como em novo_documento().
+
+Referência (5k documentos, SQLite em disco, 1 CPU): cerca de 700
+documentos/s em lote contra cerca de 105/s um por vez. O que sobra por
+documento é a criação do arquivo temporário (mkstemp + rename) e a
+validação pelo DocumentoForm; no banco, os arquivos do lote custam um
+SELECT, um INSERT e um UPDATE.
+
+Uso:
+    python benchmarks/bench_importacao.py                # 10k documentos
+    python benchmarks/bench_importacao.py 1000 50000     # tamanhos escolhidos
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, Documento, LogAuditoria
+from busca import criar_indice_busca
+from importacao import importar_colaboradores, importar_documentos
+from storage import salvar_stream
+
+DOCUMENTOS_POR_COLABORADOR = 10
+TIPOS = ['indeterminado', '3', '6', '12', 'personalizado']
+
+
+def criar_app(pasta):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(pasta, "bench.db")}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['UPLOAD_FOLDER'] = os.path.join(pasta, 'uploads')
+    app.config['SECRET_KEY'] = 'bench'
+    db.init_app(app)
+    return app
+
+
+def gerar_arquivos(pasta, total_documentos):
+    rnd = random.Random(42)
+    total_colaboradores = max(1, total_documentos // DOCUMENTOS_POR_COLABORADOR)
+
+    caminho_csv = os.path.join(pasta, 'colaboradores.csv')
+    with open(caminho_csv, 'w', newline='', encoding='utf-8') as destino:
+        escritor = csv.writer(destino, delimiter=';')
+        escritor.writerow(['nome', 'email', 'departamento', 'cargo', 'data_admissao'])
+        for i in range(total_colaboradores):
+            escritor.writerow([f'Colaborador {i}', f'colaborador{i}@empresa.com', f'Depto {i % 40}',
+                               'Analista', f'{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2020'])
+
+    caminho_zip = os.path.join(pasta, 'documentos.zip')
+    manifesto = io.StringIO()
+    escritor = csv.writer(manifesto)
+    escritor.writerow(['colaborador_email', 'nome', 'tipo_validade', 'data_validade', 'arquivo', 'observacoes'])
+    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_STORED) as pacote:
+        for i in range(total_documentos):
+            tipo = rnd.choice(TIPOS)
+            # 1 em cada 5 arquivos repete um conteúdo (mesmo modelo de formulário escaneado)
+            conteudo = b'%PDF-1.4 modelo' if i % 5 == 0 else f'%PDF-1.4 documento {i} '.encode() * 200
+            pacote.writestr(f'arquivos/{i}.pdf', conteudo)
+            escritor.writerow([f'colaborador{i % total_colaboradores}@empresa.com', f'Documento {i}', tipo,
+                               '2030-01-01' if tipo == 'personalizado' else '', f'arquivos/{i}.pdf', ''])
+        pacote.writestr('documentos.csv', manifesto.getvalue())
+    return caminho_csv, caminho_zip, total_colaboradores
+
+
+def auditar(acao, descricao, tabela_afetada):
+    db.session.add(LogAuditoria(usuario_id=1, acao=acao, descricao=descricao, tabela_afetada=tabela_afetada))
+    db.session.commit()
+
+
+def caminho_antigo(caminho_zip, total_colaboradores, limite):
+    """Um documento por vez, com dois commits, como o formulário faz."""
+    with zipfile.ZipFile(caminho_zip) as pacote:
+        for i in range(limite):
+            with pacote.open(f'arquivos/{i}.pdf') as stream:
+                armazenado = salvar_stream(stream, f'{i}.pdf')
+            documento = Documento(colaborador_id=i % total_colaboradores + 1, nome=f'Documento {i}',
+                                  tipo_validade='indeterminado', arquivo=armazenado.caminho,
+                                  arquivo_hash=armazenado.hash)
+            db.session.add(documento)
+            db.session.commit()
+            auditar('criar_documento', f'Documento {i}', 'documento')
+
+
+def rodar(total_documentos):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv, caminho_zip, total_colaboradores = gerar_arquivos(pasta, total_documentos)
+        app = criar_app(pasta)
+        with app.app_context():
+            db.create_all()
+            criar_indice_busca()
+
+            print(f'\n{total_documentos:,} documentos / {total_colaboradores:,} colaboradores')
+            inicio = time.perf_counter()
+            with open(caminho_csv, 'rb') as arquivo:
+                relatorio = importar_colaboradores(arquivo, auditar)
+            duracao = time.perf_counter() - inicio
+            print(f'  colaboradores: {relatorio.colaboradores:,} em {duracao:.2f}s '
+                  f'({relatorio.colaboradores / duracao:,.0f}/s), {len(relatorio.erros)} erro(s)')
+
+            inicio = time.perf_counter()
+            relatorio = importar_documentos(caminho_zip, auditar)
+            duracao = time.perf_counter() - inicio
+            print(f'  documentos:    {relatorio.documentos:,} em {duracao:.2f}s '
+                  f'({relatorio.documentos / duracao:,.0f}/s), {len(relatorio.erros)} erro(s), '
+                  f'{relatorio.lotes} lote(s)')
+
+            limite = min(total_documentos, 500)
+            inicio = time.perf_counter()
+            caminho_antigo(caminho_zip, total_colaboradores, limite)
+            duracao = time.perf_counter() - inicio
+            print(f'  um por vez:    {limite:,} em {duracao:.2f}s ({limite / duracao:,.0f}/s)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importação em lote de colaboradores e documentos.')
+    parser.add_argument('tamanhos', nargs='*', type=int, default=[10_000], help='quantidades de documentos')
+    args = parser.parse_args()
+    for tamanho in args.tamanhos:
+        rodar(tamanho)
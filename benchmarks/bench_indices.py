@@ -0,0 +1,136 @@
+"""Benchmark dos índices de Documento.
+
+Gera bancos SQLite temporários com N documentos, mede as consultas do
+dashboard e da tela de documentos por colaborador sem e com os índices
+declarados em models.py e mostra o plano de execução (EXPLAIN QUERY PLAN).
+
+Uso:
+    python benchmarks/bench_indices.py                 # 10k, 100k e 1M documentos
+    python benchmarks/bench_indices.py 10000 100000    # tamanhos escolhidos
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, text
+from models import db, Colaborador, Documento
+from cache import DashboardCache
+from migrations import aplicar_migracoes
+from utils import contar_status_por_colaborador
+
+DOCUMENTOS_POR_COLABORADOR = 20
+REPETICOES = 5
+
+
+def criar_app(caminho):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{caminho}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def popular(total_documentos):
+    rnd = random.Random(42)
+    hoje = date.today()
+    total_colaboradores = max(1, total_documentos // DOCUMENTOS_POR_COLABORADOR)
+
+    db.session.execute(insert(Colaborador), [
+        {'id': i, 'nome': f'Colaborador {i:07d}', 'departamento': f'Depto {i % 40}',
+         'cargo': 'Analista', 'created_at': datetime.utcnow()}
+        for i in range(1, total_colaboradores + 1)
+    ])
+
+    lote = []
+    for i in range(1, total_documentos + 1):
+        tipo = rnd.choice(['indeterminado', '3', '6', '12', 'personalizado'])
+        validade = None if tipo == 'indeterminado' else hoje + timedelta(days=rnd.randint(-720, 720))
+        lote.append({
+            'colaborador_id': rnd.randint(1, total_colaboradores),
+            'nome': rnd.choice(['CNH', 'ASO', 'NR-10', 'NR-35', 'Contrato', 'RG']),
+            'tipo_validade': tipo,
+            'data_validade': validade,
+            'data_upload': datetime.utcnow(),
+            'arquivo': f'doc_{i}.pdf',
+        })
+        if len(lote) == 50000:
+            db.session.execute(insert(Documento), lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(Documento), lote)
+    db.session.commit()
+    return total_colaboradores
+
+
+def medir(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tempos)
+
+
+def planos():
+    hoje = date.today()
+    consultas = {
+        'vencidos': ("SELECT count(*) FROM documento WHERE data_validade < :hoje "
+                     "AND tipo_validade != 'indeterminado'"),
+        'por colaborador': ("SELECT * FROM documento WHERE colaborador_id = :colaborador_id "
+                            "AND nome LIKE '%NR%'"),
+    }
+    for nome, sql in consultas.items():
+        linhas = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql),
+                                    {'hoje': hoje, 'colaborador_id': 1}).fetchall()
+        print(f'    plano {nome}: ' + ' | '.join(linha[-1] for linha in linhas))
+
+
+def rodar(total_documentos):
+    with tempfile.TemporaryDirectory() as pasta:
+        app = criar_app(os.path.join(pasta, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            # Começa sem os índices para medir o cenário antigo
+            for tabela in db.metadata.sorted_tables:
+                for indice in tabela.indexes:
+                    indice.drop(bind=db.engine)
+            total_colaboradores = popular(total_documentos)
+
+            ids_pagina = list(range(1, min(24, total_colaboradores) + 1))
+            cenarios = {
+                'dashboard': lambda: DashboardCache()._montar(date.today()),
+                'contagem /documentos': lambda: contar_status_por_colaborador(ids_pagina),
+                'documentos_colaborador': lambda: Documento.query.filter_by(
+                    colaborador_id=total_colaboradores // 2).filter(Documento.nome.ilike('%NR%')).all(),
+            }
+
+            print(f'\n{total_documentos:,} documentos / {total_colaboradores:,} colaboradores')
+            resultados = {}
+            for fase in ('sem índices', 'com índices'):
+                if fase == 'com índices':
+                    aplicar_migracoes()
+                db.session.remove()
+                print(f'  {fase}:')
+                planos()
+                for nome, funcao in cenarios.items():
+                    resultados[(fase, nome)] = medir(funcao)
+            for nome in cenarios:
+                antes = resultados[('sem índices', nome)]
+                depois = resultados[('com índices', nome)]
+                print(f'  {nome:<24} {antes:9.2f} ms -> {depois:9.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Consultas do dashboard e da tela de documentos sem e com índices.')
+    parser.add_argument('tamanhos', nargs='*', type=int, default=[10_000, 100_000, 1_000_000],
+                        help='quantidades de documentos')
+    args = parser.parse_args()
+    for tamanho in args.tamanhos:
+        rodar(tamanho)
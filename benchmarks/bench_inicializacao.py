@@ -0,0 +1,96 @@
+"""Benchmark da inicialização da aplicação.
+
+Mede, cada etapa em um processo Python novo (como um worker do gunicorn ou
+uma sessão de testes), o tempo de:
+
+  - import app:        importar o módulo (Flask, SQLAlchemy, blueprints);
+  - create_app():      montar a aplicação com create_app();
+  - primeiro request:  GET /login pelo cliente de testes;
+  - init-db:           o que o import fazia antes de create_app() (create_all,
+                       migrações, índice de busca, contadores e usuário admin),
+                       hoje só em `flask init-db`.
+
+Também mostra o tempo de um fork depois de create_app(), que é o custo por
+worker com `gunicorn --preload wsgi:app`.
+
+Uso:
+    python benchmarks/bench_inicializacao.py        # 10 repetições
+    python benchmarks/bench_inicializacao.py 30     # repetições escolhidas
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em cada processo novo; imprime os tempos em JSON
+SCRIPT = r'''
+import json, os, sys, time
+inicio = time.perf_counter()
+from app import create_app
+depois_import = time.perf_counter()
+app = create_app({'WTF_CSRF_ENABLED': False})
+depois_create = time.perf_counter()
+app.test_client().get('/login')
+depois_request = time.perf_counter()
+
+from models import db, User
+from migrations import aplicar_migracoes
+from busca import criar_indice_busca
+from alteracoes import criar_contadores
+with app.app_context():
+    db.create_all()
+    aplicar_migracoes()
+    criar_indice_busca()
+    criar_contadores()
+    User.query.filter_by(username='admin').first()
+depois_init = time.perf_counter()
+
+import gc
+gc.freeze()
+antes_fork = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    os._exit(0)
+os.waitpid(pid, 0)
+depois_fork = time.perf_counter()
+
+print(json.dumps({
+    'import app': depois_import - inicio,
+    'create_app()': depois_create - depois_import,
+    'primeiro request': depois_request - depois_create,
+    'init-db': depois_init - depois_request,
+    'fork': depois_fork - antes_fork,
+}))
+'''
+
+
+def medir(ambiente):
+    saida = subprocess.run([sys.executable, '-c', SCRIPT], cwd=RAIZ, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def rodar(repeticoes):
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(os.environ, PYTHONPATH=RAIZ,
+                        DATABASE_URL=f'sqlite:///{os.path.join(pasta, "bench.db")}')
+        medir(ambiente)  # cria o banco e aquece o cache de bytecode e do sistema de arquivos
+
+        amostras = [medir(ambiente) for _ in range(repeticoes)]
+
+    print(f'\n{repeticoes} processos (mediana / mínimo, ms)')
+    for etapa in amostras[0]:
+        tempos = [amostra[etapa] * 1000 for amostra in amostras]
+        print(f'  {etapa:<18} {statistics.median(tempos):8.1f} {min(tempos):8.1f}')
+    boot = [amostra['import app'] + amostra['create_app()'] for amostra in amostras]
+    antigo = [b + amostra['init-db'] for b, amostra in zip(boot, amostras)]
+    print(f'  {"boot do worker":<18} {statistics.median(boot) * 1000:8.1f}')
+    print(f'  {"boot + init-db":<18} {statistics.median(antigo) * 1000:8.1f}  (antes: a cada import)')
+
+
+if __name__ == '__main__':
+    rodar(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
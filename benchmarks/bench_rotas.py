@@ -0,0 +1,206 @@
+"""Benchmark ponta a ponta das rotas principais.
+
+Cria um banco SQLite temporário com dados sintéticos (dados_sinteticos.py),
+faz login como admin pelo cliente de testes do Flask e mede, por rota:
+
+  - latência p50/p95/p99 e média, em ms;
+  - consultas SQL por request (média e máximo);
+  - pico de memória Python alocada durante o request (tracemalloc, em uma
+    passada separada para não distorcer a latência).
+
+O dashboard é medido sem o cache em memória (DASHBOARD_CACHE_TTL = -1),
+ou seja, o custo de montar o snapshot. O resultado é gravado em JSON junto
+com o commit atual, para comparar execuções de commits diferentes.
+
+Uso:
+    python benchmarks/bench_rotas.py                              # 10k documentos, 200 requests por rota
+    python benchmarks/bench_rotas.py 100000 -n 500 -o depois.json
+    python benchmarks/bench_rotas.py 100000 -o depois.json --comparar antes.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from sqlalchemy import event, func, select
+from app import create_app
+from models import db, Colaborador, Documento
+from dados_sinteticos import gerar, ACOES
+
+AQUECIMENTO = 5
+AMOSTRAS_MEMORIA = 10
+# Variação acima disso (para pior) é marcada na comparação
+TOLERANCIA = 0.10
+
+
+def rotas(rnd, ids_colaboradores, ids_documentos, paginas_documentos):
+    """Nome da rota -> função que sorteia a URL do próximo request."""
+    acoes = [acao for acao, _, _ in ACOES]
+    return {
+        'dashboard': lambda: '/',
+        'documentos': lambda: f'/documentos?page={rnd.randint(1, paginas_documentos)}',
+        'documentos (busca)': lambda: f'/documentos?search={rnd.choice(["ASO", "NR-35", "Silva", "CNH"])}',
+        'documentos_colaborador': lambda: f'/colaborador/{rnd.choice(ids_colaboradores)}/documentos',
+        'auditoria': lambda: '/auditoria',
+        'auditoria (filtro)': lambda: f'/auditoria?acao={rnd.choice(acoes)}',
+        'download_documento': lambda: f'/download/{rnd.choice(ids_documentos)}',
+    }
+
+
+class ContadorConsultas:
+    """Conta as consultas executadas pela thread do request (o gravador de auditoria usa outra)."""
+
+    def __init__(self, engine):
+        self.total = 0
+        self._thread = threading.get_ident()
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        if threading.get_ident() == self._thread:
+            self.total += 1
+
+
+def percentil(ordenados, p):
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def medir_rota(cliente, contador, proxima_url, requisicoes):
+    for _ in range(AQUECIMENTO):
+        cliente.get(proxima_url()).close()
+
+    tempos, consultas, status = [], [], {}
+    for _ in range(requisicoes):
+        url = proxima_url()
+        antes = contador.total
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        resposta.get_data()  # downloads: consome o corpo como o servidor faria
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        resposta.close()
+        consultas.append(contador.total - antes)
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+
+    picos = []
+    tracemalloc.start()
+    for _ in range(AMOSTRAS_MEMORIA):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        resposta = cliente.get(proxima_url())
+        resposta.get_data()
+        resposta.close()
+        picos.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    tempos.sort()
+    return {
+        'requisicoes': requisicoes,
+        'p50_ms': round(percentil(tempos, 50), 3),
+        'p95_ms': round(percentil(tempos, 95), 3),
+        'p99_ms': round(percentil(tempos, 99), 3),
+        'media_ms': round(statistics.fmean(tempos), 3),
+        'consultas_media': round(statistics.fmean(consultas), 2),
+        'consultas_max': max(consultas),
+        'memoria_pico_kib': round(max(picos) / 1024, 1),
+        'status': {str(codigo): total for codigo, total in sorted(status.items())},
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rodar(documentos, requisicoes, semente):
+    with tempfile.TemporaryDirectory() as pasta:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(pasta, "bench.db")}',
+            'UPLOAD_FOLDER': os.path.join(pasta, 'uploads'),
+            'PREVIEW_PASTA': os.path.join(pasta, 'previews'),
+            'AUDITORIA_ARQUIVO_PENDENTE': os.path.join(pasta, 'auditoria_pendente.jsonl'),
+            'WTF_CSRF_ENABLED': False,
+            'DASHBOARD_CACHE_TTL': -1,
+        })
+        app.test_cli_runner().invoke(args=['init-db'])
+
+        with app.app_context():
+            inicio = time.perf_counter()
+            quantidades = gerar(documentos, semente=semente)
+            print(f'\n{documentos:,} documentos: dados gerados em {time.perf_counter() - inicio:.1f}s')
+            ids_colaboradores = db.session.scalars(select(Colaborador.id)).all()
+            ids_documentos = db.session.scalars(select(Documento.id)).all()
+            total_documentos = db.session.scalar(select(func.count(Documento.id)))
+            contador = ContadorConsultas(db.engine)
+            db.session.remove()
+
+        rnd = random.Random(semente)
+        paginas = max(1, min(total_documentos // 20, 50))  # as primeiras páginas, as mais acessadas
+        cliente = app.test_client()
+        cliente.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        resultados = {}
+        for nome, proxima_url in rotas(rnd, ids_colaboradores, ids_documentos, paginas).items():
+            resultados[nome] = medir_rota(cliente, contador, proxima_url, requisicoes)
+            r = resultados[nome]
+            print(f'  {nome:<24} p50 {r["p50_ms"]:8.2f}  p95 {r["p95_ms"]:8.2f}  p99 {r["p99_ms"]:8.2f} ms'
+                  f'  {r["consultas_media"]:5.1f} consultas  {r["memoria_pico_kib"]:9.1f} KiB')
+
+    return {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'semente': semente,
+        'dados': quantidades,
+        'rotas': resultados,
+    }
+
+
+def comparar(anterior, atual):
+    print(f'\ncomparação {anterior.get("commit")} -> {atual.get("commit")}')
+    if anterior.get('dados') != atual.get('dados'):
+        print('  aviso: os dados gerados são diferentes (tamanho ou semente)')
+    for nome, depois in atual['rotas'].items():
+        antes = anterior['rotas'].get(nome)
+        if not antes:
+            continue
+        colunas = []
+        regressao = False
+        for metrica in ('p50_ms', 'p95_ms', 'consultas_media', 'memoria_pico_kib'):
+            variacao = (depois[metrica] - antes[metrica]) / antes[metrica] if antes[metrica] else 0.0
+            regressao = regressao or variacao > TOLERANCIA
+            colunas.append(f'{metrica} {antes[metrica]:g} -> {depois[metrica]:g} ({variacao:+.0%})')
+        print(f'  {"!" if regressao else " "} {nome:<24} ' + '  '.join(colunas))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latência, consultas e memória por rota.')
+    parser.add_argument('documentos', nargs='?', type=int, default=10_000)
+    parser.add_argument('-n', '--requisicoes', type=int, default=200, help='requests medidos por rota')
+    parser.add_argument('-o', '--saida', help='grava o resultado em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    resultado = rodar(args.documentos, args.requisicoes, args.semente)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as destino:
+            json.dump(resultado, destino, indent=2, ensure_ascii=False)
+        print(f'\nresultado gravado em {args.saida}')
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as origem:
+            comparar(json.load(origem), resultado)
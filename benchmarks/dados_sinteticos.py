@@ -0,0 +1,232 @@
+"""Gerador de dados sintéticos (usuários, colaboradores, documentos e auditoria).
+
+Os dados saem sempre iguais para a mesma semente. As datas seguem o que se vê
+em produção: a maior parte dos documentos válidos, cerca de 12% vencidos
+(concentrados nos últimos meses) e 8% vencendo nos próximos 30 dias. Os
+departamentos têm tamanhos desiguais e o log de auditoria cobre o último ano
+em horário comercial. Os arquivos são poucos arquivos distintos gravados em
+UPLOAD_FOLDER (armazenamento por hash) e compartilhados entre os documentos,
+como os formulários repetidos de uma importação.
+
+As linhas são inseridas em lote, sem passar pelo ORM. Ao final o índice de
+busca e os contadores de conformidade são reconstruídos e as referências dos
+arquivos são recalculadas.
+
+Uso (acrescenta os dados ao banco de DATABASE_URL, depois de `flask init-db`):
+    python benchmarks/dados_sinteticos.py                      # 10k documentos
+    python benchmarks/dados_sinteticos.py 1000000 --semente 7  # 1M documentos
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select, update
+from werkzeug.security import generate_password_hash
+from models import db, User, Colaborador, Documento, LogAuditoria, UserAgent, Arquivo
+from storage import salvar_stream
+import busca
+import conformidade
+
+TAMANHO_LOTE = 10_000
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+         'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sabrina', 'Tiago',
+         'Vanessa', 'Wagner']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+              'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes']
+# (departamento, peso): produção e logística concentram a maior parte do quadro
+DEPARTAMENTOS = [('Produção', 30), ('Logística', 18), ('Manutenção', 10), ('Comercial', 9),
+                 ('Administrativo', 7), ('Qualidade', 6), ('TI', 5), ('RH', 4), ('Financeiro', 4),
+                 ('Segurança do Trabalho', 3), ('Jurídico', 2), ('Diretoria', 2)]
+CARGOS = ['Operador', 'Auxiliar', 'Analista', 'Técnico', 'Supervisor', 'Coordenador', 'Gerente']
+# (nome, tipo_validade, peso)
+TIPOS_DOCUMENTO = [('ASO', '12', 20), ('NR-35', '12', 10), ('NR-10', '12', 8), ('NR-33', '12', 5),
+                   ('CNH', 'personalizado', 10), ('Exame toxicológico', '6', 6),
+                   ('Treinamento de integração', '3', 6), ('Contrato de trabalho', 'indeterminado', 15),
+                   ('RG', 'indeterminado', 10), ('CPF', 'indeterminado', 10)]
+MESES = {'3': 3, '6': 6, '12': 12, 'personalizado': 60}
+ACOES = [('download_documento', 'documento', 45), ('login', 'user', 20), ('editar_documento', 'documento', 10),
+         ('criar_documento', 'documento', 10), ('renovar_documento', 'documento', 6),
+         ('editar_colaborador', 'colaborador', 4), ('criar_colaborador', 'colaborador', 3),
+         ('excluir_documento', 'documento', 2)]
+PAPEIS = [('visitante', 5), ('operador', 3), ('gestor', 2), ('administrador', 1)]
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+]
+
+
+def _inserir(modelo, linhas):
+    for inicio in range(0, len(linhas), TAMANHO_LOTE):
+        db.session.execute(insert(modelo), linhas[inicio:inicio + TAMANHO_LOTE])
+
+
+def _validade(rnd, tipo, hoje):
+    """(data_upload, data_validade) com ~12% vencidos e ~8% vencendo em 30 dias."""
+    if tipo == 'indeterminado':
+        return datetime.combine(hoje - timedelta(days=rnd.randint(0, 3650)), datetime.min.time()), None
+    sorteio = rnd.random()
+    if sorteio < 0.12:
+        # Vencidos: a maioria há poucas semanas (a renovação atrasou), alguns esquecidos há anos
+        validade = hoje - timedelta(days=min(int(rnd.expovariate(1 / 60)) + 1, 1500))
+    elif sorteio < 0.20:
+        validade = hoje + timedelta(days=rnd.randint(0, 30))
+    else:
+        validade = hoje + timedelta(days=rnd.randint(31, MESES[tipo] * 30))
+    upload = validade - timedelta(days=MESES[tipo] * 30) + timedelta(days=rnd.randint(-10, 0))
+    return datetime.combine(min(upload, hoje), datetime.min.time()), validade
+
+
+def _gravar_arquivos(rnd, quantidade):
+    """Grava `quantidade` arquivos distintos e devolve [(caminho, hash, tamanho)]."""
+    arquivos = []
+    for i in range(quantidade):
+        # PDF mínimo com tamanho variado (2 KB a 200 KB, a maioria pequena)
+        tamanho = min(int(rnd.lognormvariate(9.5, 1.0)), 200 * 1024)
+        conteudo = b'%PDF-1.4\n% documento sintetico ' + str(i).encode() + b'\n' + rnd.randbytes(tamanho)
+        registro = salvar_stream(io.BytesIO(conteudo), f'sintetico_{i}.pdf')
+        arquivos.append((registro.caminho, registro.hash, len(conteudo)))
+    db.session.commit()
+    return arquivos
+
+
+def gerar(documentos=10_000, colaboradores=None, usuarios=None, logs=None, arquivos=None, semente=42):
+    """Acrescenta dados sintéticos ao banco da aplicação atual (precisa de app context).
+
+    Por padrão há 10 documentos por colaborador, 2 registros de auditoria por
+    documento, 1 usuário para cada 200 colaboradores e até 500 arquivos
+    distintos. Retorna um dict com as quantidades geradas.
+    """
+    rnd = random.Random(semente)
+    hoje = date.today()
+    agora = datetime.utcnow()
+    colaboradores = colaboradores or max(1, documentos // 10)
+    usuarios = usuarios or max(2, colaboradores // 200)
+    logs = logs if logs is not None else documentos * 2
+    arquivos = arquivos or max(1, min(documentos, 500))
+
+    # Usuários (todos com a mesma senha: o hash é caro e seria o gargalo)
+    primeiro_usuario = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    senha = generate_password_hash('senha123')
+    papeis = [papel for papel, _ in PAPEIS]
+    pesos_papeis = [peso for _, peso in PAPEIS]
+    _inserir(User, [
+        {'id': primeiro_usuario + i, 'username': f'usuario{primeiro_usuario + i}',
+         'email': f'usuario{primeiro_usuario + i}@empresa.com', 'password_hash': senha,
+         'role': rnd.choices(papeis, pesos_papeis)[0], 'created_at': agora}
+        for i in range(usuarios)
+    ])
+    ids_usuarios = list(range(primeiro_usuario, primeiro_usuario + usuarios))
+
+    # Colaboradores
+    primeiro_colaborador = (db.session.scalar(select(func.max(Colaborador.id))) or 0) + 1
+    departamentos = [nome for nome, _ in DEPARTAMENTOS]
+    pesos_departamentos = [peso for _, peso in DEPARTAMENTOS]
+    linhas = []
+    for i in range(colaboradores):
+        colaborador_id = primeiro_colaborador + i
+        nome = f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}'
+        linhas.append({
+            'id': colaborador_id, 'nome': nome,
+            'email': f'colaborador{colaborador_id}@empresa.com',
+            'departamento': rnd.choices(departamentos, pesos_departamentos)[0],
+            'cargo': rnd.choice(CARGOS),
+            'data_admissao': hoje - timedelta(days=rnd.randint(0, 7300)),
+            'created_at': agora,
+        })
+    _inserir(Colaborador, linhas)
+    ids_colaboradores = range(primeiro_colaborador, primeiro_colaborador + colaboradores)
+
+    # Documentos
+    gravados = _gravar_arquivos(rnd, arquivos)
+    tipos = TIPOS_DOCUMENTO
+    pesos_tipos = [peso for _, _, peso in TIPOS_DOCUMENTO]
+    primeiro_documento = (db.session.scalar(select(func.max(Documento.id))) or 0) + 1
+    linhas = []
+    for i in range(documentos):
+        nome, tipo, _ = rnd.choices(tipos, pesos_tipos)[0]
+        data_upload, data_validade = _validade(rnd, tipo, hoje)
+        caminho, arquivo_hash, tamanho = rnd.choice(gravados)
+        linhas.append({
+            'colaborador_id': rnd.choice(ids_colaboradores), 'nome': nome, 'tipo_validade': tipo,
+            'data_upload': data_upload, 'data_validade': data_validade,
+            'arquivo': caminho, 'arquivo_hash': arquivo_hash, 'nome_arquivo': f'{nome}.pdf',
+            'tamanho_bytes': tamanho, 'usuario_id': rnd.choice(ids_usuarios),
+        })
+        if len(linhas) == TAMANHO_LOTE:
+            _inserir(Documento, linhas)
+            linhas = []
+    _inserir(Documento, linhas)
+
+    # Auditoria
+    existentes = set(db.session.scalars(select(UserAgent.texto).where(UserAgent.texto.in_(USER_AGENTS))))
+    _inserir(UserAgent, [{'texto': texto} for texto in USER_AGENTS if texto not in existentes])
+    ids_agentes = db.session.scalars(select(UserAgent.id).where(UserAgent.texto.in_(USER_AGENTS))).all()
+    acoes = [(acao, tabela) for acao, tabela, _ in ACOES]
+    pesos_acoes = [peso for _, _, peso in ACOES]
+    linhas = []
+    for i in range(logs):
+        acao, tabela = rnd.choices(acoes, pesos_acoes)[0]
+        if tabela == 'documento':
+            registro_id = primeiro_documento + rnd.randrange(documentos) if documentos else None
+        elif tabela == 'colaborador':
+            registro_id = rnd.choice(ids_colaboradores)
+        else:
+            registro_id = None
+        dia = hoje - timedelta(days=rnd.randint(0, 364))
+        momento = datetime.combine(dia, datetime.min.time()) + timedelta(
+            hours=rnd.randint(8, 17), minutes=rnd.randint(0, 59), seconds=rnd.randint(0, 59))
+        linhas.append({
+            'usuario_id': rnd.choice(ids_usuarios), 'acao': acao,
+            'descricao': f'{acao.replace("_", " ").capitalize()} (sintético)',
+            'tabela_afetada': tabela, 'registro_id': registro_id,
+            'ip_address': f'10.0.{rnd.randint(0, 20)}.{rnd.randint(1, 254)}',
+            'user_agent_id': rnd.choice(ids_agentes), 'created_at': momento,
+        })
+        if len(linhas) == TAMANHO_LOTE:
+            _inserir(LogAuditoria, linhas)
+            linhas = []
+    _inserir(LogAuditoria, linhas)
+
+    # Cada documento que aponta para o arquivo é uma referência
+    referencias = (select(func.count(Documento.id)).where(Documento.arquivo_hash == Arquivo.hash)
+                   .scalar_subquery())
+    db.session.execute(update(Arquivo).values(referencias=referencias))
+    db.session.commit()
+
+    # Inserções em lote não passam pelo ORM, que é quem mantém o índice de busca
+    # e os contadores de conformidade
+    if busca.disponivel():
+        busca.reindexar()
+    conformidade.reconstruir()
+
+    return {'usuarios': usuarios, 'colaboradores': colaboradores, 'documentos': documentos,
+            'logs': logs, 'arquivos': arquivos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Acrescenta dados sintéticos ao banco configurado.')
+    parser.add_argument('documentos', nargs='?', type=int, default=10_000)
+    parser.add_argument('--colaboradores', type=int)
+    parser.add_argument('--usuarios', type=int)
+    parser.add_argument('--logs', type=int)
+    parser.add_argument('--arquivos', type=int)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        inicio = time.perf_counter()
+        quantidades = gerar(args.documentos, args.colaboradores, args.usuarios, args.logs,
+                            args.arquivos, args.semente)
+        print(', '.join(f'{valor:,} {nome}' for nome, valor in quantidades.items()),
+              f'em {time.perf_counter() - inicio:.1f}s')
@@ -0,0 +1,179 @@
+import re
+from sqlalchemy import Integer, column, event, text
+from sqlalchemy.orm import Session
+from models import db, Colaborador, Documento
+
+# Índice de busca textual (SQLite FTS5)
+#
+# Uma única tabela virtual guarda colaboradores e documentos. O rowid codifica
+# o tipo e o id do registro (id * 4 + tipo), o que permite atualizar/remover
+# uma entrada sem varrer o índice. O tokenizador unicode61 com
+# remove_diacritics faz "joao" encontrar "João".
+
+TIPOS = {'colaborador': 1, 'documento': 2, 'conteudo': 3}  # conteudo: texto extraído do arquivo
+
+_CRIAR_TABELA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(
+    tipo UNINDEXED,
+    ref_id UNINDEXED,
+    colaborador_id UNINDEXED,
+    titulo,
+    texto,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+
+def _rowid(tipo, ref_id):
+    return ref_id * 4 + TIPOS[tipo]
+
+
+def disponivel(bind=None):
+    bind = bind or db.engine
+    return bind.dialect.name == 'sqlite'
+
+
+def criar_indice_busca():
+    """Cria o índice se ainda não existir e o preenche. Retorna True se foi (re)construído."""
+    if not disponivel():
+        return False
+    with db.engine.begin() as conn:
+        existe = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busca_fts'")).first()
+        if existe:
+            return False
+        conn.execute(text(_CRIAR_TABELA))
+        _reconstruir(conn)
+    return True
+
+
+def reindexar():
+    """Reconstrói o índice inteiro a partir das tabelas."""
+    with db.engine.begin() as conn:
+        conn.execute(text(_CRIAR_TABELA))
+        conn.execute(text('DELETE FROM busca_fts'))
+        _reconstruir(conn)
+        conn.execute(text("INSERT INTO busca_fts(busca_fts) VALUES ('optimize')"))
+
+
+def _reconstruir(conn):
+    conn.execute(text("""
+        INSERT INTO busca_fts(rowid, tipo, ref_id, colaborador_id, titulo, texto)
+        SELECT id * 4 + :tipo, 'colaborador', id, id, nome,
+               coalesce(departamento, '') || ' ' || coalesce(cargo, '') || ' ' || coalesce(email, '')
+        FROM colaborador
+    """), {'tipo': TIPOS['colaborador']})
+    conn.execute(text("""
+        INSERT INTO busca_fts(rowid, tipo, ref_id, colaborador_id, titulo, texto)
+        SELECT id * 4 + :tipo, 'documento', id, colaborador_id, nome,
+               coalesce(observacoes, '') || ' ' || coalesce(nome_arquivo, '')
+        FROM documento
+    """), {'tipo': TIPOS['documento']})
+    conn.execute(text("""
+        INSERT INTO busca_fts(rowid, tipo, ref_id, colaborador_id, titulo, texto)
+        SELECT d.id * 4 + :tipo, 'conteudo', d.id, d.colaborador_id, d.nome, c.texto
+        FROM conteudo_documento c JOIN documento d ON d.id = c.documento_id
+    """), {'tipo': TIPOS['conteudo']})
+
+
+def _entrada(obj):
+    if isinstance(obj, Colaborador):
+        return {
+            'rowid': _rowid('colaborador', obj.id), 'tipo': 'colaborador', 'ref_id': obj.id,
+            'colaborador_id': obj.id, 'titulo': obj.nome,
+            'texto': ' '.join(filter(None, [obj.departamento, obj.cargo, obj.email])),
+        }
+    return {
+        'rowid': _rowid('documento', obj.id), 'tipo': 'documento', 'ref_id': obj.id,
+        'colaborador_id': obj.colaborador_id, 'titulo': obj.nome,
+        'texto': ' '.join(filter(None, [obj.observacoes, obj.nome_arquivo])),
+    }
+
+
+def indexar_conteudo(conn, documento_id, colaborador_id, titulo, texto):
+    if not disponivel(conn):
+        return
+    rowid = _rowid('conteudo', documento_id)
+    conn.execute(text('DELETE FROM busca_fts WHERE rowid = :rowid'), {'rowid': rowid})
+    conn.execute(text("""
+        INSERT INTO busca_fts(rowid, tipo, ref_id, colaborador_id, titulo, texto)
+        VALUES (:rowid, 'conteudo', :ref_id, :colaborador_id, :titulo, :texto)
+    """), {'rowid': rowid, 'ref_id': documento_id, 'colaborador_id': colaborador_id,
+          'titulo': titulo, 'texto': texto})
+
+
+def remover_do_indice(conn, tipo, ids):
+    """Para operações em lote (UPDATE/DELETE direto) que não passam pelos eventos do ORM."""
+    if ids and disponivel(conn):
+        conn.execute(text('DELETE FROM busca_fts WHERE rowid = :rowid'),
+                     [{'rowid': _rowid(tipo, ref_id)} for ref_id in ids])
+
+
+@event.listens_for(Session, 'after_flush')
+def _sincronizar(session, flush_context):
+    # Roda na mesma transação do flush: rollback desfaz também o índice
+    alterados = [obj for obj in session.new if isinstance(obj, (Colaborador, Documento))]
+    alterados += [obj for obj in session.dirty
+                  if isinstance(obj, (Colaborador, Documento)) and session.is_modified(obj)]
+    removidos = [obj for obj in session.deleted if isinstance(obj, (Colaborador, Documento))]
+    if not alterados and not removidos:
+        return
+
+    conn = session.connection()
+    if not disponivel(conn):
+        return
+    rowids = [{'rowid': _rowid('colaborador' if isinstance(obj, Colaborador) else 'documento', obj.id)}
+              for obj in alterados + removidos]
+    rowids += [{'rowid': _rowid('conteudo', obj.id)} for obj in removidos if isinstance(obj, Documento)]
+    conn.execute(text('DELETE FROM busca_fts WHERE rowid = :rowid'), rowids)
+    if alterados:
+        conn.execute(text("""
+            INSERT INTO busca_fts(rowid, tipo, ref_id, colaborador_id, titulo, texto)
+            VALUES (:rowid, :tipo, :ref_id, :colaborador_id, :titulo, :texto)
+        """), [_entrada(obj) for obj in alterados])
+
+
+def _expressao(termo):
+    """Converte o texto digitado em uma consulta FTS5 por prefixo ("joao sil" -> "joao"* "sil"*)."""
+    palavras = re.findall(r'\w+', termo or '')
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def ids_correspondentes(termo, tipo, colaborador_id=None):
+    """Subconsulta com os ids do tipo pedido que casam com o termo (para usar em .in_())."""
+    # Documentos também são encontrados pelo texto extraído do arquivo
+    tipos = ('documento', 'conteudo') if tipo == 'documento' else (tipo,)
+    sql = 'SELECT DISTINCT ref_id FROM busca_fts WHERE busca_fts MATCH :expressao AND tipo IN (:tipo, :tipo_extra)'
+    parametros = {'expressao': _expressao(termo), 'tipo': tipos[0], 'tipo_extra': tipos[-1]}
+    if colaborador_id is not None:
+        sql += ' AND colaborador_id = :colaborador_id'
+        parametros['colaborador_id'] = colaborador_id
+    return text(sql).bindparams(**parametros).columns(column('ref_id', Integer))
+
+
+def filtrar_colaboradores(query, termo):
+    if disponivel() and _expressao(termo):
+        return query.filter(Colaborador.id.in_(ids_correspondentes(termo, 'colaborador')))
+    return query.filter(Colaborador.nome.ilike(f'%{termo}%'))
+
+
+def filtrar_documentos(query, termo, colaborador_id=None):
+    if disponivel() and _expressao(termo):
+        return query.filter(Documento.id.in_(ids_correspondentes(termo, 'documento', colaborador_id)))
+    return query.filter(Documento.nome.ilike(f'%{termo}%'))
+
+
+def buscar(termo, limite=10):
+    """Resultados ordenados por relevância (bm25) para a busca rápida."""
+    expressao = _expressao(termo)
+    if not expressao or not disponivel():
+        return []
+    linhas = db.session.execute(text("""
+        SELECT tipo, ref_id, colaborador_id, titulo,
+               snippet(busca_fts, 4, '[', ']', '...', 8) AS trecho
+        FROM busca_fts
+        WHERE busca_fts MATCH :expressao
+        ORDER BY bm25(busca_fts, 0, 0, 0, 10.0, 1.0)
+        LIMIT :limite
+    """), {'expressao': expressao, 'limite': limite})
+    return [dict(linha._mapping) for linha in linhas]
@@ -0,0 +1,118 @@
+from collections import namedtuple
+from datetime import datetime
+from threading import Lock
+import time
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import make_transient_to_detached
+from models import db, Colaborador, Documento, User
+from utils import contagens_status, filtro_vencidos, filtro_proximos_vencer
+
+# Linha compacta usada nas listas do dashboard (nome do colaborador já resolvido)
+DocumentoResumo = namedtuple('DocumentoResumo', ['id', 'nome', 'colaborador_id', 'colaborador_nome', 'data_validade'])
+
+DashboardSnapshot = namedtuple('DashboardSnapshot', [
+    'dia', 'total_colaboradores', 'total_documentos',
+    'total_vencidos', 'total_proximos',
+    'documentos_vencidos', 'documentos_proximos'
+])
+
+
+class DashboardCache:
+    """Snapshot do dashboard mantido em memória por processo.
+
+    O snapshot é descartado quando documentos/colaboradores são alterados
+    (invalidar()), quando o dia muda (o status depende de `hoje`) ou após
+    DASHBOARD_CACHE_TTL segundos, o que limita a defasagem entre workers.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+        self._criado_em = 0.0
+
+    def obter(self):
+        hoje = datetime.now().date()
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 60)
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is None or snapshot.dia != hoje
+                    or time.monotonic() - self._criado_em > ttl):
+                snapshot = self._montar(hoje)
+                self._snapshot = snapshot
+                self._criado_em = time.monotonic()
+            return snapshot
+
+    def invalidar(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _montar(self, hoje):
+        limite = current_app.config.get('DASHBOARD_LIMITE', 50)
+        vencidos = filtro_vencidos(hoje)
+        proximos = filtro_proximos_vencer(hoje)
+
+        # Um único agregado para os três contadores de documentos
+        total_documentos, total_vencidos, total_proximos = db.session.query(*contagens_status(hoje)).one()
+        total_colaboradores = db.session.query(func.count(Colaborador.id)).scalar()
+
+        def listar(filtro, ordem):
+            linhas = db.session.query(
+                Documento.id, Documento.nome, Documento.colaborador_id,
+                Colaborador.nome, Documento.data_validade
+            ).join(Colaborador, Documento.colaborador_id == Colaborador.id).filter(
+                filtro
+            ).order_by(ordem, Documento.id).limit(limite)
+            return tuple(DocumentoResumo(*linha) for linha in linhas)
+
+        return DashboardSnapshot(
+            dia=hoje,
+            total_colaboradores=total_colaboradores,
+            total_documentos=total_documentos or 0,
+            total_vencidos=total_vencidos or 0,
+            total_proximos=total_proximos or 0,
+            documentos_vencidos=listar(vencidos, Documento.data_validade.desc()),
+            documentos_proximos=listar(proximos, Documento.data_validade.asc())
+        )
+
+
+class UsuarioCache:
+    """Cache curto dos usuários carregados pelo Flask-Login a cada request.
+
+    Guarda só os valores das colunas; no acerto o User é recriado e anexado à
+    sessão atual sem consulta (merge com load=False). Entradas vencem após
+    USUARIO_CACHE_TTL segundos e são invalidadas ao editar o usuário.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entradas = {}
+
+    def obter(self, user_id):
+        ttl = current_app.config.get('USUARIO_CACHE_TTL', 30)
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+        
+        if entrada and agora - entrada[0] <= ttl:
+            user = User(**entrada[1])
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            valores = {coluna.key: getattr(user, coluna.key) for coluna in User.__table__.columns}
+            with self._lock:
+                self._entradas[user_id] = (agora, valores)
+        return user
+
+    def invalidar(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(user_id, None)
+
+
+dashboard_cache = DashboardCache()
+usuario_cache = UsuarioCache()
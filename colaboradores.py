@@ -0,0 +1,140 @@
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+from models import db, Colaborador, Documento
+from forms import ColaboradorForm, ImportacaoForm
+from cache import dashboard_cache
+from log_auditoria import registrar_log
+from extracao import extrator_texto
+from importacao import RelatorioImportacao, importar_colaboradores, importar_documentos
+from consultas import listar_colaboradores
+
+colaboradores_bp = Blueprint('colaboradores', __name__)
+
+@colaboradores_bp.route('/colaboradores')
+@login_required
+def colaboradores():
+    if not current_user.has_permission('add_colaborador'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    return render_template('colaboradores.html', colaboradores=listar_colaboradores())
+
+@colaboradores_bp.route('/colaborador/novo', methods=['GET', 'POST'])
+@login_required
+def novo_colaborador():
+    if not current_user.has_permission('add_colaborador'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    form = ColaboradorForm()
+    if form.validate_on_submit():
+        try:
+            colaborador = Colaborador(
+                nome=form.nome.data,
+                email=form.email.data,
+                departamento=form.departamento.data,
+                cargo=form.cargo.data,
+                data_admissao=form.data_admissao.data
+            )
+            db.session.add(colaborador)
+            db.session.commit()
+            dashboard_cache.invalidar()
+            
+            # REGISTRAR LOG
+            registrar_log(
+                acao='criar_colaborador',
+                descricao=f'Colaborador {form.nome.data} criado no departamento {form.departamento.data}',
+                tabela_afetada='colaborador',
+                registro_id=colaborador.id
+            )
+            
+            flash('Colaborador cadastrado com sucesso!', 'success')
+            return redirect(url_for('colaboradores.colaboradores'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Erro ao cadastrar colaborador', 'danger')
+    
+    return render_template('colaborador_form.html', form=form, title='Novo Colaborador')
+
+@colaboradores_bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    if not (current_user.has_permission('add_colaborador') and current_user.has_permission('add_documento')):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    form = ImportacaoForm()
+    relatorio = None
+    if form.validate_on_submit():
+        relatorio = RelatorioImportacao()
+        try:
+            # Colaboradores primeiro: o manifesto de documentos pode referenciar os recém-importados
+            if form.colaboradores.data:
+                importar_colaboradores(form.colaboradores.data.stream, registrar_log, relatorio)
+            if form.documentos.data:
+                importar_documentos(form.documentos.data.stream, registrar_log, relatorio, usuario_id=current_user.id)
+            flash(f'Importação concluída: {relatorio.colaboradores} colaborador(es) e '
+                  f'{relatorio.documentos} documento(s); {len(relatorio.erros)} linha(s) com erro',
+                  'success' if not relatorio.erros else 'warning')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro na importação: {str(e)}', 'danger')
+        finally:
+            if relatorio.colaboradores or relatorio.documentos:
+                dashboard_cache.invalidar()
+            extrator_texto.agendar_lote(relatorio.documentos_ids)
+    
+    return render_template('importar.html', form=form, relatorio=relatorio)
+
+@colaboradores_bp.route('/colaborador/editar/<int:colaborador_id>', methods=['GET', 'POST'])
+@login_required
+def editar_colaborador(colaborador_id):
+    if not current_user.has_permission('add_colaborador'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    colaborador = Colaborador.query.get_or_404(colaborador_id)
+    form = ColaboradorForm(obj=colaborador)
+    
+    if form.validate_on_submit():
+        try:
+            # Registrar alterações para o log
+            alteracoes = []
+            if colaborador.nome != form.nome.data:
+                alteracoes.append(f"nome: {colaborador.nome} -> {form.nome.data}")
+            if colaborador.email != form.email.data:
+                alteracoes.append(f"email: {colaborador.email} -> {form.email.data}")
+            if colaborador.departamento != form.departamento.data:
+                alteracoes.append(f"departamento: {colaborador.departamento} -> {form.departamento.data}")
+            if colaborador.cargo != form.cargo.data:
+                alteracoes.append(f"cargo: {colaborador.cargo} -> {form.cargo.data}")
+            if colaborador.data_admissao != form.data_admissao.data:
+                alteracoes.append(f"data_admissao: {colaborador.data_admissao} -> {form.data_admissao.data}")
+            
+            colaborador.nome = form.nome.data
+            colaborador.email = form.email.data
+            colaborador.departamento = form.departamento.data
+            colaborador.cargo = form.cargo.data
+            colaborador.data_admissao = form.data_admissao.data
+            
+            db.session.commit()
+            dashboard_cache.invalidar()
+            
+            # REGISTRAR LOG
+            if alteracoes:
+                registrar_log(
+                    acao='editar_colaborador',
+                    descricao=f'Colaborador {colaborador.nome} alterado: {", ".join(alteracoes)}',
+                    tabela_afetada='colaborador',
+                    registro_id=colaborador.id
+                )
+            
+            flash('Colaborador atualizado com sucesso!', 'success')
+            return redirect(url_for('colaboradores.colaboradores'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Erro ao atualizar colaborador', 'danger')
+    
+    total_documentos = Documento.query.filter_by(colaborador_id=colaborador.id).count()
+    return render_template('colaborador_form.html', form=form, colaborador=colaborador,
+                           total_documentos=total_documentos, title='Editar Colaborador')
@@ -0,0 +1,241 @@
+import json
+import os
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db, User
+from migrations import aplicar_migracoes
+from log_auditoria import gravador_auditoria
+from busca import criar_indice_busca, reindexar
+from alteracoes import criar_contadores
+from vencimentos import verificar_vencimentos, enviar_resumos
+from retencao_auditoria import arquivar_auditoria, buscar_no_arquivo, compactar_banco, internar_user_agents_existentes
+from storage import remover_arquivos, removedor_arquivos, arquivos_sem_referencia
+from versoes import aplicar_retencao
+from extracao import processar_pendentes
+from importacao import RelatorioImportacao, importar_colaboradores, importar_documentos
+from previews import gerar_previews
+from conformidade import dia_referencia, reclassificar, reconstruir
+from exportacao import FORMATOS, SITUACOES, gerar, relatorio_colaboradores, relatorio_vencimentos, relatorio_auditoria
+
+# Comandos de linha (flask <comando>), registrados em create_app()
+
+@click.command('auditoria-status')
+@with_appcontext
+def auditoria_status():
+    """Mostra as métricas da fila de auditoria e reprocessa pendências em arquivo"""
+    reprocessados = gravador_auditoria.reprocessar_arquivo()
+    if reprocessados:
+        print(f"{reprocessados} registro(s) pendente(s) gravados no banco")
+    for nome, valor in gravador_auditoria.metricas().items():
+        print(f"{nome}: {valor}")
+
+@click.command('auditoria-arquivar')
+@click.option('--dias', type=int, default=None, help='Idade mínima dos registros (padrão: AUDITORIA_RETENCAO_DIAS)')
+@click.option('--vacuum', is_flag=True, help='Executa VACUUM no final (SQLite)')
+@with_appcontext
+def auditoria_arquivar(dias, vacuum):
+    """Move registros antigos de auditoria para o arquivo morto compactado"""
+    print(f"{internar_user_agents_existentes()} registro(s) com user_agent compactado")
+    print(f"{arquivar_auditoria(dias)} registro(s) arquivado(s)")
+    if vacuum and compactar_banco():
+        print("VACUUM concluído")
+
+@click.command('auditoria-buscar')
+@click.option('--usuario-id', type=int, default=None)
+@click.option('--tabela', default=None)
+@click.option('--registro-id', type=int, default=None)
+@click.option('--mes', default=None, help='AAAA-MM')
+@with_appcontext
+def auditoria_buscar(usuario_id, tabela, registro_id, mes):
+    """Consulta registros no arquivo morto da auditoria"""
+    for registro in buscar_no_arquivo(usuario_id, tabela, registro_id, mes):
+        print(json.dumps(registro, ensure_ascii=False))
+
+@click.command('verificar-vencimentos')
+@click.option('--sem-notificar', is_flag=True, help='Só registra as transições, sem enviar resumos')
+@click.option('--intervalo', type=int, default=0, help='Repete a cada N segundos (modo worker)')
+@with_appcontext
+def verificar_vencimentos_cmd(sem_notificar, intervalo):
+    """Registra mudanças de status de vencimento e envia o resumo aos gestores"""
+    while True:
+        print(f"{verificar_vencimentos()} transição(ões) registrada(s)")
+        if not sem_notificar:
+            print(f"{enviar_resumos()} resumo(s) enviado(s)")
+        if not intervalo:
+            break
+        db.session.remove()
+        time.sleep(intervalo)
+
+@click.command('busca-reindexar')
+@with_appcontext
+def busca_reindexar():
+    """Reconstrói o índice de busca textual"""
+    reindexar()
+    print("Índice de busca reconstruído")
+
+@click.command('extrair-textos')
+@click.option('--processos', type=int, default=None, help='Processos em paralelo (padrão: núcleos da máquina)')
+@click.option('--so-pendentes', is_flag=True, help='Ignora documentos enviados antes da extração existir')
+@with_appcontext
+def extrair_textos(processos, so_pendentes):
+    """Extrai e indexa o texto dos arquivos PDF/DOCX pendentes"""
+    total = processar_pendentes(processos, incluir_sem_status=not so_pendentes)
+    print(f"{total} documento(s) processado(s)")
+
+@click.command('importar')
+@click.option('--colaboradores', 'arquivo_colaboradores', type=click.File('rb'), help='CSV de colaboradores')
+@click.option('--documentos', 'arquivo_documentos', type=click.Path(exists=True, dir_okay=False), help='ZIP com documentos.csv e os arquivos')
+@click.option('--usuario', default='admin', help='Usuário registrado na auditoria')
+@click.option('--lote', type=int, default=500, help='Linhas por transação')
+@click.option('--extrair', is_flag=True, help='Extrai o texto dos documentos importados ao final')
+@with_appcontext
+def importar_cmd(arquivo_colaboradores, arquivo_documentos, usuario, lote, extrair):
+    """Importa colaboradores (CSV) e documentos (ZIP) em lote"""
+    autor = User.query.filter_by(username=usuario).first()
+    if autor is None:
+        raise click.BadParameter(f'usuário {usuario} não encontrado', param_hint='--usuario')
+    autor_id = autor.id
+
+    def auditar(acao, descricao, tabela_afetada):
+        gravador_auditoria.registrar(dict(usuario_id=autor_id, acao=acao, descricao=descricao,
+                                          tabela_afetada=tabela_afetada, registro_id=None,
+                                          ip_address=None, user_agent='flask importar',
+                                          created_at=datetime.utcnow()))
+
+    inicio = time.perf_counter()
+    relatorio = RelatorioImportacao()
+    if arquivo_colaboradores:
+        importar_colaboradores(arquivo_colaboradores, auditar, relatorio, tamanho_lote=lote)
+    if arquivo_documentos:
+        importar_documentos(arquivo_documentos, auditar, relatorio, tamanho_lote=lote, usuario_id=autor_id)
+    duracao = time.perf_counter() - inicio
+    gravador_auditoria.descarregar()
+
+    for origem, linha, mensagem in relatorio.erros:
+        print(f"{origem}:{linha}: {mensagem}")
+    print(f"{relatorio.colaboradores} colaborador(es) e {relatorio.documentos} documento(s) importados "
+          f"em {relatorio.lotes} lote(s), {duracao:.1f}s; {len(relatorio.erros)} linha(s) com erro")
+    if extrair and relatorio.documentos:
+        print(f"{processar_pendentes(incluir_sem_status=False)} documento(s) processado(s) pela extração de texto")
+
+@click.command('limpar-uploads')
+@click.option('--apagar', is_flag=True, help='Apaga os arquivos (sem a opção, apenas lista)')
+@with_appcontext
+def limpar_uploads(apagar):
+    """Procura em uploads/ arquivos que nenhum documento usa"""
+    orfaos = list(arquivos_sem_referencia())
+    for caminho in orfaos:
+        print(caminho)
+    if apagar:
+        remover_arquivos(orfaos)
+        print(f"{len(orfaos)} arquivo(s) removido(s)")
+    else:
+        print(f"{len(orfaos)} arquivo(s) sem referência (use --apagar para remover)")
+
+@click.command('versoes-retencao')
+@click.option('--manter', type=int, default=None, help='Arquivos distintos por documento (padrão: VERSOES_MANTER)')
+@click.option('--dias', type=int, default=None, help='Remove versões substituídas há mais dias (padrão: VERSOES_DIAS)')
+@with_appcontext
+def versoes_retencao(manter, dias):
+    """Aplica a política de retenção ao histórico de versões"""
+    caminhos = aplicar_retencao(manter=manter, dias=dias)
+    db.session.commit()
+    removedor_arquivos.agendar(caminhos)
+    removedor_arquivos.descarregar()
+    print(f"{len(caminhos)} arquivo(s) liberado(s)")
+
+@click.command('gerar-previews')
+@click.option('--processos', type=int, default=None, help='Processos em paralelo (padrão: todos os núcleos)')
+@with_appcontext
+def gerar_previews_cmd(processos):
+    """Pré-gera as miniaturas que faltam no cache de previews"""
+    geradas, sem_preview = gerar_previews(processos=processos)
+    print(f"{geradas} miniatura(s) gerada(s), {sem_preview} documento(s) sem miniatura possível")
+
+@click.command('exportar')
+@click.argument('relatorio', type=click.Choice(['colaboradores', 'vencimentos', 'auditoria']))
+@click.option('--formato', type=click.Choice(list(FORMATOS)), default='csv')
+@click.option('--saida', type=click.File('wb'), default='-', help='Arquivo de destino (padrão: saída padrão)')
+@click.option('--situacao', type=click.Choice(SITUACOES), default='todos', help='Vencimentos: quais documentos')
+@click.option('--usuario-id', type=int, default=None, help='Auditoria: filtra pelo usuário')
+@click.option('--acao', default='', help='Auditoria: filtra pela ação')
+@click.option('--tabela', default='', help='Auditoria: filtra pela tabela')
+@click.option('--data-inicio', type=click.DateTime(['%Y-%m-%d']), default=None, help='Auditoria: AAAA-MM-DD')
+@click.option('--data-fim', type=click.DateTime(['%Y-%m-%d']), default=None, help='Auditoria: AAAA-MM-DD')
+@with_appcontext
+def exportar_cmd(relatorio, formato, saida, situacao, usuario_id, acao, tabela, data_inicio, data_fim):
+    """Exporta colaboradores, vencimentos ou a auditoria em CSV/XLSX"""
+    if relatorio == 'colaboradores':
+        cabecalho, linhas = relatorio_colaboradores()
+    elif relatorio == 'vencimentos':
+        cabecalho, linhas = relatorio_vencimentos(situacao)
+    else:
+        cabecalho, linhas = relatorio_auditoria({
+            'usuario_id': usuario_id, 'acao': acao, 'tabela': tabela,
+            'data_inicio': data_inicio.date() if data_inicio else None,
+            'data_fim': data_fim.date() if data_fim else None,
+        })
+    for pedaco in gerar(formato, relatorio, cabecalho, linhas):
+        saida.write(pedaco)
+
+@click.command('conformidade-reclassificar')
+@with_appcontext
+def conformidade_reclassificar():
+    """Leva os contadores de conformidade para o dia de hoje (rodar uma vez por dia)"""
+    movidos = reclassificar()
+    if movidos is None:
+        print("Contadores de conformidade construídos")
+    else:
+        print(f"{movidos} documento(s) mudaram de status")
+
+@click.command('conformidade-reconstruir')
+@with_appcontext
+def conformidade_reconstruir():
+    """Recalcula do zero os contadores de conformidade por colaborador e status"""
+    print(f"{reconstruir()} contador(es) recalculado(s)")
+
+# Criar banco de dados e usuário admin padrão (uma vez por implantação, não a cada worker)
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Cria as tabelas, aplica as migrações e cria o usuário admin padrão"""
+    db.create_all()
+    for alteracao in aplicar_migracoes():
+        print(f"Migração aplicada: {alteracao}")
+    if criar_indice_busca():
+        print("Índice de busca criado")
+    if criar_contadores():
+        print("Contadores de alteração criados")
+    if dia_referencia() is None:
+        reconstruir()
+        print("Contadores de conformidade criados")
+    # Criar usuário admin padrão se não existir
+    if not User.query.filter_by(username='admin').first():
+        admin = User(username='admin', email='admin@empresa.com', role='administrador')
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("Usuário admin criado: admin / admin123")
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    print(f"Banco pronto: {db.engine.url.render_as_string(hide_password=True)}")
+
+
+COMANDOS = (
+    auditoria_status,
+    auditoria_arquivar,
+    auditoria_buscar,
+    verificar_vencimentos_cmd,
+    busca_reindexar,
+    extrair_textos,
+    importar_cmd,
+    limpar_uploads,
+    versoes_retencao,
+    gerar_previews_cmd,
+    exportar_cmd,
+    conformidade_reclassificar,
+    conformidade_reconstruir,
+    init_db,
+)
@@ -0,0 +1,241 @@
+from collections import namedtuple
+from datetime import date, timedelta
+from flask import Blueprint, render_template
+from flask_login import login_required
+from sqlalchemy import case, delete, event, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session, object_session
+from models import db, Colaborador, ContadorStatus, ContadorStatusReferencia, Documento
+from utils import filtro_vencidos, filtro_proximos_vencer
+
+# Contadores de conformidade por departamento
+#
+# contador_status guarda, para cada colaborador, quantos documentos estão em
+# cada status no dia de referência, com o departamento copiado do
+# colaborador. O painel soma essas linhas pelo índice (departamento, status,
+# quantidade) em vez de varrer documento e colaborador.
+#
+# - Os eventos do ORM em Documento e Colaborador marcam os colaboradores
+#   alterados; no after_flush (mesma transação) as linhas deles são refeitas
+#   a partir de documento, pelo índice de colaborador_id.
+# - UPDATE/DELETE em lote (operacoes_lote) não passam pelos eventos e chamam
+#   recontar() diretamente, como fazem com o índice de busca.
+# - O status muda com a data: reclassificar() leva os contadores do dia de
+#   referência para hoje lendo só os documentos cuja validade cruzou algum
+#   limite no intervalo (uma faixa do índice ix_documento_validade).
+# - reconstruir() refaz a tabela inteira (flask conformidade-reconstruir).
+
+# Colaboradores recontados por comando (limite de parâmetros do SQLite)
+LOTE_RECONTAGEM = 500
+_CHAVE_SESSAO = 'conformidade_colaboradores'
+
+DepartamentoConformidade = namedtuple('DepartamentoConformidade', [
+    'departamento', 'colaboradores', 'documentos', 'validos', 'proximos', 'vencidos',
+    'colaboradores_com_vencidos', 'percentual'
+])
+
+
+def _status(dia):
+    """Expressão SQL com o status do documento em `dia` (mesmas regras de calcular_status)."""
+    return case((filtro_vencidos(dia), 'vencido'), (filtro_proximos_vencer(dia), 'proximo_vencer'),
+                else_='válido')
+
+
+def dia_referencia(conn=None):
+    """Dia dos contadores, ou None se a tabela ainda não foi construída."""
+    return (conn or db.session).scalar(select(ContadorStatusReferencia.dia))
+
+
+def _recontar(conn, dia, colaborador_ids=None):
+    """Refaz as linhas dos colaboradores informados (todos, se None) a partir de documento."""
+    apagar = delete(ContadorStatus)
+    documentos = select(Documento.colaborador_id, _status(dia).label('status'))
+    if colaborador_ids is not None:
+        apagar = apagar.where(ContadorStatus.colaborador_id.in_(colaborador_ids))
+        documentos = documentos.where(Documento.colaborador_id.in_(colaborador_ids))
+    documentos = documentos.subquery()
+    conn.execute(apagar)
+    conn.execute(insert(ContadorStatus).from_select(
+        ['colaborador_id', 'status', 'departamento', 'quantidade'],
+        select(documentos.c.colaborador_id, documentos.c.status, Colaborador.departamento, func.count())
+        .join(Colaborador, Colaborador.id == documentos.c.colaborador_id)
+        .group_by(documentos.c.colaborador_id, documentos.c.status, Colaborador.departamento)
+    ))
+
+
+def recontar(colaborador_ids, conn=None):
+    """Atualiza os contadores dos colaboradores depois de alterações que não passam pelo ORM."""
+    conn = conn or db.session.connection()
+    dia = dia_referencia(conn)
+    if dia is None:
+        return
+    ids = sorted(set(colaborador_ids))
+    for inicio in range(0, len(ids), LOTE_RECONTAGEM):
+        _recontar(conn, dia, ids[inicio:inicio + LOTE_RECONTAGEM])
+
+
+def reconstruir(hoje=None):
+    """Recalcula a tabela inteira com os status de `hoje`. Retorna o número de linhas."""
+    hoje = hoje or date.today()
+    conn = db.session.connection()
+    conn.execute(delete(ContadorStatusReferencia))
+    conn.execute(insert(ContadorStatusReferencia).values(id=1, dia=hoje))
+    _recontar(conn, hoje)
+    total = db.session.scalar(select(func.count()).select_from(ContadorStatus))
+    db.session.commit()
+    return total
+
+
+def _somar(conn, colaborador_id, status, quantidade):
+    resultado = conn.execute(
+        update(ContadorStatus)
+        .where(ContadorStatus.colaborador_id == colaborador_id, ContadorStatus.status == status)
+        .values(quantidade=ContadorStatus.quantidade + quantidade)
+    )
+    if resultado.rowcount == 0:
+        conn.execute(insert(ContadorStatus).from_select(
+            ['colaborador_id', 'status', 'departamento', 'quantidade'],
+            select(Colaborador.id, literal(status), Colaborador.departamento, literal(quantidade))
+            .where(Colaborador.id == colaborador_id)
+        ))
+
+
+def reclassificar(hoje=None):
+    """Move os contadores do dia de referência para `hoje` (passada diária).
+
+    Só são lidos os documentos com validade entre o dia de referência e
+    hoje + 30 dias, os únicos cujo status pode ter mudado. Retorna o número
+    de documentos que mudaram de status, ou None se os contadores ainda não
+    existiam e foram construídos do zero.
+    """
+    hoje = hoje or date.today()
+    anterior = dia_referencia()
+    if anterior is None:
+        reconstruir(hoje)
+        return None
+    if anterior == hoje:
+        return 0
+
+    conn = db.session.connection()
+    # Só um processo faz a passagem: os demais não encontram mais o dia anterior
+    if conn.execute(update(ContadorStatusReferencia)
+                    .where(ContadorStatusReferencia.dia == anterior).values(dia=hoje)).rowcount == 0:
+        db.session.rollback()
+        return 0
+
+    inicio = min(anterior, hoje)
+    fim = max(anterior, hoje) + timedelta(days=30)
+    documentos = select(
+        Documento.colaborador_id, _status(anterior).label('antes'), _status(hoje).label('depois')
+    ).where(Documento.tipo_validade != 'indeterminado', Documento.data_validade >= inicio,
+            Documento.data_validade <= fim).subquery()
+    mudancas = conn.execute(
+        select(documentos.c.colaborador_id, documentos.c.antes, documentos.c.depois, func.count())
+        .where(documentos.c.antes != documentos.c.depois)
+        .group_by(documentos.c.colaborador_id, documentos.c.antes, documentos.c.depois)
+    ).all()
+    for colaborador_id, antes, depois, quantidade in mudancas:
+        _somar(conn, colaborador_id, antes, -quantidade)
+        _somar(conn, colaborador_id, depois, quantidade)
+    db.session.commit()
+    return sum(quantidade for *_, quantidade in mudancas)
+
+
+def atualizar(hoje=None):
+    """Garante que os contadores existem e estão no dia de hoje (barato quando já estão)."""
+    hoje = hoje or date.today()
+    if dia_referencia() != hoje:
+        reclassificar(hoje)
+
+
+def por_departamento():
+    """Totais de conformidade por departamento, a partir de contador_status."""
+    atualizar()
+    quantidade = ContadorStatus.quantidade
+    contagens = {
+        departamento: (validos, proximos, vencidos, com_vencidos)
+        for departamento, validos, proximos, vencidos, com_vencidos in db.session.execute(
+            select(
+                ContadorStatus.departamento,
+                func.sum(case((ContadorStatus.status == 'válido', quantidade), else_=0)),
+                func.sum(case((ContadorStatus.status == 'proximo_vencer', quantidade), else_=0)),
+                func.sum(case((ContadorStatus.status == 'vencido', quantidade), else_=0)),
+                func.count(case(((ContadorStatus.status == 'vencido') & (quantidade > 0), 1))),
+            ).group_by(ContadorStatus.departamento)
+        )
+    }
+    colaboradores = db.session.execute(
+        select(Colaborador.departamento, func.count()).group_by(Colaborador.departamento)
+    ).all()
+
+    linhas = []
+    for departamento, total_colaboradores in colaboradores:
+        validos, proximos, vencidos, com_vencidos = contagens.get(departamento, (0, 0, 0, 0))
+        documentos = validos + proximos + vencidos
+        linhas.append(DepartamentoConformidade(
+            departamento, total_colaboradores, documentos, validos, proximos, vencidos, com_vencidos,
+            round(100 * (documentos - vencidos) / documentos, 1) if documentos else None
+        ))
+    # Menos conformes primeiro
+    linhas.sort(key=lambda linha: (linha.percentual if linha.percentual is not None else 101,
+                                   linha.departamento or ''))
+    return linhas
+
+
+# Eventos do ORM
+
+def _marcar(target, *colaborador_ids):
+    sessao = object_session(target)
+    if sessao is not None:
+        sessao.info.setdefault(_CHAVE_SESSAO, set()).update(i for i in colaborador_ids if i is not None)
+
+
+@event.listens_for(Documento, 'after_insert')
+def _documento_inserido(mapper, connection, target):
+    _marcar(target, target.colaborador_id)
+
+
+@event.listens_for(Documento, 'after_update')
+def _documento_alterado(mapper, connection, target):
+    atributos = inspect(target).attrs
+    if any(atributos[nome].history.has_changes() for nome in ('colaborador_id', 'tipo_validade', 'data_validade')):
+        _marcar(target, target.colaborador_id, *atributos.colaborador_id.history.deleted)
+
+
+@event.listens_for(Documento, 'before_delete')
+def _documento_excluido(mapper, connection, target):
+    # Antes do DELETE: se colaborador_id estiver expirado, ainda dá para carregá-lo
+    _marcar(target, target.colaborador_id)
+
+
+@event.listens_for(Colaborador, 'after_update')
+def _colaborador_alterado(mapper, connection, target):
+    if inspect(target).attrs.departamento.history.has_changes():
+        _marcar(target, target.id)
+
+
+@event.listens_for(Colaborador, 'after_delete')
+def _colaborador_excluido(mapper, connection, target):
+    _marcar(target, target.id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _aplicar(session, flush_context):
+    colaborador_ids = session.info.pop(_CHAVE_SESSAO, None)
+    if colaborador_ids:
+        recontar(colaborador_ids, session.connection())
+
+
+# Painel
+
+conformidade_bp = Blueprint('conformidade', __name__)
+
+
+@conformidade_bp.route('/conformidade')
+@login_required
+def painel():
+    departamentos = por_departamento()
+    return render_template('conformidade.html', departamentos=departamentos,
+                           dia=dia_referencia(),
+                           total_documentos=sum(d.documentos for d in departamentos),
+                           total_vencidos=sum(d.vencidos for d in departamentos),
+                           total_proximos=sum(d.proximos for d in departamentos))
@@ -0,0 +1,102 @@
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import func
+from models import db, User, Colaborador, Documento, LogAuditoria, calcular_status
+from utils import contar_status_por_colaborador
+
+# Consultas das telas de listagem
+#
+# Cada função seleciona só as colunas que o template usa e devolve tuplas
+# nomeadas em vez de objetos do ORM: nada fica no identity map da sessão e o
+# template não dispara consultas (lazy load) durante a renderização.
+
+ColaboradorLinha = namedtuple('ColaboradorLinha', [
+    'id', 'nome', 'email', 'departamento', 'cargo', 'data_admissao', 'total_documentos'
+])
+
+ColaboradorCartao = namedtuple('ColaboradorCartao', [
+    'id', 'nome', 'email', 'departamento', 'cargo', 'data_admissao',
+    'total_documentos', 'documentos_vencidos', 'documentos_proximos'
+])
+
+DocumentoLinha = namedtuple('DocumentoLinha', [
+    'id', 'nome', 'arquivo', 'arquivo_hash', 'data_upload', 'tipo_validade', 'data_validade',
+    'observacoes', 'status'
+])
+
+UsuarioLinha = namedtuple('UsuarioLinha', ['id', 'username', 'email', 'role', 'created_at'])
+
+UsuarioResumo = namedtuple('UsuarioResumo', ['username', 'role'])
+
+LogLinha = namedtuple('LogLinha', [
+    'id', 'created_at', 'acao', 'descricao', 'tabela_afetada', 'registro_id', 'ip_address', 'usuario'
+])
+
+_COLUNAS_COLABORADOR = (Colaborador.id, Colaborador.nome, Colaborador.email, Colaborador.departamento,
+                        Colaborador.cargo, Colaborador.data_admissao)
+
+
+def listar_colaboradores():
+    """Todos os colaboradores com o total de documentos (tela de gerenciamento)."""
+    totais = db.session.query(
+        Documento.colaborador_id, func.count(Documento.id).label('total')
+    ).group_by(Documento.colaborador_id).subquery()
+    linhas = db.session.query(
+        *_COLUNAS_COLABORADOR, func.coalesce(totais.c.total, 0)
+    ).outerjoin(totais, totais.c.colaborador_id == Colaborador.id).order_by(Colaborador.id)
+    return [ColaboradorLinha(*linha) for linha in linhas]
+
+
+def paginar_cartoes(query, page, per_page):
+    """Página de colaboradores com as contagens por status (tela de documentos).
+
+    `query` é um Colaborador.query já filtrado e ordenado. Retorna a paginação
+    (para os links) e a lista de ColaboradorCartao da página.
+    """
+    paginacao = query.with_entities(*_COLUNAS_COLABORADOR).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    contagens = contar_status_por_colaborador([linha.id for linha in paginacao.items])
+    cartoes = [
+        ColaboradorCartao(*linha, *contagens.get(linha.id, (0, 0, 0)))
+        for linha in paginacao.items
+    ]
+    return paginacao, cartoes
+
+
+def listar_documentos(query):
+    """Documentos de `query` (Documento.query filtrado) com o status de vencimento já calculado."""
+    hoje = date.today()
+    linhas = query.with_entities(
+        Documento.id, Documento.nome, Documento.arquivo, Documento.arquivo_hash, Documento.data_upload,
+        Documento.tipo_validade, Documento.data_validade, Documento.observacoes
+    )
+    return [DocumentoLinha(*linha, calcular_status(linha.tipo_validade, linha.data_validade, hoje))
+            for linha in linhas]
+
+
+def listar_departamentos():
+    """Departamentos distintos dos colaboradores, para os filtros e o download por departamento."""
+    linhas = db.session.query(Colaborador.departamento).filter(
+        Colaborador.departamento.isnot(None), Colaborador.departamento != ''
+    ).distinct().order_by(Colaborador.departamento)
+    return [departamento for departamento, in linhas]
+
+
+def listar_usuarios():
+    return [UsuarioLinha(*linha) for linha in db.session.query(
+        User.id, User.username, User.email, User.role, User.created_at
+    ).order_by(User.id)]
+
+
+def consulta_logs():
+    """Query dos registros de auditoria com o autor; filtros, ordem e limite ficam com a rota."""
+    return db.session.query(
+        LogAuditoria.id, LogAuditoria.created_at, LogAuditoria.acao, LogAuditoria.descricao,
+        LogAuditoria.tabela_afetada, LogAuditoria.registro_id, LogAuditoria.ip_address,
+        User.username, User.role
+    ).join(User, LogAuditoria.usuario_id == User.id)
+
+
+def para_logs(linhas):
+    return [LogLinha(*linha[:7], usuario=UsuarioResumo(*linha[7:])) for linha in linhas]
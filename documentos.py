@@ -0,0 +1,443 @@
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, send_file
+from flask_login import login_required, current_user
+from models import db, Colaborador, Documento, DocumentoVersao
+from forms import DocumentoForm, OperacaoLoteForm
+from utils import calcular_data_validade
+from cache import dashboard_cache
+from log_auditoria import registrar_log
+from busca import filtrar_colaboradores, filtrar_documentos
+from storage import (salvar_upload, liberar_arquivo, resposta_download, conta_como_download,
+                     removedor_arquivos)
+from operacoes_lote import filtro_documentos, renovar_documentos, excluir_documentos
+from versoes import registrar_versao, remover_versoes, aplicar_retencao
+from extracao import extrator_texto
+from previews import cache_previews, chave_preview
+from consultas import listar_departamentos, listar_documentos, paginar_cartoes
+import os
+from concurrent.futures import TimeoutError as FuturoTimeout
+from datetime import date
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from flask_wtf.file import FileRequired
+
+documentos_bp = Blueprint('documentos', __name__)
+
+# Rota de documentos do colaborador específico
+@documentos_bp.route('/colaborador/<int:colaborador_id>/documentos')
+@login_required
+def documentos_colaborador(colaborador_id):
+    colaborador = Colaborador.query.get_or_404(colaborador_id)
+    
+    # Lógica de pesquisa por nome do documento
+    search_query = request.args.get('search', '').strip()
+    
+    query = Documento.query.filter_by(colaborador_id=colaborador_id)
+    if search_query:
+        # Busca por prefixo, sem acentos, no nome e nas observações do documento
+        query = filtrar_documentos(query, search_query, colaborador_id)
+        
+    documentos = listar_documentos(query)
+    
+    return render_template('documentos_colaborador.html', 
+                         colaborador=colaborador, 
+                         documentos=documentos,
+                         search_query=search_query,
+                         form_lote=OperacaoLoteForm())
+
+# Rota principal de documentos (mostra todos os colaboradores)
+@documentos_bp.route('/documentos')
+@login_required
+def documentos():
+    # Lógica de pesquisa por nome do colaborador
+    search_query = request.args.get('search', '').strip()
+    
+    page = request.args.get('page', 1, type=int)
+
+    query = Colaborador.query
+    if search_query:
+        # Busca por prefixo, sem acentos, no nome/departamento/cargo do colaborador
+        query = filtrar_colaboradores(query, search_query)
+
+    # Contagens por status com uma consulta agrupada só para a página atual
+    paginacao, colaboradores = paginar_cartoes(query.order_by(Colaborador.nome, Colaborador.id),
+                                               page=page, per_page=24)
+
+    # Opções do download em ZIP por departamento
+    departamentos = listar_departamentos() if current_user.has_permission('download') else []
+
+    return render_template('documentos.html', colaboradores=colaboradores,
+                         paginacao=paginacao, search_query=search_query,
+                         departamentos=departamentos)
+
+# Rota para adicionar documento
+@documentos_bp.route('/documento/novo/<int:colaborador_id>', methods=['GET', 'POST'])
+@login_required
+def novo_documento(colaborador_id):
+    if not current_user.has_permission('add_documento'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('documentos.documentos'))
+    
+    colaborador = Colaborador.query.get_or_404(colaborador_id)
+    form = DocumentoForm()
+    
+    if form.validate_on_submit():
+        try:
+            arquivo = form.arquivo.data
+            filename = secure_filename(arquivo.filename)
+            
+            # Armazenamento por conteúdo: arquivos idênticos são gravados uma única vez
+            armazenado = salvar_upload(arquivo)
+            
+            # Lógica simplificada para data_validade
+            data_validade = None
+            if form.tipo_validade.data == 'personalizado':
+                data_validade = form.data_validade.data
+            else:
+                data_validade = calcular_data_validade(form.tipo_validade.data, None)
+            
+            documento = Documento(
+                colaborador_id=colaborador_id,
+                nome=form.nome.data,
+                tipo_validade=form.tipo_validade.data,
+                data_validade=data_validade,
+                arquivo=armazenado.caminho,
+                arquivo_hash=armazenado.hash,
+                nome_arquivo=filename,
+                extracao_status='pendente',
+                usuario_id=current_user.id,
+                observacoes=form.observacoes.data
+            )
+            
+            db.session.add(documento)
+            db.session.commit()
+            dashboard_cache.invalidar()
+            extrator_texto.agendar(documento)
+            cache_previews.agendar(chave_preview(documento.arquivo_hash, documento.arquivo), documento.arquivo)
+            
+            # REGISTRAR LOG
+            registrar_log(
+                acao='criar_documento',
+                descricao=f'Documento {form.nome.data} adicionado para colaborador {colaborador.nome}',
+                tabela_afetada='documento',
+                registro_id=documento.id
+            )
+            
+            flash('Documento adicionado com sucesso!', 'success')
+            return redirect(url_for('documentos.documentos_colaborador', colaborador_id=colaborador_id))
+            
+        except Exception as e:
+            db.session.rollback()
+            error_msg = f'Erro ao adicionar documento: {str(e)}'
+            current_app.logger.exception('Erro ao adicionar documento para o colaborador %s', colaborador_id)
+            flash(error_msg, 'danger')
+    
+    return render_template('documento_form.html', form=form, colaborador=colaborador, title='Adicionar Novo Documento')
+
+# Rota para editar documento
+@documentos_bp.route('/documento/editar/<int:documento_id>', methods=['GET', 'POST'])
+@login_required
+def editar_documento(documento_id):
+    if not current_user.has_permission('edit_documento'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('documentos.documentos'))
+    
+    documento = Documento.query.get_or_404(documento_id)
+    colaborador = Colaborador.query.get_or_404(documento.colaborador_id)
+    
+    # Preenche o formulário com os dados existentes
+    form = DocumentoForm(obj=documento)
+    
+    # Remove a validação FileRequired para edição, permitindo que o campo de arquivo fique vazio
+    form.arquivo.validators = [v for v in form.arquivo.validators if not isinstance(v, FileRequired)]
+
+    if form.validate_on_submit():
+        try:
+            # Registrar alterações para o log
+            alteracoes = []
+            if documento.nome != form.nome.data:
+                alteracoes.append(f"nome: {documento.nome} -> {form.nome.data}")
+            if documento.tipo_validade != form.tipo_validade.data:
+                alteracoes.append(f"tipo_validade: {documento.tipo_validade} -> {form.tipo_validade.data}")
+            
+            # 1. Recalcular a data de validade
+            data_validade = calcular_data_validade(
+                form.tipo_validade.data, 
+                form.data_validade.data if form.tipo_validade.data == 'personalizado' else None
+            )
+            
+            if documento.data_validade != data_validade:
+                alteracoes.append(f"data_validade: {documento.data_validade} -> {data_validade}")
+            
+            # 2. Guardar a revisão atual no histórico antes de trocar arquivo ou validade
+            # (sem upload, o campo fica com o caminho vindo de obj=documento)
+            novo_arquivo = isinstance(form.arquivo.data, FileStorage) and bool(form.arquivo.data.filename)
+            if novo_arquivo or documento.tipo_validade != form.tipo_validade.data or documento.data_validade != data_validade:
+                registrar_versao(documento, transferir_referencia=novo_arquivo)
+                documento.usuario_id = current_user.id
+            
+            # 3. Tratar o upload do arquivo (a referência ao antigo ficou com a versão)
+            extrair = False
+            if novo_arquivo:
+                arquivo = form.arquivo.data
+                filename = secure_filename(arquivo.filename)
+                armazenado = salvar_upload(arquivo)
+                
+                if armazenado.hash != documento.arquivo_hash:
+                    alteracoes.append(f"arquivo: {documento.nome_arquivo or documento.arquivo} -> {filename}")
+                    documento.extracao_status = 'pendente'
+                    extrair = True
+                
+                documento.arquivo = armazenado.caminho # Atualiza o arquivo no banco
+                documento.arquivo_hash = armazenado.hash
+                documento.nome_arquivo = filename
+            
+            # 4. Atualizar campos do documento
+            documento.nome = form.nome.data
+            documento.tipo_validade = form.tipo_validade.data
+            documento.data_validade = data_validade
+            documento.observacoes = form.observacoes.data
+            arquivos_orfaos = aplicar_retencao([documento.id])
+            
+            db.session.commit()
+            removedor_arquivos.agendar(arquivos_orfaos)
+            dashboard_cache.invalidar()
+            if extrair:
+                extrator_texto.agendar(documento)
+                cache_previews.agendar(chave_preview(documento.arquivo_hash, documento.arquivo), documento.arquivo)
+            
+            # REGISTRAR LOG
+            if alteracoes:
+                registrar_log(
+                    acao='editar_documento',
+                    descricao=f'Documento {documento.nome} alterado: {", ".join(alteracoes)}',
+                    tabela_afetada='documento',
+                    registro_id=documento.id
+                )
+            
+            flash('Documento atualizado com sucesso!', 'success')
+            return redirect(url_for('documentos.documentos_colaborador', colaborador_id=colaborador.id))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar documento: {e}', 'danger')
+
+    return render_template('documento_form.html', form=form, colaborador=colaborador, documento=documento, title='Editar Documento')
+
+# Rota para excluir documento
+@documentos_bp.route('/documento/excluir/<int:documento_id>', methods=['POST'])
+@login_required
+def excluir_documento(documento_id):
+    if not current_user.has_permission('delete_documento'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('documentos.documentos'))
+    
+    documento = Documento.query.get_or_404(documento_id)
+    colaborador_id = documento.colaborador_id
+    nome_documento = documento.nome
+    
+    try:
+        # 1. Soltar as referências do histórico e do arquivo atual (compartilhados quando idênticos)
+        arquivos_orfaos = remover_versoes(DocumentoVersao.documento_id == documento.id)
+        arquivos_orfaos += liberar_arquivo(documento)
+            
+        # 2. Deletar o registro do banco de dados
+        db.session.delete(documento)
+        db.session.commit()
+        dashboard_cache.invalidar()
+        
+        # 3. Deletar do sistema de arquivos o que ficou sem referência (conferido de novo no banco,
+        #    pois um upload simultâneo do mesmo conteúdo pode tê-lo reaproveitado)
+        removedor_arquivos.agendar(arquivos_orfaos)
+        
+        # REGISTRAR LOG
+        registrar_log(
+            acao='excluir_documento',
+            descricao=f'Documento {nome_documento} excluído',
+            tabela_afetada='documento',
+            registro_id=documento_id
+        )
+        
+        flash('Documento excluído com sucesso!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir documento: {e}', 'danger')
+        
+    return redirect(url_for('documentos.documentos_colaborador', colaborador_id=colaborador_id))
+
+def _filtro_do_formulario(exigir_selecao=False):
+    # Tipo e situação sozinhos alcançam documentos de todos os colaboradores
+    if exigir_selecao and not (request.form.getlist('ids') or request.form.get('colaborador_id')):
+        raise ValueError('Selecione os documentos ou o colaborador')
+    return filtro_documentos(
+        ids=request.form.getlist('ids', type=int),
+        colaborador_id=request.form.get('colaborador_id', type=int),
+        tipo_validade=request.form.get('tipo_validade') or None,
+        situacao=request.form.get('situacao') or None
+    )
+
+def _voltar_da_operacao_em_lote():
+    colaborador_id = request.form.get('colaborador_id', type=int) or request.form.get('voltar_colaborador_id', type=int)
+    if colaborador_id:
+        return redirect(url_for('documentos.documentos_colaborador', colaborador_id=colaborador_id))
+    return redirect(url_for('principal.dashboard'))
+
+# Renovação em lote: selecionados, por colaborador ou todos os vencidos/próximos de um tipo
+@documentos_bp.route('/documentos/renovar', methods=['POST'])
+@login_required
+def renovar_documentos_lote():
+    if not current_user.has_permission('renovar_documento'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('documentos.documentos'))
+    if not OperacaoLoteForm().validate_on_submit():
+        flash('Formulário expirado ou inválido. Recarregue a página e tente novamente.', 'warning')
+        return _voltar_da_operacao_em_lote()
+    
+    try:
+        filtro, descricao = _filtro_do_formulario()
+        nova_data = request.form.get('nova_data', type=date.fromisoformat)
+        quantidade = renovar_documentos(filtro, nova_data, usuario_id=current_user.id)
+        db.session.commit()
+        dashboard_cache.invalidar()
+        
+        if quantidade:
+            registrar_log(
+                acao='renovar_documentos',
+                descricao=f'{quantidade} documento(s) renovado(s) ({descricao})',
+                tabela_afetada='documento'
+            )
+        flash(f'{quantidade} documento(s) renovado(s)', 'success' if quantidade else 'info')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao renovar documentos: {e}', 'danger')
+    
+    return _voltar_da_operacao_em_lote()
+
+# Exclusão em lote: os arquivos sem uso são apagados depois, em segundo plano
+@documentos_bp.route('/documentos/excluir', methods=['POST'])
+@login_required
+def excluir_documentos_lote():
+    if not current_user.has_permission('delete_documento'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('documentos.documentos'))
+    if not OperacaoLoteForm().validate_on_submit():
+        flash('Formulário expirado ou inválido. Recarregue a página e tente novamente.', 'warning')
+        return _voltar_da_operacao_em_lote()
+    
+    try:
+        filtro, descricao = _filtro_do_formulario(exigir_selecao=True)
+        quantidade, arquivos_orfaos = excluir_documentos(filtro)
+        db.session.commit()
+        dashboard_cache.invalidar()
+        removedor_arquivos.agendar(arquivos_orfaos)
+        
+        if quantidade:
+            registrar_log(
+                acao='excluir_documentos',
+                descricao=f'{quantidade} documento(s) excluído(s) ({descricao})',
+                tabela_afetada='documento'
+            )
+        flash(f'{quantidade} documento(s) excluído(s)', 'success' if quantidade else 'info')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir documentos: {e}', 'danger')
+    
+    return _voltar_da_operacao_em_lote()
+
+@documentos_bp.route('/download/<int:documento_id>')
+@login_required
+def download_documento(documento_id):
+    if not current_user.has_permission('download'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    documento = Documento.query.get_or_404(documento_id)
+    arquivo_path = os.path.join(current_app.config['UPLOAD_FOLDER'], documento.arquivo)
+    
+    if not os.path.exists(arquivo_path):
+        flash('Arquivo não encontrado', 'danger')
+        return redirect(url_for('documentos.documentos'))
+    
+    response = resposta_download(documento)
+    
+    # REGISTRAR LOG (304 e pedaços intermediários de Range não são novos downloads)
+    if conta_como_download(response):
+        registrar_log(
+            acao='download_documento',
+            descricao=f'Download do documento {documento.nome}',
+            tabela_afetada='documento',
+            registro_id=documento.id
+        )
+    
+    return response
+
+# Miniatura da primeira página (PDF/JPG/PNG), para conferir sem baixar o arquivo
+@documentos_bp.route('/documento/<int:documento_id>/preview')
+@login_required
+def preview_documento(documento_id):
+    if not current_user.has_permission('download'):
+        return '', 403
+    
+    documento = Documento.query.get_or_404(documento_id)
+    versao = documento.arquivo_hash or documento.arquivo
+    # A URL leva a versão do arquivo e é guardada pelo navegador por um ano;
+    # um link antigo nunca pode receber a miniatura de um conteúdo novo
+    if request.args.get('v') != versao:
+        return redirect(url_for('documentos.preview_documento', documento_id=documento.id, v=versao))
+    if not os.path.exists(os.path.join(current_app.config['UPLOAD_FOLDER'], documento.arquivo)):
+        return '', 404
+    
+    chave = chave_preview(documento.arquivo_hash, documento.arquivo)
+    try:
+        caminho = cache_previews.obter(chave, documento.arquivo)
+    except FuturoTimeout:
+        return '', 503, {'Retry-After': '5', 'Cache-Control': 'no-store'}
+    if caminho is None:
+        return '', 404, {'Cache-Control': 'private, max-age=86400'}
+    
+    response = send_file(caminho, mimetype='image/jpeg', conditional=True, etag=chave)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+# Histórico de versões do documento (carregado sob demanda, paginado)
+@documentos_bp.route('/documento/<int:documento_id>/historico')
+@login_required
+def historico_documento(documento_id):
+    if not current_user.has_permission('download'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    documento = Documento.query.get_or_404(documento_id)
+    page = request.args.get('page', 1, type=int)
+    paginacao = db.paginate(
+        db.select(DocumentoVersao).filter_by(documento_id=documento.id).order_by(DocumentoVersao.numero.desc()),
+        page=page, per_page=20, error_out=False
+    )
+    return render_template('historico_documento.html', documento=documento, versoes=paginacao.items, paginacao=paginacao)
+
+@documentos_bp.route('/documento/<int:documento_id>/versao/<int:numero>/download')
+@login_required
+def download_versao(documento_id, numero):
+    if not current_user.has_permission('download'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    versao = DocumentoVersao.query.filter_by(documento_id=documento_id, numero=numero).first_or_404()
+    if not os.path.exists(os.path.join(current_app.config['UPLOAD_FOLDER'], versao.arquivo)):
+        flash('Arquivo não encontrado', 'danger')
+        return redirect(url_for('documentos.historico_documento', documento_id=documento_id))
+    
+    response = resposta_download(versao)
+    
+    if conta_como_download(response):
+        registrar_log(
+            acao='download_documento',
+            descricao=f'Download da versão {numero} do documento {documento_id}',
+            tabela_afetada='documento',
+            registro_id=documento_id
+        )
+    return response
@@ -0,0 +1,474 @@
+import csv
+import io
+import logging
+import os
+import re
+import unicodedata
+import zipfile
+from datetime import date, datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from flask import Blueprint, Response, abort, flash, redirect, request, stream_with_context, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+from models import db, User, Colaborador, Documento, LogAuditoria, UserAgent, calcular_status
+from utils import contagens_status, filtro_vencidos, filtro_proximos_vencer
+from auditoria import ler_filtros, filtrar_logs
+from log_auditoria import registrar_log
+from storage import TAMANHO_BLOCO, caminho_absoluto
+
+logger = logging.getLogger(__name__)
+
+# Exportação de relatórios em CSV e XLSX e dos arquivos dos documentos em ZIP
+#
+# As linhas são lidas do banco em lotes (yield_per, cursor do lado do
+# servidor onde o driver permite) e escritas na resposta à medida que chegam:
+# a memória do worker não cresce com o tamanho do relatório. O XLSX é montado
+# com zipfile escrevendo em um buffer que o gerador esvazia a cada lote
+# (SaidaStream), sem arquivo temporário; o pacote de documentos usa o mesmo
+# buffer, esvaziado a cada bloco lido do disco.
+
+TAMANHO_LOTE = 1000
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+SITUACOES = ('vencidos', 'proximos', 'todos')
+# Caracteres de controle não são permitidos em XML
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Arquivos já comprimidos vão para o ZIP sem nova compressão (ZIP_STORED)
+EXTENSOES_SEM_COMPRESSAO = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.docx', '.xlsx')
+# Caracteres que não podem aparecer em nomes de arquivo no Windows
+_INVALIDOS_NOME = re.compile(r'[\x00-\x1f<>:"/\\|?*]')
+
+
+class SaidaStream:
+    """Destino só de escrita para o zipfile, esvaziado pelo gerador da resposta.
+
+    O zipfile detecta que não há seek() e grava os tamanhos depois de cada
+    arquivo (data descriptor), então o ZIP sai em uma única passada.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _ler_em_lotes(consulta):
+    return db.session.execute(consulta.execution_options(yield_per=TAMANHO_LOTE))
+
+
+# Relatórios: cada um retorna (cabecalho, linhas), com linhas sendo um gerador de tuplas
+
+def relatorio_colaboradores():
+    """Colaboradores com a contagem de documentos por status."""
+    total, vencidos, proximos = contagens_status(date.today())
+    contagens = select(
+        Documento.colaborador_id, total.label('total'), vencidos.label('vencidos'), proximos.label('proximos')
+    ).group_by(Documento.colaborador_id).subquery()
+    consulta = select(
+        Colaborador.id, Colaborador.nome, Colaborador.email, Colaborador.departamento, Colaborador.cargo,
+        Colaborador.data_admissao, func.coalesce(contagens.c.total, 0), func.coalesce(contagens.c.vencidos, 0),
+        func.coalesce(contagens.c.proximos, 0)
+    ).outerjoin(contagens, contagens.c.colaborador_id == Colaborador.id).order_by(Colaborador.nome, Colaborador.id)
+
+    def linhas():
+        for *dados, total, vencidos, proximos in _ler_em_lotes(consulta):
+            yield (*dados, total, total - vencidos - proximos, proximos, vencidos)
+
+    cabecalho = ('ID', 'Nome', 'Email', 'Departamento', 'Cargo', 'Admissão',
+                 'Documentos', 'Válidos', 'Próximos do vencimento', 'Vencidos')
+    return cabecalho, linhas()
+
+
+def relatorio_vencimentos(situacao='todos'):
+    """Documentos vencidos e/ou que vencem nos próximos 30 dias (mesmas regras do dashboard)."""
+    hoje = date.today()
+    if situacao == 'vencidos':
+        filtro = filtro_vencidos(hoje)
+    elif situacao == 'proximos':
+        filtro = filtro_proximos_vencer(hoje)
+    else:
+        filtro = filtro_vencidos(hoje) | filtro_proximos_vencer(hoje)
+    consulta = select(
+        Documento.id, Documento.nome, Colaborador.nome, Colaborador.departamento, Colaborador.cargo,
+        Documento.tipo_validade, Documento.data_validade
+    ).join(Colaborador, Documento.colaborador_id == Colaborador.id).where(filtro).order_by(
+        Documento.data_validade, Documento.id)
+
+    def linhas():
+        for *dados, tipo_validade, data_validade in _ler_em_lotes(consulta):
+            status = calcular_status(tipo_validade, data_validade, hoje)
+            yield (*dados, tipo_validade, data_validade, (data_validade - hoje).days,
+                   'Vencido' if status == 'vencido' else 'Próximo do vencimento')
+
+    cabecalho = ('ID', 'Documento', 'Colaborador', 'Departamento', 'Cargo', 'Tipo de validade',
+                 'Validade', 'Dias para vencer', 'Situação')
+    return cabecalho, linhas()
+
+
+def relatorio_auditoria(filtros):
+    """Registros de auditoria com os mesmos filtros da tela, do mais novo para o mais antigo."""
+    consulta = filtrar_logs(select(
+        LogAuditoria.id, LogAuditoria.created_at, User.username, LogAuditoria.acao, LogAuditoria.descricao,
+        LogAuditoria.tabela_afetada, LogAuditoria.registro_id, LogAuditoria.ip_address,
+        func.coalesce(UserAgent.texto, LogAuditoria.user_agent)
+    ).join(User, LogAuditoria.usuario_id == User.id).outerjoin(
+        UserAgent, LogAuditoria.user_agent_id == UserAgent.id
+    ), filtros).order_by(LogAuditoria.created_at.desc(), LogAuditoria.id.desc())
+
+    cabecalho = ('ID', 'Data/Hora', 'Usuário', 'Ação', 'Descrição', 'Tabela', 'Registro', 'IP', 'User-Agent')
+    return cabecalho, (tuple(linha) for linha in _ler_em_lotes(consulta))
+
+
+def documentos_do_pacote(colaborador_id=None, departamento=None, ids=None):
+    """Consulta dos documentos que entram no ZIP, agrupados por colaborador."""
+    consulta = select(
+        Documento.id, Documento.nome, Documento.arquivo, Documento.nome_arquivo, Documento.data_upload,
+        Documento.tipo_validade, Documento.data_validade, Colaborador.id, Colaborador.nome,
+        Colaborador.departamento
+    ).join(Colaborador, Documento.colaborador_id == Colaborador.id)
+    if colaborador_id is not None:
+        consulta = consulta.where(Documento.colaborador_id == colaborador_id)
+    if departamento is not None:
+        consulta = consulta.where(Colaborador.departamento == departamento)
+    if ids:
+        consulta = consulta.where(Documento.id.in_(ids))
+    return consulta.order_by(Colaborador.nome, Colaborador.id, Documento.nome, Documento.id)
+
+
+# Formatos
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y %H:%M:%S')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    texto = str(valor)
+    # Evita que o Excel interprete o conteúdo digitado pelos usuários como fórmula (lista da OWASP)
+    if texto[:1] in ('=', '+', '-', '@', '\t', '\r') and not isinstance(valor, (int, float)):
+        return "'" + texto
+    return texto
+
+
+def gerar_csv(cabecalho, linhas):
+    """CSV separado por ';' com BOM (abre direto no Excel em português), em pedaços de bytes."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+    escritor.writerow(cabecalho)
+    yield buffer.getvalue().encode('utf-8-sig')
+    buffer.seek(0)
+    buffer.truncate()
+    for numero, linha in enumerate(linhas, start=1):
+        escritor.writerow([_texto_csv(valor) for valor in linha])
+        if numero % TAMANHO_LOTE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+_DATA_BASE_EXCEL = datetime(1899, 12, 30)
+
+_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>')
+
+_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>')
+
+_WORKBOOK_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/></Relationships>')
+
+# Estilos: 0 padrão, 1 data, 2 data e hora, 3 negrito (cabeçalho)
+_STYLES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>')
+
+
+def _workbook(nome_planilha):
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(nome_planilha[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+
+
+def _celula(valor, estilo=0):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        return f'<c s="2"><v>{(valor - _DATA_BASE_EXCEL).total_seconds() / 86400!r}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _DATA_BASE_EXCEL.date()).days}</v></c>'
+    texto = escape(_INVALIDOS_XML.sub('', str(valor)))
+    atributos = f' s="{estilo}"' if estilo else ''
+    return f'<c t="inlineStr"{atributos}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def gerar_xlsx(nome_planilha, cabecalho, linhas):
+    """Planilha XLSX de uma aba, produzida em pedaços de bytes (strings inline, sem sharedStrings)."""
+    saida = SaidaStream()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        pacote.writestr('_rels/.rels', _RELS)
+        pacote.writestr('xl/workbook.xml', _workbook(nome_planilha))
+        pacote.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        pacote.writestr('xl/styles.xml', _STYLES)
+        with pacote.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                            '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+                            'state="frozen"/></sheetView></sheetViews><sheetData>').encode())
+            planilha.write(('<row>' + ''.join(_celula(titulo, 3) for titulo in cabecalho) + '</row>').encode())
+            for numero, linha in enumerate(linhas, start=1):
+                planilha.write(('<row>' + ''.join(_celula(valor) for valor in linha) + '</row>').encode())
+                if numero % TAMANHO_LOTE == 0:
+                    yield saida.esvaziar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.esvaziar()
+
+
+def gerar(formato, nome, cabecalho, linhas):
+    if formato == 'xlsx':
+        return gerar_xlsx(nome, cabecalho, linhas)
+    return gerar_csv(cabecalho, linhas)
+
+
+def _nome_no_pacote(texto):
+    return _INVALIDOS_NOME.sub('_', texto or '').strip(' .') or 'sem_nome'
+
+
+_SITUACAO_DOCUMENTO = {'vencido': 'Vencido', 'proximo_vencer': 'Próximo do vencimento'}
+
+
+def _destino_no_pacote(documento_id, nome, arquivo, nome_arquivo, colaborador_id, colaborador, por_colaborador):
+    extensao = os.path.splitext(nome_arquivo or arquivo)[1].lower()
+    # O id no nome evita colisões entre documentos de mesmo nome
+    destino = f'{_nome_no_pacote(nome)}_{documento_id}{extensao}'
+    if por_colaborador:
+        destino = f'{_nome_no_pacote(colaborador)}_{colaborador_id}/{destino}'
+    return destino, extensao
+
+
+def gerar_zip(consulta, por_colaborador=False, manifesto=True):
+    """ZIP com os arquivos dos documentos de `consulta` (documentos_do_pacote), em pedaços de bytes.
+
+    Cada arquivo é lido em blocos de TAMANHO_BLOCO; com `por_colaborador` os
+    arquivos ficam em uma pasta por colaborador. O manifesto (CSV, no fim do
+    pacote) lista cada documento com a validade e o nome dentro do ZIP, e
+    aponta os arquivos que não foram encontrados no disco. Ele é escrito em
+    uma segunda passada pela consulta; da primeira só ficam em memória os
+    ids dos arquivos ausentes.
+    """
+    saida = SaidaStream()
+    ausentes = set()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        for (documento_id, nome, arquivo, nome_arquivo, data_upload, _, _,
+             colaborador_id, colaborador, _) in _ler_em_lotes(consulta):
+            destino, extensao = _destino_no_pacote(documento_id, nome, arquivo, nome_arquivo,
+                                                   colaborador_id, colaborador, por_colaborador)
+            try:
+                origem = open(caminho_absoluto(arquivo), 'rb')
+            except OSError:
+                logger.warning('Arquivo do documento %s não encontrado: %s', documento_id, arquivo)
+                ausentes.add(documento_id)
+                continue
+            with origem:
+                info = zipfile.ZipInfo(destino, date_time=(data_upload or datetime.now()).timetuple()[:6])
+                info.compress_type = (zipfile.ZIP_STORED if extensao in EXTENSOES_SEM_COMPRESSAO
+                                      else zipfile.ZIP_DEFLATED)
+                with pacote.open(info, 'w', force_zip64=True) as entrada:
+                    while bloco := origem.read(TAMANHO_BLOCO):
+                        entrada.write(bloco)
+                        dados = saida.esvaziar()
+                        if dados:
+                            yield dados
+        if manifesto:
+            info = zipfile.ZipInfo('manifesto.csv', date_time=datetime.now().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with pacote.open(info, 'w', force_zip64=True) as entrada:
+                for pedaco in gerar_csv(*_linhas_manifesto(consulta, por_colaborador, ausentes)):
+                    entrada.write(pedaco)
+                    dados = saida.esvaziar()
+                    if dados:
+                        yield dados
+    yield saida.esvaziar()
+
+
+def _linhas_manifesto(consulta, por_colaborador, ausentes):
+    cabecalho = ('ID', 'Documento', 'Colaborador', 'Departamento', 'Tipo de validade', 'Validade',
+                 'Situação', 'Arquivo no pacote')
+    hoje = date.today()
+
+    def linhas():
+        for (documento_id, nome, arquivo, nome_arquivo, _, tipo_validade, data_validade,
+             colaborador_id, colaborador, departamento) in _ler_em_lotes(consulta):
+            if documento_id in ausentes:
+                destino = 'Arquivo não encontrado'
+            else:
+                destino = _destino_no_pacote(documento_id, nome, arquivo, nome_arquivo,
+                                             colaborador_id, colaborador, por_colaborador)[0]
+            status = calcular_status(tipo_validade, data_validade, hoje)
+            yield (documento_id, nome, colaborador, departamento, tipo_validade, data_validade,
+                   _SITUACAO_DOCUMENTO.get(status, 'Válido'), destino)
+
+    return cabecalho, linhas()
+
+
+# Rotas
+
+exportacao_bp = Blueprint('exportacao', __name__, url_prefix='/exportar')
+
+
+def _resposta_zip(consulta, nome_arquivo, descricao, por_colaborador=False, **log):
+    """Pacote ZIP em stream, com uma única entrada de auditoria para todos os arquivos."""
+    quantidade = db.session.scalar(select(func.count()).select_from(consulta.order_by(None).subquery()))
+    if not quantidade:
+        return None
+    registrar_log(acao='download_documentos',
+                  descricao=f'Download de {quantidade} documento(s) em ZIP: {descricao}', **log)
+    manifesto = request.args.get('manifesto', '1') != '0'
+    response = Response(
+        stream_with_context(gerar_zip(consulta, por_colaborador, manifesto)),
+        content_type='application/zip',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'},
+    )
+    nome = f'{_nome_no_pacote(nome_arquivo)}_{date.today().isoformat()}.zip'
+    # Nomes com acento vão em filename* (RFC 5987), como no send_file
+    ascii_ = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode()
+    opcoes = {'filename': ascii_} if ascii_ == nome else {'filename': ascii_, 'filename*': f"UTF-8''{quote(nome)}"}
+    response.headers.set('Content-Disposition', 'attachment', **opcoes)
+    return response
+
+
+def _resposta(formato, nome, relatorio, descricao):
+    cabecalho, linhas = relatorio
+    registrar_log(acao=f'exportar_{nome}', descricao=descricao)
+    arquivo = f'{nome}_{date.today().isoformat()}.{formato}'
+    return Response(
+        stream_with_context(gerar(formato, nome, cabecalho, linhas)),
+        content_type=FORMATOS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename="{arquivo}"',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no',  # nginx repassa os pedaços sem acumular a resposta
+        },
+    )
+
+
+@exportacao_bp.before_request
+@login_required
+def _exigir_permissao():
+    if request.view_args and 'formato' in request.view_args and request.view_args['formato'] not in FORMATOS:
+        abort(404)
+    if not current_user.has_permission('download'):
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+
+
+@exportacao_bp.route('/colaboradores.<formato>')
+def exportar_colaboradores(formato):
+    return _resposta(formato, 'colaboradores', relatorio_colaboradores(),
+                     f'Exportação de colaboradores ({formato})')
+
+
+@exportacao_bp.route('/vencimentos.<formato>')
+def exportar_vencimentos(formato):
+    situacao = request.args.get('situacao', 'todos')
+    if situacao not in SITUACOES:
+        abort(400)
+    return _resposta(formato, 'vencimentos', relatorio_vencimentos(situacao),
+                     f'Exportação de vencimentos: {situacao} ({formato})')
+
+
+@exportacao_bp.route('/auditoria.<formato>')
+def exportar_auditoria(formato):
+    if current_user.role != 'administrador':
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    filtros = ler_filtros(request.args)
+    ativos = ', '.join(f'{nome}={valor}' for nome, valor in filtros.items() if valor) or 'sem filtros'
+    return _resposta(formato, 'auditoria', relatorio_auditoria(filtros),
+                     f'Exportação da auditoria: {ativos} ({formato})')
+
+
+@exportacao_bp.route('/colaborador/<int:colaborador_id>/documentos.zip')
+def baixar_documentos_colaborador(colaborador_id):
+    """Todos os documentos do colaborador, ou só os marcados (parâmetro `ids`, repetido)."""
+    colaborador = Colaborador.query.get_or_404(colaborador_id)
+    ids = request.args.getlist('ids', type=int)
+    criterio = f'{len(set(ids))} selecionado(s)' if ids else 'todos'
+    response = _resposta_zip(
+        documentos_do_pacote(colaborador_id=colaborador_id, ids=ids),
+        f'documentos_{colaborador.nome}',
+        f'{colaborador.nome} ({criterio})',
+        tabela_afetada='colaborador', registro_id=colaborador_id,
+    )
+    if response is None:
+        flash('Nenhum documento para baixar', 'info')
+        return redirect(url_for('documentos.documentos_colaborador', colaborador_id=colaborador_id))
+    return response
+
+
+@exportacao_bp.route('/departamento/documentos.zip')
+def baixar_documentos_departamento():
+    """Documentos de todos os colaboradores de um departamento, uma pasta por colaborador."""
+    departamento = request.args.get('departamento', '').strip()
+    if not departamento:
+        abort(400)
+    response = _resposta_zip(
+        documentos_do_pacote(departamento=departamento),
+        f'documentos_{departamento}',
+        f'departamento {departamento}',
+        por_colaborador=True, tabela_afetada='colaborador',
+    )
+    if response is None:
+        flash(f'Nenhum documento no departamento {departamento}', 'info')
+        return redirect(url_for('documentos.documentos'))
+    return response
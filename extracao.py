@@ -0,0 +1,223 @@
+import logging
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import as_completed
+from flask import current_app
+from sqlalchemy import select, update
+from models import db, ConteudoDocumento, Documento
+from busca import indexar_conteudo
+
+logger = logging.getLogger(__name__)
+
+# Limite de texto guardado por documento (scans grandes com OCR embutido podem ser enormes)
+MAX_CARACTERES = 1_000_000
+
+
+# Executado nos processos do pool: não usa app, sessão nem nada que não seja picklable
+
+def extrair_texto(caminho):
+    """Retorna (status, texto, paginas, tamanho_bytes) para o arquivo em `caminho`."""
+    tamanho = os.path.getsize(caminho)
+    extensao = os.path.splitext(caminho)[1].lower()
+
+    if extensao == '.pdf':
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            return 'sem_suporte', '', None, tamanho
+        leitor = PdfReader(caminho)
+        partes = []
+        total = 0
+        for pagina in leitor.pages:
+            if total >= MAX_CARACTERES:
+                break
+            texto = pagina.extract_text() or ''
+            partes.append(texto)
+            total += len(texto)
+        return 'concluida', '\n'.join(partes)[:MAX_CARACTERES], len(leitor.pages), tamanho
+
+    if extensao == '.docx':
+        try:
+            import docx
+        except ImportError:
+            return 'sem_suporte', '', None, tamanho
+        documento = docx.Document(caminho)
+        texto = '\n'.join(paragrafo.text for paragrafo in documento.paragraphs)
+        return 'concluida', texto[:MAX_CARACTERES], _paginas_docx(caminho), tamanho
+
+    # Imagens e .doc antigos: sem extração (não há OCR)
+    return 'sem_suporte', '', None, tamanho
+
+
+def _paginas_docx(caminho):
+    # O Word grava a contagem de páginas em docProps/app.xml
+    try:
+        with zipfile.ZipFile(caminho) as pacote:
+            app_xml = pacote.read('docProps/app.xml').decode('utf-8', 'ignore')
+    except (KeyError, zipfile.BadZipFile):
+        return None
+    encontrado = re.search(r'<Pages>(\d+)</Pages>', app_xml)
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def _extrair_seguro(documento_id, caminho):
+    try:
+        return (documento_id,) + extrair_texto(caminho)
+    except Exception as e:
+        return documento_id, 'erro', str(e)[:500], None, None
+
+
+# Lado do app
+
+def _aplicar_resultado(documento_id, status, texto, paginas, tamanho):
+    """Grava o resultado de uma extração (roda no processo do app)."""
+    documento = db.session.get(Documento, documento_id)
+    if documento is None:
+        return
+    documento.extracao_status = status
+    documento.paginas = paginas
+    documento.tamanho_bytes = tamanho
+    if status == 'concluida':
+        if documento.conteudo is None:
+            documento.conteudo = ConteudoDocumento(texto=texto)
+        else:
+            documento.conteudo.texto = texto
+        db.session.flush()
+        indexar_conteudo(db.session.connection(), documento.id, documento.colaborador_id, documento.nome, texto)
+    elif status == 'erro':
+        logger.warning('Falha ao extrair texto do documento %s: %s', documento_id, texto)
+
+
+def _reaproveitar_conteudo(documento):
+    """Arquivos idênticos (mesmo hash) já extraídos não passam de novo pelo pool."""
+    if not documento.arquivo_hash:
+        return False
+    origem = db.session.execute(
+        select(Documento.paginas, Documento.tamanho_bytes, ConteudoDocumento.texto)
+        .join(ConteudoDocumento, ConteudoDocumento.documento_id == Documento.id)
+        .where(Documento.arquivo_hash == documento.arquivo_hash, Documento.id != documento.id,
+               Documento.extracao_status == 'concluida')
+        .limit(1)
+    ).first()
+    if origem is None:
+        return False
+    _aplicar_resultado(documento.id, 'concluida', origem.texto, origem.paginas, origem.tamanho_bytes)
+    return True
+
+
+class ExtratorTexto:
+    """Pool de processos usado pelo app para extrair texto fora do request.
+
+    O documento fica com extracao_status='pendente' até o resultado ser
+    gravado; se o processo cair antes disso, `flask extrair-textos`
+    retoma os pendentes.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('EXTRACAO_PROCESSOS', 2)
+        app.config.setdefault('EXTRACAO_ASSINCRONA', True)
+        self.app = app
+
+    def _obter_pool(self):
+        # Importado só no primeiro uso: multiprocessing pesa no boot de cada worker
+        from concurrent.futures import ProcessPoolExecutor
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.app.config['EXTRACAO_PROCESSOS'])
+                self._pid = os.getpid()
+            return self._pool
+
+    def agendar(self, documento):
+        """Envia o arquivo do documento (já gravado como pendente) para o pool."""
+        if not self.app.config['EXTRACAO_ASSINCRONA']:
+            return
+        if _reaproveitar_conteudo(documento):
+            db.session.commit()
+            return
+        self._enviar(documento.id, documento.arquivo)
+
+    def agendar_lote(self, documentos_ids, tamanho_lote=500):
+        """Envia ao pool documentos criados em lote (importação), sem carregar os objetos."""
+        if not self.app.config['EXTRACAO_ASSINCRONA']:
+            return
+        for inicio in range(0, len(documentos_ids), tamanho_lote):
+            for documento_id, arquivo in db.session.execute(
+                    select(Documento.id, Documento.arquivo)
+                    .where(Documento.id.in_(documentos_ids[inicio:inicio + tamanho_lote]))):
+                self._enviar(documento_id, arquivo)
+
+    def _enviar(self, documento_id, arquivo):
+        caminho = os.path.abspath(os.path.join(self.app.config['UPLOAD_FOLDER'], arquivo))
+        futuro = self._obter_pool().submit(_extrair_seguro, documento_id, caminho)
+        futuro.add_done_callback(self._concluir)
+
+    def _concluir(self, futuro):
+        try:
+            resultado = futuro.result()
+        except Exception:
+            logger.exception('Pool de extração falhou; o documento segue pendente')
+            return
+        with self.app.app_context():
+            try:
+                _aplicar_resultado(*resultado)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Erro ao gravar o texto extraído do documento %s', resultado[0])
+
+
+extrator_texto = ExtratorTexto()
+
+
+def processar_pendentes(processos=None, incluir_sem_status=True, tamanho_lote=200):
+    """Extrai o texto de todos os documentos pendentes usando todos os núcleos.
+
+    Com `incluir_sem_status`, documentos enviados antes desta funcionalidade
+    (extracao_status NULL) também são processados (backfill de uploads/).
+    Os resultados são gravados a cada `tamanho_lote`, então uma interrupção
+    perde no máximo um lote. Retorna o total processado.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    if incluir_sem_status:
+        db.session.execute(
+            update(Documento).where(Documento.extracao_status.is_(None)).values(extracao_status='pendente')
+        )
+        db.session.commit()
+
+    pasta = current_app.config['UPLOAD_FOLDER']
+    total = 0
+    ultimo_id = 0
+    with ProcessPoolExecutor(max_workers=processos or os.cpu_count()) as pool:
+        while True:
+            documentos = Documento.query.filter(
+                Documento.extracao_status == 'pendente', Documento.id > ultimo_id
+            ).order_by(Documento.id).limit(tamanho_lote).all()
+            if not documentos:
+                break
+            ultimo_id = documentos[-1].id
+
+            futuros = []
+            for documento in documentos:
+                if _reaproveitar_conteudo(documento):
+                    continue
+                caminho = os.path.abspath(os.path.join(pasta, documento.arquivo))
+                if not os.path.exists(caminho):
+                    _aplicar_resultado(documento.id, 'erro', 'arquivo não encontrado', None, None)
+                    continue
+                futuros.append(pool.submit(_extrair_seguro, documento.id, caminho))
+
+            for futuro in as_completed(futuros):
+                _aplicar_resultado(*futuro.result())
+            db.session.commit()
+            db.session.expunge_all()
+            total += len(documentos)
+
+    return total
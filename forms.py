@@ -35,6 +35,15 @@ class DocumentoForm(FlaskForm):
         if self.tipo_validade.data == 'personalizado' and not field.data:
             raise ValidationError('Data de validade é obrigatória quando o tipo é "Data Personalizada"')
 
+class ImportacaoForm(FlaskForm):
+    colaboradores = FileField('Colaboradores (CSV)', validators=[FileAllowed(['csv'], 'Envie um arquivo .csv')])
+    documentos = FileField('Documentos (ZIP com documentos.csv)', validators=[FileAllowed(['zip'], 'Envie um arquivo .zip')])
+    submit = SubmitField('Importar')
+
+    def validate_documentos(self, field):
+        if not field.data and not self.colaboradores.data:
+            raise ValidationError('Envie ao menos um arquivo')
+
 class UsuarioForm(FlaskForm):
     username = StringField('Usuário', validators=[DataRequired(), Length(max=80)])
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -57,4 +66,8 @@ class EditarUsuarioForm(FlaskForm):
         ('gestor', 'Gestor'),
         ('administrador', 'Administrador')
     ], validators=[DataRequired()])
-    submit = SubmitField('Atualizar Usuário')
\ No newline at end of file
+    submit = SubmitField('Atualizar Usuário')
+
+# Operações em lote (renovar/excluir): só o token CSRF; os critérios vêm dos campos do formulário HTML
+class OperacaoLoteForm(FlaskForm):
+    pass
@@ -0,0 +1,214 @@
+import csv
+import io
+import os
+import re
+import zipfile
+from werkzeug.datastructures import FileStorage, MultiDict
+from models import db, Colaborador, Documento
+from forms import ColaboradorForm, DocumentoForm
+from storage import salvar_lote
+from utils import calcular_data_validade
+
+# Importação em massa
+#
+# colaboradores.csv: nome, email, departamento, cargo, data_admissao
+# documentos.zip:    documentos.csv (manifesto) + os arquivos referenciados nele
+#                    manifesto: colaborador_email, nome, tipo_validade,
+#                    data_validade, arquivo, observacoes
+#
+# As linhas passam pelos mesmos formulários das telas de cadastro; as válidas
+# são gravadas em lotes (um commit e um registro de auditoria por lote) e as
+# inválidas voltam no relatório com o número da linha.
+#
+# Pela tela /importar o envio é limitado por MAX_CONTENT_LENGTH (16 MB); ZIPs
+# maiores são importados no servidor com `flask importar --documentos`.
+
+MANIFESTO = 'documentos.csv'
+_DATA_BR = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+
+
+class RelatorioImportacao:
+    def __init__(self):
+        self.colaboradores = 0
+        self.documentos = 0
+        self.documentos_ids = []
+        self.lotes = 0
+        self.erros = []  # (origem, linha, mensagem)
+
+    def erro(self, origem, linha, mensagem):
+        self.erros.append((origem, linha, mensagem))
+
+
+def _ler_csv(stream):
+    """Lê um CSV (UTF-8, separado por vírgula ou ponto e vírgula) linha a linha."""
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    amostra = texto.readline()
+    delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+    leitor = csv.DictReader([amostra], delimiter=delimitador)
+    campos = [campo.strip().lower() for campo in leitor.fieldnames or []]
+    for numero, linha in enumerate(csv.DictReader(texto, fieldnames=campos, delimiter=delimitador), start=2):
+        yield numero, {chave: (valor or '').strip() for chave, valor in linha.items() if chave}
+
+
+def _normalizar_data(valor):
+    # Planilhas brasileiras exportam dd/mm/aaaa; os formulários esperam aaaa-mm-dd
+    encontrado = _DATA_BR.match(valor or '')
+    return f'{encontrado.group(3)}-{encontrado.group(2)}-{encontrado.group(1)}' if encontrado else valor
+
+
+def _erros_formulario(form):
+    return '; '.join(f'{campo}: {" ".join(mensagens)}' for campo, mensagens in form.errors.items())
+
+
+def _lotes(linhas, tamanho_lote):
+    lote = []
+    for item in linhas:
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def importar_colaboradores(stream, auditar, relatorio=None, tamanho_lote=1000):
+    """Importa colaboradores de um CSV.
+
+    `auditar(acao, descricao, tabela_afetada)` é chamado uma vez por lote
+    gravado. E-mails já cadastrados (ou repetidos no arquivo) são rejeitados,
+    então reimportar o mesmo arquivo não duplica registros.
+    """
+    relatorio = relatorio or RelatorioImportacao()
+    vistos = set()
+
+    for lote in _lotes(_ler_csv(stream), tamanho_lote):
+        emails = {linha.get('email', '').lower() for _, linha in lote}
+        existentes = {email.lower() for (email,) in db.session.query(Colaborador.email).filter(
+            db.func.lower(Colaborador.email).in_(emails))}
+
+        novos = []
+        for numero, linha in lote:
+            linha['data_admissao'] = _normalizar_data(linha.get('data_admissao'))
+            form = ColaboradorForm(formdata=MultiDict(linha), meta={'csrf': False})
+            if not form.validate():
+                relatorio.erro('colaboradores', numero, _erros_formulario(form))
+                continue
+            email = form.email.data.lower()
+            if email in existentes or email in vistos:
+                relatorio.erro('colaboradores', numero, f'email: {form.email.data} já cadastrado')
+                continue
+            vistos.add(email)
+            novos.append(Colaborador(
+                nome=form.nome.data,
+                email=form.email.data,
+                departamento=form.departamento.data,
+                cargo=form.cargo.data,
+                data_admissao=form.data_admissao.data
+            ))
+
+        if novos:
+            db.session.add_all(novos)
+            db.session.commit()
+            auditar('importar_colaboradores',
+                    f'{len(novos)} colaborador(es) importado(s) (linhas {lote[0][0]}-{lote[-1][0]})',
+                    'colaborador')
+            relatorio.colaboradores += len(novos)
+            relatorio.lotes += 1
+        db.session.expunge_all()
+
+    return relatorio
+
+
+def importar_documentos(arquivo_zip, auditar, relatorio=None, tamanho_lote=500, usuario_id=None):
+    """Importa documentos de um ZIP com o manifesto documentos.csv.
+
+    Cada lote grava os arquivos com storage.salvar_lote (deduplicados por
+    hash) e os documentos com um único commit. Os documentos ficam com
+    extração de texto pendente; os ids criados vão em relatorio.documentos_ids.
+    """
+    relatorio = relatorio or RelatorioImportacao()
+
+    with zipfile.ZipFile(arquivo_zip) as pacote:
+        membros = {os.path.normpath(info.filename): info for info in pacote.infolist() if not info.is_dir()}
+        if MANIFESTO not in membros:
+            relatorio.erro('documentos', 0, f'{MANIFESTO} não encontrado no ZIP')
+            return relatorio
+
+        with pacote.open(membros[MANIFESTO]) as manifesto:
+            for lote in _lotes(_ler_csv(manifesto), tamanho_lote):
+                _importar_lote_documentos(pacote, membros, lote, auditar, relatorio, usuario_id)
+
+    return relatorio
+
+
+def _importar_lote_documentos(pacote, membros, lote, auditar, relatorio, usuario_id):
+    emails = {linha.get('colaborador_email', '').lower() for _, linha in lote}
+    colaboradores = {}
+    for colaborador_id, email in db.session.query(Colaborador.id, Colaborador.email).filter(
+            db.func.lower(Colaborador.email).in_(emails)).order_by(Colaborador.id.desc()):
+        colaboradores[email.lower()] = colaborador_id  # e-mail repetido: fica o mais antigo
+
+    validos = []
+    abertos = []
+    try:
+        for numero, linha in lote:
+            colaborador_id = colaboradores.get(linha.get('colaborador_email', '').lower())
+            if colaborador_id is None:
+                relatorio.erro('documentos', numero, f'colaborador_email: {linha.get("colaborador_email")} não encontrado')
+                continue
+            nome_membro = os.path.normpath(linha.get('arquivo') or '')
+            info = membros.get(nome_membro) if nome_membro != MANIFESTO else None
+            if info is None:
+                relatorio.erro('documentos', numero, f'arquivo: {linha.get("arquivo")} não encontrado no ZIP')
+                continue
+
+            stream = pacote.open(info)
+            abertos.append(stream)
+            dados = MultiDict(linha)
+            dados['data_validade'] = _normalizar_data(linha.get('data_validade'))
+            dados['arquivo'] = FileStorage(stream=stream, filename=os.path.basename(info.filename))
+            form = DocumentoForm(formdata=dados, meta={'csrf': False})
+            if not form.validate():
+                relatorio.erro('documentos', numero, _erros_formulario(form))
+                continue
+            validos.append((colaborador_id, form, stream))
+
+        if not validos:
+            return
+
+        armazenados = salvar_lote([(stream, form.arquivo.data.filename) for _, form, stream in validos])
+        novos = []
+        for (colaborador_id, form, _), armazenado in zip(validos, armazenados):
+            novos.append(Documento(
+                colaborador_id=colaborador_id,
+                nome=form.nome.data,
+                tipo_validade=form.tipo_validade.data,
+                data_validade=calcular_data_validade(
+                    form.tipo_validade.data,
+                    form.data_validade.data if form.tipo_validade.data == 'personalizado' else None
+                ),
+                arquivo=armazenado.caminho,
+                arquivo_hash=armazenado.hash,
+                nome_arquivo=form.arquivo.data.filename,
+                extracao_status='pendente',
+                usuario_id=usuario_id,
+                observacoes=form.observacoes.data
+            ))
+        db.session.add_all(novos)
+        db.session.flush()
+        ids = [documento.id for documento in novos]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        for stream in abertos:
+            stream.close()
+
+    relatorio.documentos_ids.extend(ids)
+    auditar('importar_documentos',
+            f'{len(novos)} documento(s) importado(s) (linhas {lote[0][0]}-{lote[-1][0]})',
+            'documento')
+    relatorio.documentos += len(novos)
+    relatorio.lotes += 1
+    db.session.expunge_all()
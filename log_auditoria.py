@@ -0,0 +1,370 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import request
+from flask_login import current_user
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+from models import db, LogAuditoria, UserAgent
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()  # sentinela que encerra a thread de gravação
+
+
+class GravadorAuditoria:
+    """Grava LogAuditoria em lotes a partir de uma fila em memória.
+
+    registrar() apenas enfileira; uma thread em segundo plano junta até
+    AUDITORIA_LOTE registros (ou o que chegar em AUDITORIA_INTERVALO
+    segundos) e insere tudo com um único executemany/commit. Se a fila
+    estiver cheia ou o banco indisponível, os registros vão para um arquivo
+    JSONL em instance/ que é reprocessado quando o banco volta.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._user_agents = {}  # texto -> id, evita consultar user_agent a cada lote
+        self._metricas = {
+            'enfileirados': 0,
+            'gravados': 0,
+            'lotes': 0,
+            'desviados_para_arquivo': 0,
+            'reprocessados_do_arquivo': 0,
+            'invalidos_em_arquivo': 0,
+            'falhas': 0,
+            'fila_cheia': 0,
+            'maior_fila': 0,
+            'ultimo_lote_ms': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AUDITORIA_ASSINCRONA', True)
+        app.config.setdefault('AUDITORIA_FILA_MAX', 10000)
+        app.config.setdefault('AUDITORIA_LOTE', 500)
+        app.config.setdefault('AUDITORIA_INTERVALO', 0.5)  # segundos
+        app.config.setdefault('AUDITORIA_ESPERA_MAX', 0.05)  # segundos bloqueado com a fila cheia
+        app.config.setdefault('AUDITORIA_ARQUIVO_PENDENTE',
+                              os.path.join(app.instance_path, 'auditoria_pendente.jsonl'))
+        self.app = app
+        atexit.register(self.encerrar)
+
+    # API pública
+
+    def registrar(self, dados):
+        """Enfileira um registro (dict com as colunas de LogAuditoria)."""
+        if not self.app.config['AUDITORIA_ASSINCRONA']:
+            self._gravar_lote([dados])
+            return
+
+        self._iniciar()
+        try:
+            self._fila.put(dados, timeout=self.app.config['AUDITORIA_ESPERA_MAX'])
+        except queue.Full:
+            # Contrapressão: não segura o request, o registro vai para o disco
+            self._metricas['fila_cheia'] += 1
+            self._desviar_para_arquivo([dados])
+            return
+
+        self._metricas['enfileirados'] += 1
+        self._metricas['maior_fila'] = max(self._metricas['maior_fila'], self._fila.qsize())
+
+    def descarregar(self, timeout=10):
+        """Espera até que tudo que já foi enfileirado esteja gravado."""
+        if self._fila is None or self._pid != os.getpid():
+            return True
+        limite = time.monotonic() + timeout
+        while self._fila.unfinished_tasks and time.monotonic() < limite:
+            time.sleep(0.01)
+        return not self._fila.unfinished_tasks
+
+    def encerrar(self, timeout=10):
+        """Descarrega a fila e para a thread (chamado no desligamento do processo)."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+            try:
+                self._fila.put(_FIM, timeout=timeout)
+            except queue.Full:
+                logger.warning('Fila de auditoria cheia no desligamento')
+            self._thread.join(timeout)
+            self._thread = None
+
+    def metricas(self):
+        metricas = dict(self._metricas)
+        metricas['em_fila'] = self._fila.qsize() if self._fila is not None else 0
+        metricas['capacidade_fila'] = self.app.config['AUDITORIA_FILA_MAX'] if self.app else 0
+        arquivo = self.app.config['AUDITORIA_ARQUIVO_PENDENTE'] if self.app else None
+        metricas['pendentes_em_arquivo'] = _contar_linhas(arquivo)
+        return metricas
+
+    def reprocessar_arquivo(self):
+        """Reenvia ao banco os registros guardados no arquivo de pendências.
+
+        Todos os workers escrevem no mesmo arquivo; para reprocessá-lo, cada
+        processo primeiro o renomeia para <arquivo>.<pid>.processando
+        (os.replace é atômico, só um processo consegue) e só lê o que
+        reivindicou. Linhas que não podem ser lidas ou inseridas vão para
+        <arquivo>.invalidos em vez de bloquear o resto.
+        """
+        processando = self._reivindicar()
+        if processando is None:
+            return 0
+
+        total = 0
+        lote = []
+        tamanho_lote = self.app.config['AUDITORIA_LOTE']
+        # Uma transação para o arquivo inteiro: uma falha no meio não duplica registros
+        with self.app.app_context(), db.engine.begin() as conn, \
+                open(processando, encoding='utf-8') as pendentes:
+            for linha in pendentes:
+                if not linha.strip():
+                    continue
+                try:
+                    dados = json.loads(linha)
+                    dados['created_at'] = datetime.fromisoformat(dados['created_at'])
+                except (ValueError, TypeError, KeyError):
+                    self._separar_invalidos([linha])
+                    continue
+                lote.append((linha, dados))
+                if len(lote) >= tamanho_lote:
+                    total += self._reinserir(conn, lote)
+                    lote = []
+            if lote:
+                total += self._reinserir(conn, lote)
+
+        try:
+            os.remove(processando)
+        except FileNotFoundError:
+            pass
+        self._metricas['reprocessados_do_arquivo'] += total
+        return total
+
+    def _reivindicar(self):
+        """Renomeia o arquivo de pendências para um nome só deste processo.
+
+        Retorna o caminho reivindicado ou None se não há nada a reprocessar.
+        Sobras de uma execução anterior deste pid, ou de um processo que já
+        terminou, são retomadas antes do arquivo compartilhado.
+        """
+        arquivo = self.app.config['AUDITORIA_ARQUIVO_PENDENTE']
+        processando = f'{arquivo}.{os.getpid()}.processando'
+        with self._lock_arquivo:
+            if os.path.exists(processando):
+                return processando
+            for abandonado in _abandonados(arquivo):
+                try:
+                    os.replace(abandonado, processando)
+                    return processando
+                except FileNotFoundError:
+                    continue  # outro processo retomou primeiro
+            try:
+                os.replace(arquivo, processando)
+            except FileNotFoundError:
+                return None
+            return processando
+
+    def _reinserir(self, conn, lote):
+        """Insere um lote do arquivo de pendências; retorna quantos registros entraram.
+
+        O lote roda em um savepoint. Se o banco recusar os dados (e não apenas
+        estiver indisponível), as linhas são tentadas uma a uma e as recusadas
+        vão para o arquivo de inválidos.
+        """
+        try:
+            with conn.begin_nested():
+                self._inserir_na_conexao(conn, [dados for _, dados in lote])
+            return len(lote)
+        except Exception as erro:
+            # Ids de user_agent inseridos no savepoint desfeito não existem mais
+            self._user_agents.clear()
+            if isinstance(erro, OperationalError):
+                raise  # banco indisponível ou travado: o arquivo inteiro fica para a próxima tentativa
+            if len(lote) == 1:
+                logger.exception('Registro de auditoria pendente recusado pelo banco')
+                self._separar_invalidos([lote[0][0]])
+                return 0
+        return sum(self._reinserir(conn, [item]) for item in lote)
+
+    def _separar_invalidos(self, linhas):
+        arquivo = self.app.config['AUDITORIA_ARQUIVO_PENDENTE'] + '.invalidos'
+        with open(arquivo, 'a', encoding='utf-8') as invalidos:
+            invalidos.writelines(linha if linha.endswith('\n') else linha + '\n' for linha in linhas)
+        self._metricas['invalidos_em_arquivo'] += len(linhas)
+        logger.warning('%d registro(s) de auditoria pendente(s) separados em %s', len(linhas), arquivo)
+
+    # Thread de gravação
+
+    def _iniciar(self):
+        # Threads não sobrevivem ao fork dos workers: cada processo cria a sua
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._fila = queue.Queue(maxsize=self.app.config['AUDITORIA_FILA_MAX'])
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name='gravador-auditoria', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        tamanho_lote = self.app.config['AUDITORIA_LOTE']
+        intervalo = self.app.config['AUDITORIA_INTERVALO']
+        encerrar = False
+        while not encerrar:
+            try:
+                primeiro = self._fila.get(timeout=intervalo)
+            except queue.Empty:
+                self._reprocessar_se_houver()
+                continue
+
+            lote = []
+            item = primeiro
+            while True:
+                if item is _FIM:
+                    encerrar = True
+                else:
+                    lote.append(item)
+                if encerrar or len(lote) >= tamanho_lote:
+                    break
+                try:
+                    item = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+
+            if lote:
+                self._gravar_lote(lote)
+            for _ in range(len(lote) + (1 if encerrar else 0)):
+                self._fila.task_done()
+
+    def _reprocessar_se_houver(self):
+        arquivo = self.app.config['AUDITORIA_ARQUIVO_PENDENTE']
+        if not (os.path.exists(arquivo) or os.path.exists(f'{arquivo}.{os.getpid()}.processando')
+                or _abandonados(arquivo)):
+            return
+        try:
+            self.reprocessar_arquivo()
+        except Exception:
+            logger.warning('Banco ainda indisponível para reprocessar a auditoria pendente', exc_info=True)
+
+    def _gravar_lote(self, lote):
+        inicio = time.perf_counter()
+        try:
+            self._inserir(lote)
+        except Exception:
+            self._metricas['falhas'] += 1
+            logger.exception('Erro ao gravar %d registro(s) de auditoria; salvando em arquivo', len(lote))
+            self._desviar_para_arquivo(lote)
+            return
+        self._metricas['gravados'] += len(lote)
+        self._metricas['lotes'] += 1
+        self._metricas['ultimo_lote_ms'] = (time.perf_counter() - inicio) * 1000
+
+    def _inserir(self, lote):
+        # Conexão própria, fora da sessão do request: um executemany por transação
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                self._inserir_na_conexao(conn, lote)
+
+    def _inserir_na_conexao(self, conn, lote):
+        ids = internar_user_agents(conn, {d.get('user_agent') for d in lote}, self._user_agents)
+        if len(self._user_agents) > 1000:
+            self._user_agents.clear()
+        linhas = [dict(d, user_agent=None, user_agent_id=ids.get(d.get('user_agent'))) for d in lote]
+        conn.execute(insert(LogAuditoria.__table__), linhas)
+
+    def _desviar_para_arquivo(self, lote):
+        arquivo = self.app.config['AUDITORIA_ARQUIVO_PENDENTE']
+        try:
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            with self._lock_arquivo, open(arquivo, 'a', encoding='utf-8') as pendentes:
+                for dados in lote:
+                    pendentes.write(json.dumps(dict(dados, created_at=dados['created_at'].isoformat())) + '\n')
+                pendentes.flush()
+                os.fsync(pendentes.fileno())
+            self._metricas['desviados_para_arquivo'] += len(lote)
+        except Exception:
+            logger.exception('Registros de auditoria perdidos: %r', lote)
+
+
+def internar_user_agents(conn, textos, conhecidos=None):
+    """Garante uma linha em user_agent para cada texto e devolve {texto: id}."""
+    conhecidos = {} if conhecidos is None else conhecidos
+    faltando = {texto for texto in textos if texto and texto not in conhecidos}
+    if faltando:
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+            comando = pg_insert(UserAgent.__table__).on_conflict_do_nothing()
+        else:
+            comando = insert(UserAgent.__table__).prefix_with('OR IGNORE')
+        conn.execute(comando, [{'texto': texto} for texto in faltando])
+        conhecidos.update(conn.execute(
+            select(UserAgent.texto, UserAgent.id).where(UserAgent.texto.in_(faltando))
+        ).all())
+    return {texto: conhecidos[texto] for texto in textos if texto in conhecidos}
+
+
+def _processo_ativo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _reivindicados(arquivo):
+    """Arquivos <arquivo>.<pid>.processando de todos os processos, como {caminho: pid}."""
+    caminhos = {}
+    for caminho in glob.glob(glob.escape(arquivo) + '.*.processando'):
+        pid = caminho[len(arquivo) + 1:-len('.processando')]
+        if pid.isdigit():
+            caminhos[caminho] = int(pid)
+    return caminhos
+
+
+def _abandonados(arquivo):
+    """Arquivos reivindicados por processos que já terminaram."""
+    return [caminho for caminho, pid in _reivindicados(arquivo).items() if not _processo_ativo(pid)]
+
+
+def _contar_linhas(caminho):
+    """Registros ainda em arquivo: o compartilhado e os reivindicados por qualquer processo."""
+    total = 0
+    for nome in [caminho, *_reivindicados(caminho)] if caminho else ():
+        if os.path.exists(nome):
+            with open(nome, 'rb') as arquivo:
+                total += sum(1 for _ in arquivo)
+    return total
+
+
+gravador_auditoria = GravadorAuditoria()
+
+
+def registrar_log(acao, descricao, tabela_afetada=None, registro_id=None):
+    """Registra uma ação do usuário logado no request atual."""
+    # Só captura os dados do request; a gravação é feita em lote pelo gravador_auditoria
+    gravador_auditoria.registrar(dict(
+        usuario_id=current_user.id,
+        acao=acao,
+        descricao=descricao,
+        tabela_afetada=tabela_afetada,
+        registro_id=registro_id,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        created_at=datetime.utcnow()
+    ))
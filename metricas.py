@@ -0,0 +1,281 @@
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from flask import (Blueprint, Response, abort, before_render_template, current_app, g,
+                   has_request_context, request, template_rendered)
+from sqlalchemy import event
+from models import db
+from log_auditoria import gravador_auditoria
+
+logger = logging.getLogger(__name__)
+
+# Instrumentação por request
+#
+# Para cada endpoint: número de consultas SQL e tempo gasto nelas (eventos do
+# engine), tempo de renderização dos templates (sinais do Flask), duração e
+# tamanho da resposta. Os totais ficam em memória, por processo, e saem em
+# /metrics no formato texto do Prometheus (com vários workers, cada scrape
+# vê o worker que atendeu).
+#
+# Requests acima de METRICAS_LIMITE_MS ou de METRICAS_LIMITE_CONSULTAS geram
+# um warning em JSON com as consultas mais repetidas e as mais lentas; uma
+# mesma consulta repetida dezenas de vezes costuma ser um N+1.
+
+# Limites dos histogramas
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # segundos
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+# Consultas distintas guardadas por request para o log de requests lentos
+MAX_CONSULTAS_DISTINTAS = 200
+
+
+class _Histograma:
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{_rotulos(rotulos, le=_numero(limite))} {acumulado}'
+        yield f'{nome}_bucket{_rotulos(rotulos, le="+Inf")} {self.total}'
+        yield f'{nome}_sum{_rotulos(rotulos)} {_numero(self.soma)}'
+        yield f'{nome}_count{_rotulos(rotulos)} {self.total}'
+
+
+class _Endpoint:
+    __slots__ = ('status', 'duracao', 'consultas', 'sql_segundos', 'template_segundos', 'bytes', 'lentos')
+
+    def __init__(self):
+        self.status = Counter()
+        self.duracao = _Histograma(BUCKETS_DURACAO)
+        self.consultas = _Histograma(BUCKETS_CONSULTAS)
+        self.sql_segundos = 0.0
+        self.template_segundos = 0.0
+        self.bytes = 0
+        self.lentos = 0
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(rotulos, **extras):
+    pares = list(rotulos.items()) + list(extras.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+class _Request:
+    """Acumulado do request atual (guardado em g)."""
+    __slots__ = ('inicio', 'consultas', 'sql_segundos', 'template_segundos', 'inicio_template', 'instrucoes')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_segundos = 0.0
+        self.template_segundos = 0.0
+        self.inicio_template = []
+        self.instrucoes = {}  # sql -> [vezes, segundos]
+
+
+class MetricasRequisicoes:
+    """Coleta as métricas por endpoint e as expõe em /metrics."""
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._inicio = time.time()
+
+    def init_app(self, app):
+        app.config.setdefault('METRICAS_HABILITADAS', True)
+        app.config.setdefault('METRICAS_LIMITE_MS', 1000)  # requests mais lentos que isso geram warning
+        app.config.setdefault('METRICAS_LIMITE_CONSULTAS', 50)  # idem para o número de consultas
+        app.config.setdefault('METRICAS_CONSULTAS_NO_LOG', 10)  # consultas listadas no warning
+        app.config.setdefault('METRICAS_TOKEN', None)  # se definido, /metrics exige "Authorization: Bearer <token>"
+        self.app = app
+        if not app.config['METRICAS_HABILITADAS']:
+            return
+
+        app.before_request(self._antes)
+        app.after_request(self._depois)
+        before_render_template.connect(self._antes_template, app)
+        template_rendered.connect(self._depois_template, app)
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._antes_consulta)
+            event.listen(engine, 'after_cursor_execute', self._depois_consulta)
+
+    # Ganchos
+
+    def _antes(self):
+        g._metricas = _Request()
+
+    def _antes_template(self, sender, template, context, **extra):
+        atual = g.get('_metricas')
+        if atual is not None:
+            atual.inicio_template.append(time.perf_counter())
+
+    def _depois_template(self, sender, template, context, **extra):
+        atual = g.get('_metricas')
+        if atual is not None and atual.inicio_template:
+            atual.template_segundos += time.perf_counter() - atual.inicio_template.pop()
+
+    def _antes_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        context._metricas_inicio = time.perf_counter()
+
+    def _depois_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        # Threads em segundo plano (auditoria, extração) não pertencem a um request
+        if not has_request_context():
+            return
+        atual = g.get('_metricas')
+        if atual is None:
+            return
+        duracao = time.perf_counter() - context._metricas_inicio
+        atual.consultas += 1
+        atual.sql_segundos += duracao
+        instrucao = atual.instrucoes.get(statement)
+        if instrucao is not None:
+            instrucao[0] += 1
+            instrucao[1] += duracao
+        elif len(atual.instrucoes) < MAX_CONSULTAS_DISTINTAS:
+            atual.instrucoes[statement] = [1, duracao]
+
+    def _depois(self, response):
+        atual = g.pop('_metricas', None)
+        if atual is None:
+            return response
+        duracao = time.perf_counter() - atual.inicio
+        endpoint = request.endpoint or '<sem_rota>'
+        # Respostas em stream (exportações) não têm Content-Length e contam como 0
+        tamanho = response.content_length or 0
+        config = current_app.config
+        lento = (duracao * 1000 > config['METRICAS_LIMITE_MS']
+                 or atual.consultas > config['METRICAS_LIMITE_CONSULTAS'])
+
+        with self._lock:
+            metricas = self._endpoints.get((endpoint, request.method))
+            if metricas is None:
+                metricas = self._endpoints[(endpoint, request.method)] = _Endpoint()
+            metricas.status[response.status_code] += 1
+            metricas.duracao.observar(duracao)
+            metricas.consultas.observar(atual.consultas)
+            metricas.sql_segundos += atual.sql_segundos
+            metricas.template_segundos += atual.template_segundos
+            metricas.bytes += tamanho
+            metricas.lentos += lento
+
+        if lento:
+            self._registrar_lento(endpoint, response, duracao, tamanho, atual)
+        return response
+
+    def _registrar_lento(self, endpoint, response, duracao, tamanho, atual):
+        limite = current_app.config['METRICAS_CONSULTAS_NO_LOG']
+        instrucoes = [
+            {'sql': sql, 'vezes': vezes, 'ms': round(segundos * 1000, 2)}
+            for sql, (vezes, segundos) in atual.instrucoes.items()
+        ]
+        logger.warning('Request lento: %s', json.dumps({
+            'endpoint': endpoint,
+            'metodo': request.method,
+            'caminho': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'duracao_ms': round(duracao * 1000, 1),
+            'consultas': atual.consultas,
+            'sql_ms': round(atual.sql_segundos * 1000, 1),
+            'template_ms': round(atual.template_segundos * 1000, 1),
+            'bytes': tamanho,
+            'mais_repetidas': sorted(instrucoes, key=lambda i: i['vezes'], reverse=True)[:limite],
+            'mais_lentas': sorted(instrucoes, key=lambda i: i['ms'], reverse=True)[:limite],
+        }, ensure_ascii=False))
+
+    # Exposição
+
+    def texto_prometheus(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            linhas = []
+
+            def metrica(nome, tipo, ajuda):
+                linhas.append(f'# HELP {nome} {ajuda}')
+                linhas.append(f'# TYPE {nome} {tipo}')
+
+            metrica('rh_http_requisicoes_total', 'counter', 'Requests atendidos por endpoint, método e status.')
+            for (endpoint, metodo), m in endpoints:
+                for status, total in sorted(m.status.items()):
+                    linhas.append(f'rh_http_requisicoes_total'
+                                  f'{_rotulos({"endpoint": endpoint, "metodo": metodo, "status": status})} {total}')
+
+            metrica('rh_http_duracao_segundos', 'histogram', 'Duração dos requests.')
+            for (endpoint, metodo), m in endpoints:
+                linhas.extend(m.duracao.linhas('rh_http_duracao_segundos', {'endpoint': endpoint, 'metodo': metodo}))
+
+            metrica('rh_sql_consultas_por_requisicao', 'histogram', 'Consultas SQL executadas por request.')
+            for (endpoint, metodo), m in endpoints:
+                linhas.extend(m.consultas.linhas('rh_sql_consultas_por_requisicao',
+                                                 {'endpoint': endpoint, 'metodo': metodo}))
+
+            for nome, atributo, ajuda in (
+                ('rh_sql_segundos_total', 'sql_segundos', 'Tempo gasto em consultas SQL.'),
+                ('rh_template_segundos_total', 'template_segundos', 'Tempo de renderização dos templates.'),
+                ('rh_http_resposta_bytes_total', 'bytes', 'Bytes enviados (respostas com tamanho conhecido).'),
+                ('rh_http_requisicoes_lentas_total', 'lentos', 'Requests acima dos limites de tempo ou consultas.'),
+            ):
+                metrica(nome, 'counter', ajuda)
+                for (endpoint, metodo), m in endpoints:
+                    linhas.append(f'{nome}{_rotulos({"endpoint": endpoint, "metodo": metodo})} '
+                                  f'{_numero(getattr(m, atributo))}')
+
+        metrica('rh_processo_inicio_segundos', 'gauge', 'Início da coleta neste processo (epoch).')
+        linhas.append(f'rh_processo_inicio_segundos {_numero(self._inicio)}')
+
+        # Gravador de auditoria em lote (log_auditoria.py)
+        if gravador_auditoria.app is not None:
+            for nome, valor in sorted(gravador_auditoria.metricas().items()):
+                contador = nome in ('enfileirados', 'gravados', 'lotes', 'desviados_para_arquivo',
+                                    'reprocessados_do_arquivo', 'falhas', 'fila_cheia')
+                nome_metrica = f'rh_auditoria_{nome}_total' if contador else f'rh_auditoria_{nome}'
+                metrica(nome_metrica, 'counter' if contador else 'gauge',
+                        f'Gravador de auditoria: {nome.replace("_", " ")}.')
+                linhas.append(f'{nome_metrica} {_numero(valor)}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+metricas_requisicoes = MetricasRequisicoes()
+
+metricas_bp = Blueprint('metricas', __name__)
+
+
+@metricas_bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICAS_TOKEN']
+    if token:
+        recebido = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(recebido.encode(), f'Bearer {token}'.encode()):
+            abort(401)
+    return Response(metricas_requisicoes.texto_prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+from sqlalchemy import inspect, text
+from models import db
+
+
+def aplicar_migracoes():
+    """Atualiza bancos já existentes (ex.: instance/rh_documentos.db) para o esquema dos modelos.
+
+    db.create_all() só cria tabelas que ainda não existem; colunas e índices
+    novos em tabelas antigas são criados aqui. Todas as etapas são idempotentes.
+    Retorna a lista de alterações aplicadas.
+    """
+    aplicadas = []
+    inspetor = inspect(db.engine)
+
+    with db.engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name):
+                continue
+
+            # Colunas novas em tabelas antigas (precisam aceitar NULL)
+            colunas = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name not in colunas:
+                    quote = conn.dialect.identifier_preparer.quote
+                    tipo = coluna.type.compile(dialect=conn.dialect)
+                    conn.execute(text(f'ALTER TABLE {quote(tabela.name)} ADD COLUMN {quote(coluna.name)} {tipo}'))
+                    aplicadas.append(f'coluna {tabela.name}.{coluna.name}')
+
+            # Índices declarados em __table_args__
+            existentes = {indice['name'] for indice in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name not in existentes:
+                    indice.create(bind=conn)
+                    aplicadas.append(f'índice {indice.name}')
+
+        # Atualiza as estatísticas do planejador depois de criar índices
+        if any(alteracao.startswith('índice') for alteracao in aplicadas) and conn.dialect.name == 'sqlite':
+            conn.execute(text('ANALYZE'))
+
+    return aplicadas
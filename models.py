@@ -2,10 +2,31 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
+from types import MappingProxyType
 import os
 
 db = SQLAlchemy()
 
+# Permissões por cargo, montadas uma única vez (consulta O(1) em has_permission)
+ROLES_PERMISSIONS = MappingProxyType({
+    'visitante': frozenset({'download'}),
+    'operador': frozenset({'download', 'add_documento', 'add_colaborador', 'renovar_documento'}),
+    'gestor': frozenset({'download', 'add_documento', 'add_colaborador', 'renovar_documento', 'edit_documento', 'delete_documento'}),
+    'administrador': frozenset({'download', 'add_documento', 'add_colaborador', 'renovar_documento', 'edit_documento', 'delete_documento', 'add_usuario'})
+})
+
+def calcular_status(tipo_validade, data_validade, hoje=None):
+    if tipo_validade == 'indeterminado' or data_validade is None:
+        return 'válido'
+    
+    hoje = hoje or datetime.now().date()
+    if data_validade < hoje:
+        return 'vencido'
+    elif (data_validade - hoje).days <= 30:
+        return 'proximo_vencer'
+    else:
+        return 'válido'
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -21,13 +42,7 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
     
     def has_permission(self, permission):
-        roles_permissions = {
-            'visitante': ['download'],
-            'operador': ['download', 'add_documento', 'add_colaborador', 'renovar_documento'],
-            'gestor': ['download', 'add_documento', 'add_colaborador', 'renovar_documento', 'edit_documento', 'delete_documento'],
-            'administrador': ['download', 'add_documento', 'add_colaborador', 'renovar_documento', 'edit_documento', 'delete_documento', 'add_usuario']
-        }
-        return permission in roles_permissions.get(self.role, [])
+        return permission in ROLES_PERMISSIONS.get(self.role, frozenset())
 
 class Colaborador(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -39,6 +54,11 @@ class Colaborador(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     documentos = db.relationship('Documento', backref='colaborador', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_colaborador_nome', 'nome'),
+        db.Index('ix_colaborador_departamento', 'departamento'),
+    )
+
 class Documento(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     colaborador_id = db.Column(db.Integer, db.ForeignKey('colaborador.id'), nullable=False)
@@ -46,20 +66,109 @@ class Documento(db.Model):
     tipo_validade = db.Column(db.String(20), nullable=False)  # indeterminado, 3, 6, 12, personalizado
     data_upload = db.Column(db.DateTime, default=datetime.utcnow)
     data_validade = db.Column(db.Date)
-    arquivo = db.Column(db.String(200), nullable=False)
+    arquivo = db.Column(db.String(200), nullable=False)  # caminho relativo a UPLOAD_FOLDER
+    arquivo_hash = db.Column(db.String(64), index=True)  # SHA-256 do conteúdo (NULL em uploads antigos)
+    nome_arquivo = db.Column(db.String(200))  # nome original, usado no download
     observacoes = db.Column(db.Text)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # quem enviou o arquivo/validade atuais
+    status_registrado = db.Column(db.String(20))  # último status visto pela verificação de vencimentos
+    # Preenchidos pela extração de texto em segundo plano
+    extracao_status = db.Column(db.String(20), index=True)  # pendente, concluida, sem_suporte, erro
+    paginas = db.Column(db.Integer)
+    tamanho_bytes = db.Column(db.Integer)
+    conteudo = db.relationship('ConteudoDocumento', uselist=False, cascade='all, delete-orphan')
+
+    # data_validade é NULL para 'indeterminado', então o índice por data já separa
+    # os documentos com vencimento; tipo_validade entra para cobrir o filtro.
+    __table_args__ = (
+        db.Index('ix_documento_validade', 'data_validade', 'tipo_validade'),
+        db.Index('ix_documento_colaborador_nome', 'colaborador_id', 'nome'),
+        db.Index('ix_documento_status_registrado', 'status_registrado', 'data_validade'),
+    )
     
     def status_vencimento(self):
-        if self.tipo_validade == 'indeterminado':
-            return 'válido'
-        
-        hoje = datetime.now().date()
-        if self.data_validade < hoje:
-            return 'vencido'
-        elif (self.data_validade - hoje).days <= 30:
-            return 'proximo_vencer'
-        else:
-            return 'válido'
+        return calcular_status(self.tipo_validade, self.data_validade)
+
+# Revisões anteriores de um documento (a atual é o próprio Documento). Cada versão
+# guarda uma referência ao Arquivo, então reenviar o mesmo PDF não ocupa disco.
+class DocumentoVersao(db.Model):
+    __tablename__ = 'documento_versao'
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documento.id'), nullable=False)
+    numero = db.Column(db.Integer, nullable=False)  # 1 = primeira revisão substituída
+    arquivo = db.Column(db.String(200), nullable=False)
+    arquivo_hash = db.Column(db.String(64), index=True)  # NULL para uploads anteriores ao armazenamento por hash
+    nome_arquivo = db.Column(db.String(200))
+    tamanho = db.Column(db.Integer)
+    tipo_validade = db.Column(db.String(20), nullable=False)
+    data_validade = db.Column(db.Date)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # quem enviou esta revisão
+    enviado_em = db.Column(db.DateTime)  # quando esta revisão passou a valer
+    substituido_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    usuario = db.relationship('User', lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_documento_versao_documento', 'documento_id', 'numero'),
+    )
+
+# Conteúdo armazenado em uploads/, endereçado pelo SHA-256 e compartilhado entre documentos
+class Arquivo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    hash = db.Column(db.String(64), unique=True, nullable=False)
+    caminho = db.Column(db.String(200), nullable=False)  # ex.: 'ab/cd/abcd...ef.pdf'
+    tamanho = db.Column(db.Integer, nullable=False)
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Texto extraído do arquivo do documento (PDF/DOCX), indexado na busca
+class ConteudoDocumento(db.Model):
+    __tablename__ = 'conteudo_documento'
+    documento_id = db.Column(db.Integer, db.ForeignKey('documento.id'), primary_key=True)
+    texto = db.Column(db.Text, nullable=False)
+    extraido_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Mudanças de status (válido -> proximo_vencer -> vencido) detectadas pela verificação periódica
+class TransicaoVencimento(db.Model):
+    __tablename__ = 'transicao_vencimento'
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, nullable=False, index=True)  # sem FK: o histórico sobrevive à exclusão
+    colaborador_id = db.Column(db.Integer, nullable=False)
+    status_anterior = db.Column(db.String(20))  # NULL para documentos ainda não verificados
+    status_novo = db.Column(db.String(20), nullable=False)
+    data_validade = db.Column(db.Date)
+    notificado = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_transicao_vencimento_notificado', 'notificado', 'id'),
+    )
+
+# Documentos por colaborador e status de vencimento (válido, proximo_vencer, vencido) no
+# dia de referência. Tabela derivada de documento, mantida por conformidade.py
+class ContadorStatus(db.Model):
+    __tablename__ = 'contador_status'
+    colaborador_id = db.Column(db.Integer, primary_key=True)  # sem FK: as linhas saem junto com o colaborador
+    status = db.Column(db.String(20), primary_key=True)
+    departamento = db.Column(db.String(50))  # cópia de colaborador.departamento
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+    # O painel de conformidade agrega por departamento lendo só o índice
+    __table_args__ = (
+        db.Index('ix_contador_status_departamento', 'departamento', 'status', 'quantidade'),
+    )
+
+# Dia em que os status de contador_status foram calculados (uma única linha)
+class ContadorStatusReferencia(db.Model):
+    __tablename__ = 'contador_status_referencia'
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+
+# User-Agents distintos, referenciados pelos logs de auditoria em vez de repetir o texto
+class UserAgent(db.Model):
+    __tablename__ = 'user_agent'
+    id = db.Column(db.Integer, primary_key=True)
+    texto = db.Column(db.Text, unique=True, nullable=False)
 
 # NOVO MODELO: Log de Auditoria
 class LogAuditoria(db.Model):
@@ -70,8 +179,28 @@ class LogAuditoria(db.Model):
     tabela_afetada = db.Column(db.String(50))  # Ex: 'user', 'documento', 'colaborador'
     registro_id = db.Column(db.Integer)  # ID do registro afetado
     ip_address = db.Column(db.String(45))
-    user_agent = db.Column(db.Text)
+    user_agent = db.Column(db.Text)  # só em registros antigos; os novos usam user_agent_id
+    user_agent_id = db.Column(db.Integer, db.ForeignKey('user_agent.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relacionamento com usuário
-    usuario = db.relationship('User', backref='logs')
\ No newline at end of file
+    usuario = db.relationship('User', backref='logs')
+    agente = db.relationship('UserAgent')
+
+    @property
+    def user_agent_texto(self):
+        return self.agente.texto if self.agente else self.user_agent
+
+    # A listagem é sempre do mais novo para o mais antigo, por isso os filtros
+    # levam created_at no índice (paginação por cursor em (created_at, id))
+    __table_args__ = (
+        db.Index('ix_log_auditoria_created', 'created_at', 'id'),
+        db.Index('ix_log_auditoria_usuario', 'usuario_id', 'created_at'),
+        db.Index('ix_log_auditoria_acao', 'acao', 'created_at'),
+        db.Index('ix_log_auditoria_tabela', 'tabela_afetada', 'registro_id'),
+    )
+# Contador de alterações por tabela (mantido por gatilhos; usado nos ETags da API)
+class VersaoTabela(db.Model):
+    __tablename__ = 'versao_tabela'
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
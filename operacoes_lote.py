@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, delete, func, select, update
+from models import db, Arquivo, ConteudoDocumento, Documento, DocumentoVersao
+from busca import remover_do_indice
+from conformidade import recontar
+from utils import calcular_data_validade
+from versoes import caminhos_legados_em_uso, registrar_versoes_em_lote, remover_versoes
+
+# Operações em lote sobre documentos
+#
+# Cada operação é feita com poucos UPDATE/DELETE sobre o conjunto inteiro, na
+# mesma transação, em vez de carregar e alterar documento por documento.
+# Esses comandos não passam pelos eventos do ORM, então o índice de busca e os
+# contadores de conformidade são atualizados aqui mesmo; o chamador faz o commit, invalida o cache do
+# dashboard e registra uma única entrada de auditoria.
+
+TIPOS_RENOVAVEIS = ('3', '6', '12')
+SITUACOES = {
+    'vencido': 'vencidos',
+    'proximo_vencer': 'próximos do vencimento',
+    'vencendo': 'vencidos ou próximos do vencimento',
+}
+
+
+def filtro_documentos(ids=None, colaborador_id=None, tipo_validade=None, situacao=None, hoje=None):
+    """Monta o filtro de uma operação em lote.
+
+    Retorna (condição, descrição). Exige ao menos um critério para que um
+    formulário vazio nunca alcance todos os documentos.
+    """
+    hoje = hoje or datetime.now().date()
+    condicoes = []
+    descricao = []
+    if ids:
+        condicoes.append(Documento.id.in_(ids))
+        descricao.append(f'{len(ids)} selecionado(s)')
+    if colaborador_id:
+        condicoes.append(Documento.colaborador_id == colaborador_id)
+        descricao.append(f'colaborador {colaborador_id}')
+    if tipo_validade:
+        condicoes.append(Documento.tipo_validade == tipo_validade)
+        descricao.append(f'tipo {tipo_validade}')
+    if situacao:
+        limite_proximo = hoje + timedelta(days=30)
+        com_validade = Documento.tipo_validade != 'indeterminado'
+        if situacao == 'vencido':
+            condicoes.append(and_(com_validade, Documento.data_validade < hoje))
+        elif situacao == 'proximo_vencer':
+            condicoes.append(and_(com_validade, Documento.data_validade >= hoje,
+                                  Documento.data_validade <= limite_proximo))
+        elif situacao == 'vencendo':
+            condicoes.append(and_(com_validade, Documento.data_validade <= limite_proximo))
+        else:
+            raise ValueError(f'Situação inválida: {situacao}')
+        descricao.append(SITUACOES[situacao])
+
+    if not condicoes:
+        raise ValueError('Informe ao menos um critério para a operação em lote')
+    return and_(*condicoes), ', '.join(descricao)
+
+
+def renovar_documentos(filtro, nova_data=None, usuario_id=None):
+    """Renova a validade dos documentos do filtro com um único UPDATE.
+
+    Tipos 3/6/12 recebem calcular_data_validade(tipo) a partir de hoje;
+    'personalizado' só é renovado quando `nova_data` é informada e
+    'indeterminado' nunca. A validade anterior vai para o histórico de
+    versões (sem copiar arquivos). Retorna o número de documentos renovados.
+    """
+    novas_datas = {tipo: calcular_data_validade(tipo) for tipo in TIPOS_RENOVAVEIS}
+    tipos = list(TIPOS_RENOVAVEIS) + (['personalizado'] if nova_data else [])
+    filtro = and_(filtro, Documento.tipo_validade.in_(tipos))
+
+    registrar_versoes_em_lote(filtro)
+    # Antes do UPDATE: a renovação tira os documentos de filtros por situação
+    colaboradores = db.session.execute(select(Documento.colaborador_id).where(filtro).distinct()).scalars().all()
+    resultado = db.session.execute(
+        update(Documento)
+        .where(filtro)
+        .values(data_validade=case(novas_datas, value=Documento.tipo_validade, else_=nova_data),
+                usuario_id=usuario_id),
+        execution_options={'synchronize_session': False}
+    )
+    recontar(colaboradores)
+    return resultado.rowcount
+
+
+def excluir_documentos(filtro):
+    """Exclui os documentos do filtro e solta as referências aos arquivos.
+
+    Retorna (quantidade, caminhos) com os arquivos que ficaram sem uso; eles
+    devem ser entregues ao removedor_arquivos depois do commit.
+    """
+    selecionados = select(Documento.id).where(filtro)
+
+    # 1. Histórico de versões (é a primeira escrita, então o conjunto não muda até o commit)
+    caminhos = remover_versoes(DocumentoVersao.documento_id.in_(selecionados))
+
+    # 2. Referências: cada arquivo perde tantas quantas forem os documentos excluídos que o usam
+    excluidos_por_arquivo = select(func.count(Documento.id)).where(
+        filtro, Documento.arquivo_hash == Arquivo.hash).scalar_subquery()
+    hashes = select(Documento.arquivo_hash).where(filtro, Documento.arquivo_hash.isnot(None))
+    db.session.execute(
+        update(Arquivo).where(Arquivo.hash.in_(hashes))
+        .values(referencias=Arquivo.referencias - excluidos_por_arquivo),
+        execution_options={'synchronize_session': False}
+    )
+    orfaos = db.session.execute(
+        select(Arquivo.id, Arquivo.caminho).where(Arquivo.hash.in_(hashes), Arquivo.referencias <= 0)
+    ).all()
+
+    ids = db.session.execute(selecionados).scalars().all()
+    if not ids:
+        return 0, caminhos
+    legados = set(db.session.execute(
+        select(Documento.arquivo).where(filtro, Documento.arquivo_hash.is_(None)).distinct()
+    ).scalars())
+    colaboradores = db.session.execute(select(Documento.colaborador_id).where(filtro).distinct()).scalars().all()
+
+    # 3. Dependentes, índice de busca e os próprios documentos
+    db.session.execute(delete(ConteudoDocumento).where(ConteudoDocumento.documento_id.in_(selecionados)),
+                       execution_options={'synchronize_session': False})
+    conn = db.session.connection()
+    remover_do_indice(conn, 'documento', ids)
+    remover_do_indice(conn, 'conteudo', ids)
+    db.session.execute(delete(Documento).where(filtro), execution_options={'synchronize_session': False})
+    recontar(colaboradores, conn)
+
+    # 4. Arquivos sem uso
+    if orfaos:
+        db.session.execute(delete(Arquivo).where(Arquivo.id.in_([o.id for o in orfaos])),
+                           execution_options={'synchronize_session': False})
+    caminhos += [o.caminho for o in orfaos]
+    if legados:
+        # Uploads antigos: o mesmo nome pode estar em documentos fora do filtro
+        caminhos += sorted(legados - caminhos_legados_em_uso(legados))
+
+    return len(ids), caminhos
+
@@ -0,0 +1,299 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from flask import current_app
+from sqlalchemy import or_, select
+from models import db, Documento
+
+logger = logging.getLogger(__name__)
+
+# Miniaturas da primeira página dos documentos
+#
+# Geradas em um pool de processos e guardadas em instance/previews/ com o nome
+# derivado do hash do arquivo: o mesmo conteúdo tem sempre a mesma miniatura,
+# então ela pode ser servida com cache de longa duração (a URL leva o hash).
+# O cache tem tamanho máximo (PREVIEW_CACHE_MAX_BYTES); os menos usados saem
+# primeiro (LRU pela data de modificação, renovada a cada acesso).
+
+EXTENSOES = ('.pdf', '.jpg', '.jpeg', '.png')
+QUALIDADE_JPEG = 80
+# Acessos dentro desse intervalo não renovam a data do arquivo (evita um utime por request)
+INTERVALO_TOQUE = 3600
+
+
+def chave_preview(arquivo_hash, arquivo):
+    """Nome da miniatura no cache; uploads antigos (sem hash) usam o hash do caminho."""
+    if arquivo_hash:
+        return arquivo_hash
+    return hashlib.sha256(f'legado:{arquivo}'.encode()).hexdigest()
+
+
+def suporta_preview(arquivo):
+    return os.path.splitext(arquivo)[1].lower() in EXTENSOES
+
+
+# Executado nos processos do pool: não usa app, sessão nem nada que não seja picklable
+
+def _imagem_da_pagina(caminho):
+    # Sem renderizador de PDF em Python puro: usa a maior imagem da primeira
+    # página, que nos documentos escaneados é a própria página
+    from pypdf import PdfReader
+    leitor = PdfReader(caminho)
+    if not leitor.pages:
+        return None
+    imagens = leitor.pages[0].images
+    if not imagens:
+        return None
+    maior = max(imagens, key=lambda imagem: imagem.image.width * imagem.image.height)
+    return maior.image
+
+
+def gerar_miniatura(origem, destino, tamanho):
+    """Grava em `destino` a miniatura JPEG de `origem`. Retorna (status, bytes)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return 'sem_suporte', 0
+
+    if not os.path.exists(origem):
+        return 'ausente', 0  # removido entre o pedido e a geração; não marca o conteúdo
+
+    try:
+        if origem.lower().endswith('.pdf'):
+            imagem = _imagem_da_pagina(origem)
+            if imagem is None:
+                return 'sem_suporte', 0
+        else:
+            imagem = Image.open(origem)
+            # JPEG: decodifica já reduzido (bem mais rápido em fotos grandes)
+            imagem.draft('RGB', (tamanho, tamanho))
+
+        imagem.thumbnail((tamanho, tamanho))
+        if imagem.mode != 'RGB':
+            imagem = imagem.convert('RGB')
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f'{destino}.{os.getpid()}.tmp'
+        imagem.save(temporario, 'JPEG', quality=QUALIDADE_JPEG, optimize=True)
+        os.replace(temporario, destino)
+        return 'ok', os.path.getsize(destino)
+    except Exception as e:
+        return 'erro', str(e)[:500]
+
+
+# Lado do app
+
+def _marcar_sem_preview(destino):
+    marcador = destino[:-4] + '.sem'
+    os.makedirs(os.path.dirname(marcador), exist_ok=True)
+    open(marcador, 'wb').close()
+
+
+class CachePreviews:
+    """Cache em disco das miniaturas e pool de processos que as gera.
+
+    Pedidos simultâneos da mesma miniatura esperam o mesmo processamento.
+    Arquivos sem miniatura possível (PDF só com texto, imagem corrompida)
+    ficam marcados com um arquivo .sem para não voltarem ao pool.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._lock_despejo = threading.Lock()
+        self._pendentes = {}
+        self._ocupado = None
+
+    def init_app(self, app):
+        app.config.setdefault('PREVIEW_PASTA', os.path.join(app.instance_path, 'previews'))
+        app.config.setdefault('PREVIEW_TAMANHO', 320)  # pixels do maior lado
+        app.config.setdefault('PREVIEW_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+        app.config.setdefault('PREVIEW_PROCESSOS', 2)
+        app.config.setdefault('PREVIEW_ESPERA', 10)  # segundos que o request espera pela geração
+        self.app = app
+
+    def caminho(self, chave):
+        return os.path.join(self.app.config['PREVIEW_PASTA'], chave[:2], chave + '.jpg')
+
+    def obter(self, chave, arquivo):
+        """Caminho da miniatura de `arquivo` (relativo a UPLOAD_FOLDER), gerando se preciso.
+
+        Retorna None quando não há miniatura possível. Levanta
+        concurrent.futures.TimeoutError se a geração passar de PREVIEW_ESPERA.
+        """
+        destino = self.caminho(chave)
+        if self._tocar(destino):
+            return destino
+        if not suporta_preview(arquivo) or os.path.exists(destino[:-4] + '.sem'):
+            return None
+        status, _ = self._enviar(chave, arquivo).result(timeout=self.app.config['PREVIEW_ESPERA'])
+        return destino if status == 'ok' else None
+
+    def agendar(self, chave, arquivo):
+        """Gera a miniatura em segundo plano (após o upload), sem esperar."""
+        if suporta_preview(arquivo) and not os.path.exists(self.caminho(chave)):
+            self._enviar(chave, arquivo)
+
+    def _obter_pool(self):
+        # Importado só no primeiro uso: multiprocessing pesa no boot de cada worker
+        from concurrent.futures import ProcessPoolExecutor
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.app.config['PREVIEW_PROCESSOS'])
+            self._pid = os.getpid()
+            self._pendentes = {}
+        return self._pool
+
+    def _enviar(self, chave, arquivo):
+        with self._lock:
+            pool = self._obter_pool()
+            futuro = self._pendentes.get(chave)
+            if futuro is not None:
+                return futuro
+            origem = os.path.abspath(os.path.join(self.app.config['UPLOAD_FOLDER'], arquivo))
+            futuro = pool.submit(gerar_miniatura, origem, self.caminho(chave),
+                                 self.app.config['PREVIEW_TAMANHO'])
+            self._pendentes[chave] = futuro
+        # Fora do lock: se o futuro já terminou, o callback roda aqui mesmo e pega o lock
+        futuro.add_done_callback(lambda f: self._concluir(chave, f))
+        return futuro
+
+    def _concluir(self, chave, futuro):
+        with self._lock:
+            self._pendentes.pop(chave, None)
+        try:
+            status, detalhe = futuro.result()
+        except Exception:
+            logger.exception('Pool de miniaturas falhou para %s', chave)
+            return
+        if status == 'ok':
+            self._registrar_gravacao(detalhe)
+            return
+        if status == 'ausente':
+            return
+        if status == 'erro':
+            logger.warning('Falha ao gerar a miniatura %s: %s', chave, detalhe)
+        _marcar_sem_preview(self.caminho(chave))
+
+    def _tocar(self, destino):
+        """Renova a posição LRU da miniatura; False se ela não está no cache."""
+        try:
+            modificado = os.stat(destino).st_mtime
+        except FileNotFoundError:
+            return False
+        if time.time() - modificado > INTERVALO_TOQUE:
+            try:
+                os.utime(destino)
+            except FileNotFoundError:
+                return False
+        return True
+
+    # Limite de tamanho
+
+    def _registrar_gravacao(self, tamanho):
+        with self._lock:
+            if self._ocupado is None:
+                # Primeira gravação no processo: a varredura já inclui o arquivo novo
+                self._ocupado = sum(entrada[2] for entrada in self._listar())
+            else:
+                self._ocupado += tamanho
+            excedeu = self._ocupado > self.app.config['PREVIEW_CACHE_MAX_BYTES']
+        if excedeu:
+            self.despejar()
+
+    def _listar(self):
+        pasta = self.app.config['PREVIEW_PASTA']
+        if not os.path.isdir(pasta):
+            return
+        for subpasta in os.scandir(pasta):
+            if not subpasta.is_dir():
+                continue
+            for entrada in os.scandir(subpasta.path):
+                if entrada.name.endswith('.jpg'):
+                    info = entrada.stat()
+                    yield entrada.path, info.st_mtime, info.st_size
+
+    def despejar(self, limite=None):
+        """Apaga as miniaturas menos usadas até o cache ocupar 90% do limite.
+
+        O total em memória é só uma estimativa (vários workers gravam na mesma
+        pasta); a varredura aqui recalcula o valor real. Retorna quantas saíram.
+        """
+        if not self._lock_despejo.acquire(blocking=False):
+            return 0  # outra thread já está despejando
+        try:
+            limite = limite if limite is not None else self.app.config['PREVIEW_CACHE_MAX_BYTES']
+            entradas = sorted(self._listar(), key=lambda entrada: entrada[1])
+            ocupado = sum(tamanho for _, _, tamanho in entradas)
+            alvo = int(limite * 0.9)
+            removidas = 0
+            for caminho, _, tamanho in entradas:
+                if ocupado <= alvo:
+                    break
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+                ocupado -= tamanho
+                removidas += 1
+            with self._lock:
+                self._ocupado = ocupado
+            return removidas
+        finally:
+            self._lock_despejo.release()
+
+
+cache_previews = CachePreviews()
+
+
+def gerar_previews(processos=None, tamanho_lote=200):
+    """Gera as miniaturas que faltam no cache (pré-aquecimento). Retorna (geradas, sem_preview).
+
+    Para quando as novas miniaturas preencherem o limite do cache: gerar mais
+    só faria o LRU descartar as primeiras.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    filtro = or_(*(Documento.arquivo.ilike(f'%{extensao}') for extensao in EXTENSOES))
+    limite = current_app.config['PREVIEW_CACHE_MAX_BYTES']
+    tamanho = current_app.config['PREVIEW_TAMANHO']
+    pasta = current_app.config['UPLOAD_FOLDER']
+    geradas = sem_preview = ocupado = 0
+    vistas = set()
+    ultimo_id = 0
+    with ProcessPoolExecutor(max_workers=processos or os.cpu_count()) as pool:
+        while ocupado < limite:
+            documentos = db.session.execute(
+                select(Documento.id, Documento.arquivo, Documento.arquivo_hash)
+                .where(filtro, Documento.id > ultimo_id).order_by(Documento.id).limit(tamanho_lote)
+            ).all()
+            if not documentos:
+                break
+            ultimo_id = documentos[-1].id
+
+            futuros = {}
+            for documento in documentos:
+                chave = chave_preview(documento.arquivo_hash, documento.arquivo)
+                destino = cache_previews.caminho(chave)
+                if chave in vistas or os.path.exists(destino) or os.path.exists(destino[:-4] + '.sem'):
+                    continue
+                vistas.add(chave)
+                origem = os.path.abspath(os.path.join(pasta, documento.arquivo))
+                if not os.path.exists(origem):
+                    continue
+                futuros[pool.submit(gerar_miniatura, origem, destino, tamanho)] = chave
+
+            for futuro in as_completed(futuros):
+                status, detalhe = futuro.result()
+                if status == 'ok':
+                    geradas += 1
+                    ocupado += detalhe
+                else:
+                    sem_preview += 1
+                    _marcar_sem_preview(cache_previews.caminho(futuros[futuro]))
+
+    cache_previews.despejar()
+    return geradas, sem_preview
@@ -0,0 +1,72 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_user, login_required, logout_user, current_user
+from models import User
+from forms import LoginForm, OperacaoLoteForm
+from cache import dashboard_cache
+from log_auditoria import registrar_log
+from busca import buscar
+
+principal_bp = Blueprint('principal', __name__)
+
+@principal_bp.route('/')
+@login_required
+def dashboard():
+    snapshot = dashboard_cache.obter()
+    
+    return render_template('dashboard.html', 
+                         documentos_vencidos=snapshot.documentos_vencidos,
+                         documentos_proximos=snapshot.documentos_proximos,
+                         total_vencidos=snapshot.total_vencidos,
+                         total_proximos=snapshot.total_proximos,
+                         total_colaboradores=snapshot.total_colaboradores,
+                         total_documentos=snapshot.total_documentos,
+                         form_lote=OperacaoLoteForm())
+
+@principal_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        if user and user.check_password(form.password.data):
+            login_user(user)
+            
+            # REGISTRAR LOG
+            registrar_log(
+                acao='login',
+                descricao=f'Usuário {user.username} fez login no sistema',
+                tabela_afetada='user',
+                registro_id=user.id
+            )
+            
+            flash(f'Bem-vindo, {user.username}!', 'success')
+            return redirect(url_for('principal.dashboard'))
+        flash('Usuário ou senha inválidos', 'danger')
+    return render_template('login.html', form=form)
+
+@principal_bp.route('/logout')
+@login_required
+def logout():
+    # REGISTRAR LOG
+    registrar_log(
+        acao='logout',
+        descricao=f'Usuário {current_user.username} fez logout do sistema',
+        tabela_afetada='user',
+        registro_id=current_user.id
+    )
+    
+    logout_user()
+    flash('Você saiu do sistema', 'info')
+    return redirect(url_for('principal.login'))
+
+# Busca rápida (typeahead) em colaboradores e documentos
+@principal_bp.route('/api/busca')
+@login_required
+def api_busca():
+    resultados = []
+    for item in buscar(request.args.get('q', ''), limite=min(request.args.get('limite', 10, type=int), 50)):
+        if item['tipo'] == 'colaborador':
+            url = url_for('documentos.documentos_colaborador', colaborador_id=item['ref_id'])
+        else:
+            url = url_for('documentos.documentos_colaborador', colaborador_id=item['colaborador_id'], search=item['titulo'])
+        resultados.append(dict(item, url=url))
+    return jsonify(resultados)
@@ -0,0 +1,173 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, select, text, tuple_, update
+from models import db, LogAuditoria, UserAgent
+from log_auditoria import internar_user_agents
+
+# Arquivo morto da auditoria
+#
+# Registros mais antigos que AUDITORIA_RETENCAO_DIAS saem do banco e vão para
+# arquivos mensais append-only em AUDITORIA_PASTA_ARQUIVO:
+#
+#   2025-03.jsonl.gz   um membro gzip por lote arquivado (gzip aceita concatenação)
+#   2025-03.idx.jsonl  uma linha por membro: offset/tamanho no .gz, intervalo de
+#                      datas, usuários e registros contidos
+#
+# A busca lê o índice e descompacta apenas os membros que podem conter o alvo.
+
+
+def _pasta():
+    pasta = current_app.config.get('AUDITORIA_PASTA_ARQUIVO') or os.path.join(
+        current_app.instance_path, 'arquivo_auditoria')
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _serializar(linha):
+    return {
+        'id': linha.id,
+        'created_at': linha.created_at.isoformat() if linha.created_at else None,
+        'usuario_id': linha.usuario_id,
+        'acao': linha.acao,
+        'descricao': linha.descricao,
+        'tabela_afetada': linha.tabela_afetada,
+        'registro_id': linha.registro_id,
+        'ip_address': linha.ip_address,
+        'user_agent': linha.user_agent,
+    }
+
+
+def _anexar_membro(mes, registros):
+    """Grava os registros de um mês como um novo membro gzip e atualiza o índice."""
+    pasta = _pasta()
+    conteudo = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in registros).encode('utf-8')
+    compactado = gzip.compress(conteudo)
+
+    with open(os.path.join(pasta, f'{mes}.jsonl.gz'), 'ab') as destino:
+        offset = destino.tell()
+        destino.write(compactado)
+        destino.flush()
+        os.fsync(destino.fileno())
+
+    registros_por_tabela = {}
+    for r in registros:
+        if r['tabela_afetada'] and r['registro_id'] is not None:
+            registros_por_tabela.setdefault(r['tabela_afetada'], set()).add(r['registro_id'])
+
+    entrada = {
+        'offset': offset,
+        'tamanho': len(compactado),
+        'quantidade': len(registros),
+        'inicio': registros[0]['created_at'],
+        'fim': registros[-1]['created_at'],
+        'usuarios': sorted({r['usuario_id'] for r in registros}),
+        'registros': {tabela: sorted(ids) for tabela, ids in registros_por_tabela.items()},
+    }
+    with open(os.path.join(pasta, f'{mes}.idx.jsonl'), 'a', encoding='utf-8') as indice:
+        indice.write(json.dumps(entrada) + '\n')
+        indice.flush()
+        os.fsync(indice.fileno())
+
+
+def arquivar_auditoria(dias=None, tamanho_lote=5000):
+    """Move para o arquivo morto os registros mais antigos que `dias`.
+
+    Trabalha em lotes por cursor (created_at, id): cada lote é gravado no
+    arquivo (com fsync) e só então removido do banco. Retorna o total movido.
+    """
+    dias = dias if dias is not None else current_app.config.get('AUDITORIA_RETENCAO_DIAS', 180)
+    corte = datetime.utcnow() - timedelta(days=dias)
+    chave = tuple_(LogAuditoria.created_at, LogAuditoria.id)
+    colunas = [c for c in LogAuditoria.__table__.c if c.name not in ('user_agent', 'user_agent_id')]
+    total = 0
+    ultimo = None
+
+    while True:
+        consulta = select(
+            *colunas, func.coalesce(LogAuditoria.user_agent, UserAgent.texto).label('user_agent')
+        ).outerjoin(UserAgent, LogAuditoria.user_agent_id == UserAgent.id).where(
+            LogAuditoria.created_at < corte
+        ).order_by(LogAuditoria.created_at, LogAuditoria.id).limit(tamanho_lote)
+        if ultimo:
+            consulta = consulta.where(chave > ultimo)
+
+        linhas = db.session.execute(consulta).all()
+        if not linhas:
+            break
+
+        por_mes = {}
+        for linha in linhas:
+            por_mes.setdefault(linha.created_at.strftime('%Y-%m'), []).append(_serializar(linha))
+        for mes, registros in por_mes.items():
+            _anexar_membro(mes, registros)
+
+        db.session.execute(delete(LogAuditoria).where(LogAuditoria.id.in_([l.id for l in linhas])))
+        db.session.commit()
+
+        total += len(linhas)
+        ultimo = (linhas[-1].created_at, linhas[-1].id)
+
+    return total
+
+
+def internar_user_agents_existentes():
+    """Troca o texto de user_agent dos registros antigos pela referência em user_agent."""
+    with db.engine.begin() as conn:
+        textos = {t for (t,) in conn.execute(
+            select(LogAuditoria.user_agent).where(LogAuditoria.user_agent.isnot(None)).distinct())}
+        if not textos:
+            return 0
+        internar_user_agents(conn, textos)
+        subconsulta = select(UserAgent.id).where(UserAgent.texto == LogAuditoria.user_agent).scalar_subquery()
+        resultado = conn.execute(
+            update(LogAuditoria).where(LogAuditoria.user_agent.isnot(None))
+            .values(user_agent_id=subconsulta, user_agent=None)
+        )
+        return resultado.rowcount
+
+
+def compactar_banco():
+    """Devolve ao sistema de arquivos o espaço liberado (somente SQLite)."""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+    return True
+
+
+def buscar_no_arquivo(usuario_id=None, tabela=None, registro_id=None, mes=None):
+    """Percorre o arquivo morto devolvendo os registros que atendem aos filtros."""
+    pasta = _pasta()
+    indices = sorted(nome for nome in os.listdir(pasta) if nome.endswith('.idx.jsonl'))
+    if mes:
+        indices = [nome for nome in indices if nome.startswith(mes)]
+
+    for nome_indice in indices:
+        mes_arquivo = nome_indice[:-len('.idx.jsonl')]
+        with open(os.path.join(pasta, nome_indice), encoding='utf-8') as indice, \
+                open(os.path.join(pasta, f'{mes_arquivo}.jsonl.gz'), 'rb') as dados:
+            for linha_indice in indice:
+                entrada = json.loads(linha_indice)
+                if usuario_id is not None and usuario_id not in entrada['usuarios']:
+                    continue
+                if registro_id is not None:
+                    tabelas = [tabela] if tabela else list(entrada['registros'])
+                    if not any(registro_id in entrada['registros'].get(t, ()) for t in tabelas):
+                        continue
+                elif tabela and tabela not in entrada['registros']:
+                    continue
+
+                dados.seek(entrada['offset'])
+                conteudo = gzip.decompress(dados.read(entrada['tamanho']))
+                for linha in conteudo.decode('utf-8').splitlines():
+                    registro = json.loads(linha)
+                    if usuario_id is not None and registro['usuario_id'] != usuario_id:
+                        continue
+                    if tabela and registro['tabela_afetada'] != tabela:
+                        continue
+                    if registro_id is not None and registro['registro_id'] != registro_id:
+                        continue
+                    yield registro
@@ -0,0 +1,352 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from flask import current_app, make_response, request, send_file
+from sqlalchemy import bindparam, insert, update
+from werkzeug.utils import secure_filename
+from models import db, Arquivo, Documento, DocumentoVersao
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do upload (o arquivo nunca fica inteiro em memória)
+TAMANHO_BLOCO = 64 * 1024
+
+
+def caminho_absoluto(relativo):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], relativo)
+
+
+def _caminho_por_hash(digest, extensao):
+    # Dois níveis de diretório evitam pastas com centenas de milhares de arquivos
+    return os.path.join(digest[:2], digest[2:4], digest + extensao)
+
+
+def _gravar_temporario(stream, pasta_tmp, sincronizar=True):
+    """Copia o stream em blocos para `pasta_tmp` (uploads/tmp) calculando o SHA-256.
+
+    Retorna (caminho_tmp, digest, tamanho).
+    """
+    sha256 = hashlib.sha256()
+    tamanho = 0
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta_tmp)
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            while True:
+                bloco = stream.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                sha256.update(bloco)
+                destino.write(bloco)
+                tamanho += len(bloco)
+            if sincronizar:
+                destino.flush()
+                os.fsync(destino.fileno())
+    except Exception:
+        os.remove(caminho_tmp)
+        raise
+    return caminho_tmp, sha256.hexdigest(), tamanho
+
+
+def _publicar(caminho_tmp, digest, nome_original, registro, pastas_criadas):
+    """Move o temporário para o caminho definitivo, ou o descarta se o conteúdo já existe.
+
+    Retorna o caminho relativo do conteúdo. `pastas_criadas` evita um mkdir
+    por arquivo quando o lote cai nas mesmas pastas <aa>/<bb>.
+    """
+    if registro and os.path.exists(caminho_absoluto(registro.caminho)):
+        # Conteúdo duplicado: reaproveita o arquivo existente
+        os.remove(caminho_tmp)
+        return registro.caminho
+
+    extensao = os.path.splitext(secure_filename(nome_original))[1].lower()
+    relativo = registro.caminho if registro else _caminho_por_hash(digest, extensao)
+    destino_final = caminho_absoluto(relativo)
+    pasta = os.path.dirname(destino_final)
+    if pasta not in pastas_criadas:
+        os.makedirs(pasta, exist_ok=True)
+        pastas_criadas.add(pasta)
+    os.replace(caminho_tmp, destino_final)
+    return relativo
+
+
+def _registrar_arquivos(novos):
+    """Cria os registros dos conteúdos novos ({hash: (caminho, tamanho)}) e os devolve por hash.
+
+    Um único INSERT que ignora hashes já existentes: dois uploads simultâneos
+    do mesmo conteúdo passam ambos pelo SELECT sem encontrar nada, e o
+    segundo reaproveita o registro criado pelo primeiro (o arquivo no disco
+    é o mesmo, pelo hash).
+    """
+    if not novos:
+        return {}
+    tabela = Arquivo.__table__
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        comando = pg_insert(tabela).on_conflict_do_nothing(index_elements=['hash'])
+    else:
+        comando = insert(tabela).prefix_with('OR IGNORE')
+    db.session.execute(comando, [
+        {'hash': digest, 'caminho': relativo, 'tamanho': tamanho, 'referencias': 0}
+        for digest, (relativo, tamanho) in novos.items()
+    ])
+    return {a.hash: a for a in Arquivo.query.filter(Arquivo.hash.in_(novos))}
+
+
+def salvar_stream(stream, nome_original):
+    """Grava um arquivo no armazenamento endereçado por conteúdo.
+
+    O conteúdo é copiado em blocos para um arquivo temporário enquanto o
+    SHA-256 é calculado; depois é movido atomicamente para
+    uploads/<aa>/<bb>/<hash><ext>. Se o mesmo conteúdo já existe, o arquivo
+    temporário é descartado e apenas a contagem de referências aumenta.
+    Retorna o registro Arquivo (adicionado à sessão, sem commit).
+    """
+    return salvar_lote([(stream, nome_original)], sincronizar=True)[0]
+
+
+def salvar_lote(itens, sincronizar=False):
+    """Versão em lote de salvar_stream para importações.
+
+    `itens` é uma lista de (stream, nome_original). Os arquivos são gravados
+    sem fsync individual e sincronizados de uma vez no final; os hashes são
+    consultados com um único SELECT, os conteúdos novos registrados com um
+    único INSERT e as referências somadas com um único UPDATE por arquivo
+    distinto. Retorna os registros Arquivo na ordem dos itens.
+    """
+    pasta_tmp = os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp')
+    os.makedirs(pasta_tmp, exist_ok=True)
+    temporarios = []
+    try:
+        for stream, nome_original in itens:
+            temporarios.append(_gravar_temporario(stream, pasta_tmp, sincronizar) + (nome_original,))
+        if not sincronizar:
+            _sincronizar_disco([t[0] for t in temporarios])
+
+        existentes = {a.hash: a for a in Arquivo.query.filter(
+            Arquivo.hash.in_({t[1] for t in temporarios}))}
+        novos = {}
+        pastas_criadas = set()
+        for caminho_tmp, digest, tamanho, nome_original in temporarios:
+            if digest in novos:
+                os.remove(caminho_tmp)  # repetido dentro do próprio lote
+                continue
+            relativo = _publicar(caminho_tmp, digest, nome_original, existentes.get(digest), pastas_criadas)
+            if digest not in existentes:
+                novos[digest] = (relativo, tamanho)
+        existentes.update(_registrar_arquivos(novos))
+    except Exception:
+        for temporario in temporarios:
+            if os.path.exists(temporario[0]):
+                os.remove(temporario[0])
+        raise
+
+    # Incremento feito no banco para não perder referências em uploads simultâneos
+    registros = [existentes[t[1]] for t in temporarios]
+    contagem = Counter(registro.id for registro in registros)
+    tabela = Arquivo.__table__
+    db.session.execute(
+        update(tabela).where(tabela.c.id == bindparam('arquivo_id'))
+        .values(referencias=tabela.c.referencias + bindparam('quantidade')),
+        [{'arquivo_id': arquivo_id, 'quantidade': quantidade} for arquivo_id, quantidade in contagem.items()]
+    )
+    return registros
+
+
+def _sincronizar_disco(caminhos):
+    # Um sync() do sistema custa bem menos que um fsync por arquivo em lotes grandes
+    if hasattr(os, 'sync'):
+        os.sync()
+        return
+    for caminho in caminhos:
+        with open(caminho, 'rb+') as arquivo:
+            os.fsync(arquivo.fileno())
+
+
+def salvar_upload(arquivo):
+    """Atalho para um FileStorage vindo de um formulário."""
+    return salvar_stream(arquivo.stream, arquivo.filename)
+
+
+def liberar_arquivo(documento):
+    """Solta a referência do documento ao seu arquivo.
+
+    Retorna a lista de caminhos que deixaram de ser usados; eles devem ser
+    entregues a removedor_arquivos.agendar() somente depois do commit.
+    """
+    if documento.arquivo_hash:
+        db.session.execute(
+            update(Arquivo).where(Arquivo.hash == documento.arquivo_hash)
+            .values(referencias=Arquivo.referencias - 1)
+        )
+        registro = Arquivo.query.filter_by(hash=documento.arquivo_hash).populate_existing().first()
+        if registro and registro.referencias <= 0:
+            db.session.delete(registro)
+            return [registro.caminho]
+        return []
+
+    # Uploads anteriores ao armazenamento por hash: o mesmo nome pode ser usado por outro documento
+    # ou pelo histórico de versões
+    compartilhado = Documento.query.filter(
+        Documento.arquivo == documento.arquivo,
+        Documento.id != documento.id
+    ).first() or DocumentoVersao.query.filter_by(arquivo=documento.arquivo).first()
+    return [] if compartilhado else [documento.arquivo]
+
+
+def remover_arquivos(caminhos):
+    for relativo in caminhos:
+        caminho = caminho_absoluto(relativo)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _em_uso(relativo):
+    """Confere no banco se o caminho voltou a ser usado (ex.: reenvio do mesmo conteúdo)."""
+    digest, extensao = os.path.splitext(os.path.basename(relativo))
+    if relativo == _caminho_por_hash(digest, extensao):
+        return db.session.query(Arquivo.id).filter_by(hash=digest).first() is not None
+    return (db.session.query(Documento.id).filter_by(arquivo=relativo).first() is not None
+            or db.session.query(DocumentoVersao.id).filter_by(arquivo=relativo).first() is not None)
+
+
+class RemovedorArquivos:
+    """Apaga em segundo plano os arquivos liberados por operações em lote.
+
+    Cada caminho é conferido no banco antes de ser apagado. Se o processo
+    terminar com itens na fila, os arquivos ficam órfãos em disco e são
+    recolhidos por `flask limpar-uploads`.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def agendar(self, caminhos):
+        if not caminhos:
+            return
+        self._iniciar()
+        for caminho in caminhos:
+            self._fila.put(caminho)
+
+    def descarregar(self, timeout=10):
+        """Espera a fila esvaziar (usado por comandos de linha e testes)."""
+        if self._fila is None or self._pid != os.getpid():
+            return True
+        limite = time.monotonic() + timeout
+        while self._fila.unfinished_tasks and time.monotonic() < limite:
+            time.sleep(0.01)
+        return not self._fila.unfinished_tasks
+
+    def _iniciar(self):
+        with self._lock:
+            # Após um fork (gunicorn --preload) a thread do processo pai não existe no filho
+            if self._thread is None or self._pid != os.getpid():
+                self._fila = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._executar, name='removedor-arquivos', daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        while True:
+            caminho = self._fila.get()
+            try:
+                with self.app.app_context():
+                    if not _em_uso(caminho):
+                        remover_arquivos([caminho])
+            except Exception:
+                logger.exception('Erro ao remover %s', caminho)
+            finally:
+                self._fila.task_done()
+
+
+removedor_arquivos = RemovedorArquivos()
+
+
+def arquivos_sem_referencia(idade_tmp=timedelta(days=1)):
+    """Percorre UPLOAD_FOLDER devolvendo os caminhos relativos que nenhum registro usa.
+
+    Temporários em uploads/tmp só entram depois de `idade_tmp` (podem ser
+    uploads em andamento).
+    """
+    pasta = current_app.config['UPLOAD_FOLDER']
+    usados = {c for (c,) in db.session.query(Arquivo.caminho)}
+    usados.update(c for (c,) in db.session.query(Documento.arquivo).distinct())
+    usados.update(c for (c,) in db.session.query(DocumentoVersao.arquivo).distinct())
+    limite_tmp = time.time() - idade_tmp.total_seconds()
+
+    for raiz, _, nomes in os.walk(pasta):
+        relativo_raiz = os.path.relpath(raiz, pasta)
+        temporario = relativo_raiz.split(os.sep)[0] == 'tmp'
+        for nome in nomes:
+            relativo = os.path.normpath(os.path.join(relativo_raiz, nome))
+            if temporario:
+                if os.path.getmtime(os.path.join(raiz, nome)) < limite_tmp:
+                    yield relativo
+            elif relativo not in usados:
+                yield relativo
+
+
+def resposta_download(documento):
+    """Monta a resposta de download de um documento.
+
+    - ETag forte derivada do SHA-256 do conteúdo; send_file(conditional=True)
+      responde If-None-Match com 304 e Range com 206.
+    - Com DOWNLOAD_X_ACCEL_PREFIX configurado, a transferência é delegada ao
+      nginx (X-Accel-Redirect) e o worker é liberado imediatamente.
+    - Sem proxy, o servidor WSGI usa wsgi.file_wrapper (sendfile no gunicorn).
+    """
+    nome = documento.nome_arquivo or os.path.basename(documento.arquivo)
+    prefixo = current_app.config.get('DOWNLOAD_X_ACCEL_PREFIX')
+
+    if prefixo:
+        if documento.arquivo_hash and documento.arquivo_hash in request.if_none_match:
+            response = make_response('', 304)
+            response.set_etag(documento.arquivo_hash)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = prefixo.rstrip('/') + '/' + documento.arquivo.replace(os.sep, '/')
+        response.headers['Content-Type'] = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        response.headers.set('Content-Disposition', 'attachment', filename=nome)
+        if documento.arquivo_hash:
+            response.set_etag(documento.arquivo_hash)
+    else:
+        response = send_file(
+            caminho_absoluto(documento.arquivo),
+            as_attachment=True,
+            download_name=nome,
+            conditional=True,
+            etag=documento.arquivo_hash or True
+        )
+
+    # Documentos exigem login: o navegador pode guardar, mas revalida pelo ETag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conta_como_download(response):
+    """Diz se a resposta de resposta_download() deve ir para a auditoria.
+
+    304 e pedaços de Range que não começam no byte 0 não são novos downloads.
+    Com X-Accel-Redirect a resposta sai daqui sempre com 200 (quem atende o
+    Range é o nginx), então o início é lido do cabeçalho da requisição.
+    """
+    if 'X-Accel-Redirect' in response.headers:
+        faixa = request.range
+        return response.status_code == 200 and (faixa is None or faixa.ranges[0][0] == 0)
+    if response.status_code == 206:
+        return response.content_range.start == 0
+    return response.status_code == 200
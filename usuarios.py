@@ -0,0 +1,106 @@
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+from models import db, User
+from forms import UsuarioForm, EditarUsuarioForm
+from cache import usuario_cache
+from log_auditoria import registrar_log
+from consultas import listar_usuarios
+
+usuarios_bp = Blueprint('usuarios', __name__)
+
+@usuarios_bp.route('/usuarios')
+@login_required
+def usuarios():
+    if current_user.role != 'administrador':
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    return render_template('usuarios.html', usuarios=listar_usuarios())
+
+@usuarios_bp.route('/usuario/novo', methods=['GET', 'POST'])
+@login_required
+def novo_usuario():
+    if current_user.role != 'administrador':
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    form = UsuarioForm()
+    if form.validate_on_submit():
+        try:
+            # Verificar se usuário já existe
+            if User.query.filter_by(username=form.username.data).first():
+                flash('Usuário já existe', 'danger')
+                return render_template('usuario_form.html', form=form)
+            
+            user = User(
+                username=form.username.data,
+                email=form.email.data,
+                role=form.role.data
+            )
+            user.set_password(form.password.data)
+            db.session.add(user)
+            db.session.commit()
+            usuario_cache.invalidar(user.id)
+            
+            # REGISTRAR LOG
+            registrar_log(
+                acao='criar_usuario',
+                descricao=f'Usuário {form.username.data} criado com cargo {form.role.data}',
+                tabela_afetada='user',
+                registro_id=user.id
+            )
+            
+            flash('Usuário cadastrado com sucesso!', 'success')
+            return redirect(url_for('usuarios.usuarios'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Erro ao cadastrar usuário', 'danger')
+    
+    return render_template('usuario_form.html', form=form)
+
+# ROTA: Editar usuário
+@usuarios_bp.route('/usuario/editar/<int:usuario_id>', methods=['GET', 'POST'])
+@login_required
+def editar_usuario(usuario_id):
+    if current_user.role != 'administrador':
+        flash('Acesso não autorizado', 'warning')
+        return redirect(url_for('principal.dashboard'))
+    
+    usuario = User.query.get_or_404(usuario_id)
+    form = EditarUsuarioForm(obj=usuario)
+    
+    if form.validate_on_submit():
+        try:
+            # Registrar alterações para o log
+            alteracoes = []
+            if usuario.username != form.username.data:
+                alteracoes.append(f"username: {usuario.username} -> {form.username.data}")
+            if usuario.email != form.email.data:
+                alteracoes.append(f"email: {usuario.email} -> {form.email.data}")
+            if usuario.role != form.role.data:
+                alteracoes.append(f"role: {usuario.role} -> {form.role.data}")
+            
+            # Atualizar usuário
+            usuario.username = form.username.data
+            usuario.email = form.email.data
+            usuario.role = form.role.data
+            
+            db.session.commit()
+            usuario_cache.invalidar(usuario.id)
+            
+            # REGISTRAR LOG
+            if alteracoes:
+                registrar_log(
+                    acao='editar_usuario',
+                    descricao=f'Usuário {usuario.username} alterado: {", ".join(alteracoes)}',
+                    tabela_afetada='user',
+                    registro_id=usuario.id
+                )
+            
+            flash('Usuário atualizado com sucesso!', 'success')
+            return redirect(url_for('usuarios.usuarios'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar usuário: {str(e)}', 'danger')
+    
+    return render_template('editar_usuario.html', form=form, usuario=usuario)
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
-from models import Documento
+from sqlalchemy import func, case, and_
+from models import db, Documento
 
 def calcular_data_validade(tipo_validade, data_personalizada=None):
     if tipo_validade == 'indeterminado':
@@ -14,15 +15,57 @@ def calcular_data_validade(tipo_validade, data_personalizada=None):
         return data_personalizada
     return None
 
+def filtro_vencidos(hoje):
+    return and_(Documento.data_validade < hoje, Documento.tipo_validade != 'indeterminado')
+
+def filtro_proximos_vencer(hoje):
+    return and_(
+        Documento.data_validade >= hoje,
+        Documento.data_validade <= hoje + timedelta(days=30),
+        Documento.tipo_validade != 'indeterminado'
+    )
+
 def get_documentos_vencidos():
     hoje = datetime.now().date()
-    return Documento.query.filter(Documento.data_validade < hoje, Documento.tipo_validade != 'indeterminado').all()
+    return Documento.query.filter(filtro_vencidos(hoje)).all()
 
 def get_documentos_proximos_vencer():
     hoje = datetime.now().date()
-    proximo_mes = hoje + timedelta(days=30)
-    return Documento.query.filter(
-        Documento.data_validade >= hoje,
-        Documento.data_validade <= proximo_mes,
-        Documento.tipo_validade != 'indeterminado'
-    ).all()
+    return Documento.query.filter(filtro_proximos_vencer(hoje)).all()
+
+def contagens_status(hoje):
+    """Expressões (total, vencidos, proximos) para agregar documentos, com as regras de status_vencimento()."""
+    return (
+        func.count(Documento.id),
+        func.count(case((filtro_vencidos(hoje), Documento.id))),
+        func.count(case((filtro_proximos_vencer(hoje), Documento.id))),
+    )
+
+def contar_status_por_colaborador(colaborador_ids):
+    """Conta total, vencidos e próximos do vencimento por colaborador em uma única consulta agrupada.
+
+    Usa as mesmas regras de Documento.status_vencimento(); retorna
+    {colaborador_id: (total, vencidos, proximos)}.
+    """
+    if not colaborador_ids:
+        return {}
+    
+    linhas = db.session.query(
+        Documento.colaborador_id, *contagens_status(datetime.now().date())
+    ).filter(
+        Documento.colaborador_id.in_(colaborador_ids)
+    ).group_by(Documento.colaborador_id)
+    
+    return {colaborador_id: (total, venc, prox) for colaborador_id, total, venc, prox in linhas}
+
+
+def codificar_cursor(log):
+    """Cursor da paginação da auditoria: posição (created_at, id) de um registro."""
+    return f'{log.created_at.isoformat()}_{log.id}'
+
+def decodificar_cursor(valor):
+    try:
+        data, registro_id = valor.rsplit('_', 1)
+        return datetime.fromisoformat(data), int(registro_id)
+    except (AttributeError, ValueError):
+        return None
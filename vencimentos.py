@@ -0,0 +1,197 @@
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+from models import db, calcular_status, Colaborador, Documento, TransicaoVencimento, User
+
+
+def _janelas(hoje):
+    """Filtros que só encontram documentos cujo status mudou desde a última verificação.
+
+    Todos usam o índice (status_registrado, data_validade); documentos estáveis
+    nunca são lidos, então cada execução custa proporcional às mudanças.
+    """
+    limite_proximo = hoje + timedelta(days=30)
+    status = Documento.status_registrado
+    validade = Documento.data_validade
+    return [
+        # Documentos novos ou anteriores a esta verificação
+        status.is_(None),
+        # válido -> proximo_vencer / vencido
+        and_(status == 'válido', validade <= limite_proximo, Documento.tipo_validade != 'indeterminado'),
+        # proximo_vencer -> vencido
+        and_(status == 'proximo_vencer', validade < hoje),
+        # Renovados: voltaram a ficar válidos ou saíram de vencido para próximo
+        and_(status == 'proximo_vencer', or_(validade.is_(None), validade > limite_proximo)),
+        and_(status == 'vencido', or_(validade.is_(None), validade >= hoje)),
+    ]
+
+
+def verificar_vencimentos(hoje=None, tamanho_lote=1000):
+    """Atualiza Documento.status_registrado e registra as transições encontradas.
+
+    Processa cada janela em lotes de `tamanho_lote` linhas (cada lote é
+    confirmado e sai do filtro), então a memória não cresce com o total de
+    documentos. Retorna o número de transições registradas.
+    """
+    hoje = hoje or datetime.now().date()
+    total = 0
+
+    for filtro in _janelas(hoje):
+        ultimo_id = 0
+        while True:
+            linhas = db.session.execute(
+                select(Documento.id, Documento.colaborador_id, Documento.tipo_validade,
+                       Documento.data_validade, Documento.status_registrado)
+                .where(filtro, Documento.id > ultimo_id)
+                .order_by(Documento.id)
+                .limit(tamanho_lote)
+            ).all()
+            if not linhas:
+                break
+
+            transicoes = []
+            por_status = {}
+            for linha in linhas:
+                novo = calcular_status(linha.tipo_validade, linha.data_validade, hoje)
+                por_status.setdefault(novo, []).append(linha.id)
+                # A classificação inicial como válido não interessa a ninguém
+                if novo != linha.status_registrado and not (linha.status_registrado is None and novo == 'válido'):
+                    transicoes.append({
+                        'documento_id': linha.id,
+                        'colaborador_id': linha.colaborador_id,
+                        'status_anterior': linha.status_registrado,
+                        'status_novo': novo,
+                        'data_validade': linha.data_validade,
+                        'notificado': False,
+                        'created_at': datetime.utcnow(),
+                    })
+
+            for novo, ids in por_status.items():
+                db.session.execute(
+                    update(Documento).where(Documento.id.in_(ids)).values(status_registrado=novo),
+                    execution_options={'synchronize_session': False}
+                )
+            if transicoes:
+                db.session.execute(TransicaoVencimento.__table__.insert(), transicoes)
+            db.session.commit()
+
+            total += len(transicoes)
+            ultimo_id = linhas[-1].id
+
+    return total
+
+
+# Destinos das notificações
+
+class ArquivoSink:
+    """Grava cada resumo como um arquivo texto (padrão; útil em desenvolvimento)."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+
+    def enviar(self, usuario, assunto, linhas):
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{usuario.username}.txt"
+        with open(os.path.join(self.pasta, nome), 'w', encoding='utf-8') as destino:
+            destino.write(f'Para: {usuario.email}\nAssunto: {assunto}\n\n')
+            for linha in linhas:
+                destino.write(linha + '\n')
+
+
+class SmtpSink:
+    """Envia cada resumo por e-mail."""
+
+    def __init__(self, host, porta, remetente, usuario=None, senha=None):
+        self.host = host
+        self.porta = porta
+        self.remetente = remetente
+        self.usuario = usuario
+        self.senha = senha
+
+    def enviar(self, usuario, assunto, linhas):
+        # Só o job de notificação envia e-mail; os workers web não carregam smtplib
+        import smtplib
+        from email.message import EmailMessage
+        mensagem = EmailMessage()
+        mensagem['From'] = self.remetente
+        mensagem['To'] = usuario.email
+        mensagem['Subject'] = assunto
+        mensagem.set_content('\n'.join(linhas))
+        with smtplib.SMTP(self.host, self.porta) as smtp:
+            if self.usuario:
+                smtp.starttls()
+                smtp.login(self.usuario, self.senha)
+            smtp.send_message(mensagem)
+
+
+SINKS = {
+    'arquivo': lambda config: ArquivoSink(config.get('NOTIFICACAO_PASTA') or os.path.join(
+        current_app.instance_path, 'notificacoes')),
+    'smtp': lambda config: SmtpSink(config.get('SMTP_HOST', 'localhost'), config.get('SMTP_PORTA', 25),
+                                    config.get('SMTP_REMETENTE', 'rh@empresa.com'),
+                                    config.get('SMTP_USUARIO'), config.get('SMTP_SENHA')),
+}
+
+
+def criar_sink():
+    return SINKS[current_app.config.get('NOTIFICACAO_SINK', 'arquivo')](current_app.config)
+
+
+ROTULOS = {'vencido': 'VENCIDO', 'proximo_vencer': 'Próximo do vencimento', 'válido': 'Regularizado'}
+
+
+def _linhas_resumo(ate_id, limite_itens):
+    """Gera o texto do resumo lendo as transições pendentes em blocos."""
+    consulta = select(
+        TransicaoVencimento.status_novo, TransicaoVencimento.data_validade,
+        Documento.nome, Colaborador.nome, Colaborador.departamento
+    ).outerjoin(Documento, Documento.id == TransicaoVencimento.documento_id).outerjoin(
+        Colaborador, Colaborador.id == TransicaoVencimento.colaborador_id
+    ).where(
+        TransicaoVencimento.notificado.is_(False), TransicaoVencimento.id <= ate_id
+    ).order_by(TransicaoVencimento.status_novo, Colaborador.departamento, Colaborador.nome)
+
+    contagem = {}
+    escritos = 0
+    for status, validade, documento, colaborador, departamento in db.session.execute(
+            consulta.execution_options(yield_per=1000)):
+        contagem[status] = contagem.get(status, 0) + 1
+        if escritos < limite_itens:
+            data = validade.strftime('%d/%m/%Y') if validade else '-'
+            yield (f'[{ROTULOS.get(status, status)}] {colaborador or "(colaborador excluído)"}'
+                   f' ({departamento or "-"}) - {documento or "(documento excluído)"} - validade {data}')
+            escritos += 1
+
+    yield ''
+    for status, quantidade in sorted(contagem.items()):
+        yield f'{ROTULOS.get(status, status)}: {quantidade}'
+    if escritos < sum(contagem.values()):
+        yield f'(lista limitada a {limite_itens} itens)'
+
+
+def enviar_resumos(sink=None, limite_itens=500):
+    """Envia um resumo das transições ainda não notificadas a cada gestor/administrador.
+
+    Retorna o número de resumos enviados.
+    """
+    ate_id = db.session.execute(
+        select(TransicaoVencimento.id).where(TransicaoVencimento.notificado.is_(False))
+        .order_by(TransicaoVencimento.id.desc()).limit(1)
+    ).scalar()
+    if ate_id is None:
+        return 0
+
+    sink = sink or criar_sink()
+    gestores = User.query.filter(User.role.in_(['gestor', 'administrador'])).all()
+    assunto = f"Vencimento de documentos - {datetime.now().strftime('%d/%m/%Y')}"
+    for gestor in gestores:
+        sink.enviar(gestor, assunto, _linhas_resumo(ate_id, limite_itens))
+
+    db.session.execute(
+        update(TransicaoVencimento)
+        .where(TransicaoVencimento.notificado.is_(False), TransicaoVencimento.id <= ate_id)
+        .values(notificado=True)
+    )
+    db.session.commit()
+    return len(gestores)
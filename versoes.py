@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select, update
+from models import db, Arquivo, Documento, DocumentoVersao
+
+# Histórico de versões dos documentos
+#
+# Antes de trocar o arquivo ou a validade de um documento, o estado atual vira
+# uma DocumentoVersao. Versões apontam para o mesmo armazenamento por hash dos
+# documentos e contam em Arquivo.referencias:
+#
+#   - troca de arquivo: a referência do documento passa para a versão
+#     (o contador não muda; o novo upload ganha a sua própria);
+#   - só validade: versão e documento compartilham o arquivo (+1 referência).
+#
+# Assim "o mesmo PDF reenviado com outra data" não ocupa mais disco.
+
+
+def _proximo_numero(documento_id):
+    return select(func.coalesce(func.max(DocumentoVersao.numero), 0) + 1).where(
+        DocumentoVersao.documento_id == documento_id).scalar_subquery()
+
+
+def _enviado_em(documento_id, data_upload):
+    # A revisão atual passou a valer quando a anterior foi substituída (ou no upload original)
+    return select(func.coalesce(func.max(DocumentoVersao.substituido_em), data_upload)).where(
+        DocumentoVersao.documento_id == documento_id).scalar_subquery()
+
+
+def registrar_versao(documento, transferir_referencia):
+    """Guarda o estado atual de `documento` no histórico.
+
+    Com `transferir_referencia` (o arquivo será substituído), a referência ao
+    arquivo passa do documento para a versão; sem ela, a versão ganha uma
+    referência própria ao mesmo arquivo.
+    """
+    tamanho = None
+    if documento.arquivo_hash:
+        tamanho = db.session.execute(
+            select(Arquivo.tamanho).where(Arquivo.hash == documento.arquivo_hash)).scalar()
+        if not transferir_referencia:
+            db.session.execute(
+                update(Arquivo).where(Arquivo.hash == documento.arquivo_hash)
+                .values(referencias=Arquivo.referencias + 1),
+                execution_options={'synchronize_session': False}
+            )
+
+    db.session.execute(insert(DocumentoVersao).values(
+        documento_id=documento.id,
+        numero=_proximo_numero(documento.id),
+        arquivo=documento.arquivo,
+        arquivo_hash=documento.arquivo_hash,
+        nome_arquivo=documento.nome_arquivo,
+        tamanho=tamanho,
+        tipo_validade=documento.tipo_validade,
+        data_validade=documento.data_validade,
+        usuario_id=documento.usuario_id,
+        enviado_em=_enviado_em(documento.id, documento.data_upload),
+        substituido_em=datetime.utcnow()
+    ))
+
+
+def registrar_versoes_em_lote(filtro):
+    """Versão set-based de registrar_versao (sem troca de arquivo) para a renovação em lote."""
+    agora = datetime.utcnow()
+    anteriores = select(
+        DocumentoVersao.documento_id,
+        func.max(DocumentoVersao.numero).label('numero'),
+        func.max(DocumentoVersao.substituido_em).label('substituido_em')
+    ).group_by(DocumentoVersao.documento_id).subquery()
+
+    origem = select(
+        Documento.id,
+        func.coalesce(anteriores.c.numero, 0) + 1,
+        Documento.arquivo, Documento.arquivo_hash, Documento.nome_arquivo, Arquivo.tamanho,
+        Documento.tipo_validade, Documento.data_validade, Documento.usuario_id,
+        func.coalesce(anteriores.c.substituido_em, Documento.data_upload),
+        literal(agora)
+    ).outerjoin(anteriores, anteriores.c.documento_id == Documento.id).outerjoin(
+        Arquivo, Arquivo.hash == Documento.arquivo_hash
+    ).where(filtro)
+
+    db.session.execute(insert(DocumentoVersao).from_select([
+        'documento_id', 'numero', 'arquivo', 'arquivo_hash', 'nome_arquivo', 'tamanho',
+        'tipo_validade', 'data_validade', 'usuario_id', 'enviado_em', 'substituido_em'
+    ], origem))
+
+    # Cada versão nova é mais uma referência ao arquivo que já é do documento
+    novas_por_arquivo = select(func.count(Documento.id)).where(
+        filtro, Documento.arquivo_hash == Arquivo.hash).scalar_subquery()
+    db.session.execute(
+        update(Arquivo).where(Arquivo.hash.in_(select(Documento.arquivo_hash).where(filtro)))
+        .values(referencias=Arquivo.referencias + novas_por_arquivo),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def remover_versoes(condicao):
+    """Apaga as versões que atendem a `condicao` e solta suas referências.
+
+    Retorna os caminhos que ficaram sem uso; devem ser entregues ao
+    removedor_arquivos depois do commit.
+    """
+    removidas_por_arquivo = select(func.count(DocumentoVersao.id)).where(
+        condicao, DocumentoVersao.arquivo_hash == Arquivo.hash).scalar_subquery()
+    hashes = select(DocumentoVersao.arquivo_hash).where(condicao, DocumentoVersao.arquivo_hash.isnot(None))
+    db.session.execute(
+        update(Arquivo).where(Arquivo.hash.in_(hashes))
+        .values(referencias=Arquivo.referencias - removidas_por_arquivo),
+        execution_options={'synchronize_session': False}
+    )
+    orfaos = db.session.execute(
+        select(Arquivo.id, Arquivo.caminho).where(Arquivo.hash.in_(hashes), Arquivo.referencias <= 0)
+    ).all()
+    legados = set(db.session.execute(
+        select(DocumentoVersao.arquivo).where(condicao, DocumentoVersao.arquivo_hash.is_(None)).distinct()
+    ).scalars())
+
+    db.session.execute(delete(DocumentoVersao).where(condicao), execution_options={'synchronize_session': False})
+    if orfaos:
+        db.session.execute(delete(Arquivo).where(Arquivo.id.in_([o.id for o in orfaos])),
+                           execution_options={'synchronize_session': False})
+
+    caminhos = [o.caminho for o in orfaos]
+    if legados:
+        caminhos += sorted(legados - caminhos_legados_em_uso(legados))
+    return caminhos
+
+
+def caminhos_legados_em_uso(caminhos):
+    """Dos caminhos de uploads antigos (sem hash), os que ainda são usados por documentos ou versões."""
+    em_uso = set(db.session.execute(select(Documento.arquivo).where(Documento.arquivo.in_(caminhos))).scalars())
+    em_uso.update(db.session.execute(
+        select(DocumentoVersao.arquivo).where(DocumentoVersao.arquivo.in_(caminhos))).scalars())
+    return em_uso
+
+
+def aplicar_retencao(documento_ids=None, manter=None, dias=None, tamanho_lote=1000):
+    """Aplica a política de retenção do histórico. Retorna os caminhos liberados.
+
+    Por documento, mantém as versões dos `manter` (VERSOES_MANTER) arquivos
+    distintos mais recentes. Versões cujo conteúdo é o mesmo de um arquivo
+    mantido (inclusive o atual) não custam disco e ficam. Com `dias`
+    (VERSOES_DIAS), versões substituídas há mais tempo saem de qualquer forma.
+    """
+    manter = manter if manter is not None else current_app.config.get('VERSOES_MANTER', 10)
+    dias = dias if dias is not None else current_app.config.get('VERSOES_DIAS')
+    corte = datetime.utcnow() - timedelta(days=dias) if dias else None
+
+    consulta = select(
+        DocumentoVersao.id, DocumentoVersao.documento_id, DocumentoVersao.arquivo,
+        DocumentoVersao.arquivo_hash, DocumentoVersao.substituido_em,
+        Documento.arquivo.label('arquivo_atual'), Documento.arquivo_hash.label('hash_atual')
+    ).join(Documento, Documento.id == DocumentoVersao.documento_id).order_by(
+        DocumentoVersao.documento_id, DocumentoVersao.numero.desc())
+    if documento_ids is not None:
+        consulta = consulta.where(DocumentoVersao.documento_id.in_(documento_ids))
+
+    descartar = []
+    documento_atual = None
+    for versao in db.session.execute(consulta.execution_options(yield_per=tamanho_lote)):
+        if versao.documento_id != documento_atual:
+            documento_atual = versao.documento_id
+            mantidos = {versao.hash_atual or versao.arquivo_atual}
+            distintos = 0
+        if corte and versao.substituido_em < corte:
+            descartar.append(versao.id)
+            continue
+        conteudo = versao.arquivo_hash or versao.arquivo
+        if conteudo in mantidos:
+            continue
+        if distintos < manter:
+            mantidos.add(conteudo)
+            distintos += 1
+        else:
+            descartar.append(versao.id)
+
+    caminhos = []
+    for inicio in range(0, len(descartar), tamanho_lote):
+        caminhos += remover_versoes(DocumentoVersao.id.in_(descartar[inicio:inicio + tamanho_lote]))
+    return caminhos
@@ -0,0 +1,12 @@
+import gc
+from app import create_app
+
+# Ponto de entrada dos servidores WSGI, ex.: gunicorn --preload -w 4 wsgi:app
+#
+# Com --preload a aplicação é criada uma vez no processo mestre e os workers
+# nascem por fork, compartilhando essas páginas de memória (copy-on-write).
+# gc.freeze() tira os objetos já criados do alcance do coletor de lixo, que
+# senão os tocaria em cada worker e forçaria a cópia das páginas.
+
+app = create_app()
+gc.freeze()